@@ -0,0 +1,225 @@
+"""
+Résolution opérateur -> armateur: QID Wikidata d'abord (table de hachage, migration 012),
+puis index inversé sur les noms (mots + trigrammes) pour les opérateurs sans QID
+Remplace les recherches LOWER(nom) LIKE '%opérateur%' et les boucles de sous-chaînes sur le cache
+"""
+
+import logging
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+# Colonne du QID Wikidata (migration 012: docs/migrations/012_add_wikidata_qid.sql)
+QID_COLUMN = 'wikidata_qid'
+
+# Mots trop génériques pour identifier une compagnie
+STOP_WORDS = {
+    'LINE', 'LINES', 'SHIPPING', 'MARINE', 'MARITIME', 'CO', 'LTD', 'COMPANY',
+    'CORPORATION', 'GROUP', 'INTERNATIONAL', 'INC', 'LLC', 'THE', 'SA', 'AG', 'AS', 'GMBH',
+}
+
+
+class ArmateurMatch(NamedTuple):
+    """Résultat d'une résolution"""
+    armateur_id: int
+    nom: str
+    score: float        # 1.0 = correspondance exacte (nom, abréviation ou code)
+    ambiguous: bool     # un autre armateur a obtenu un score très proche
+
+
+def normalize_key(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces simples"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', text.lower()).split())
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def has_qid_column(cursor, table: str) -> bool:
+    """Vrai si la table a la colonne wikidata_qid (migration 012 appliquée)"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    """, (table, QID_COLUMN))
+    return cursor.fetchone() is not None
+
+
+class ArmateurResolver:
+    """Table QID -> armateur et index inversé sur les noms, abréviations et codes des armateurs"""
+    
+    def __init__(self, min_score: float = 0.5, ambiguity_margin: float = 0.1, max_probe: int = 6):
+        """
+        Args:
+            min_score: Score minimal pour accepter une correspondance
+            ambiguity_margin: Écart sous lequel le second candidat rend le résultat ambigu
+            max_probe: Nombre de trigrammes les plus sélectifs utilisés pour générer les candidats
+        """
+        self.min_score = min_score
+        self.ambiguity_margin = ambiguity_margin
+        self.max_probe = max_probe
+        
+        self.names: Dict[int, str] = {}
+        self.qids: Dict[str, int] = {}
+        self.qid_of: Dict[int, str] = {}
+        self.exact: Dict[str, int] = {}
+        self.grams: Dict[int, Set[str]] = {}
+        self.words: Dict[int, Set[str]] = {}
+        self.gram_index: Dict[str, Set[int]] = {}
+        self.word_index: Dict[str, Set[int]] = {}
+        self.memo: Dict[str, Optional[ArmateurMatch]] = {}
+        # Résultats limités aux armateurs sans QID (opérateur dont le QID est inconnu de la table)
+        self.memo_qidless: Dict[str, Optional[ArmateurMatch]] = {}
+        # Résultats mémorisés non exacts, par clé normalisée et par trigramme (invalidation ciblée dans add)
+        self.memo_keys: Dict[str, Set[str]] = {}
+        self.memo_grams: Dict[str, Set[str]] = {}
+        self.stats = {'qid': 0, 'name': 0, 'fallback': 0, 'unresolved': 0}
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def load(self, cursor) -> 'ArmateurResolver':
+        """Construit l'index à partir de la table armateurs (une seule requête)"""
+        qid = QID_COLUMN if has_qid_column(cursor, 'armateurs') else 'NULL'
+        cursor.execute(f"SELECT id, nom, abreviation, code, {qid} FROM armateurs")
+        for armateur_id, nom, abreviation, code, wikidata_qid in cursor.fetchall():
+            self.add(armateur_id, nom, abreviation, code, wikidata_qid)
+        logger.info(f"  🧭 Index opérateurs: {len(self.names)} armateurs ({len(self.qids)} QID), "
+                    f"{len(self.gram_index)} trigrammes")
+        return self
+    
+    def add(self, armateur_id: int, nom: str, abreviation: Optional[str] = None,
+            code: Optional[str] = None, wikidata_qid: Optional[str] = None):
+        """Ajoute (ou complète) un armateur dans l'index"""
+        if wikidata_qid:
+            self.qids.setdefault(wikidata_qid, armateur_id)
+            self.qid_of[armateur_id] = wikidata_qid
+            # Un armateur qui reçoit un QID n'est plus un candidat des opérateurs à QID inconnu
+            self.memo_qidless.clear()
+        key = normalize_key(nom or '')
+        if not key:
+            return
+        self.names[armateur_id] = nom
+        for alias in (key, normalize_key(abreviation or ''), normalize_key(code or '')):
+            if alias:
+                self.exact.setdefault(alias, armateur_id)
+        
+        grams = trigrams(key)
+        self.grams[armateur_id] = grams
+        for gram in grams:
+            self.gram_index.setdefault(gram, set()).add(armateur_id)
+        
+        words = {w for w in key.split() if w.upper() not in STOP_WORDS}
+        self.words[armateur_id] = words
+        for word in words:
+            self.word_index.setdefault(word, set()).add(armateur_id)
+        
+        # Un nouvel armateur ne change que les résultats non exacts qui le rencontrent:
+        # même clé qu'un de ses alias, ou au moins un trigramme en commun (seule source de candidats)
+        stale: Set[str] = set()
+        for alias in (key, normalize_key(abreviation or ''), normalize_key(code or '')):
+            stale |= self.memo_keys.pop(alias, set())
+        for gram in grams:
+            stale |= self.memo_grams.pop(gram, set())
+        for operateur in stale:
+            self.memo.pop(operateur, None)
+            self.memo_qidless.pop(operateur, None)
+    
+    def _score(self, armateur_id: int, grams: Set[str], words: Set[str]) -> float:
+        other = self.grams[armateur_id]
+        dice = 2 * len(grams & other) / (len(grams) + len(other))
+        other_words = self.words[armateur_id]
+        # Inclusion d'un nom dans l'autre (ancien comportement LIKE '%op%'), pondérée par la similarité
+        if words and other_words and (words <= other_words or other_words <= words):
+            return 0.6 + 0.4 * dice
+        return dice
+    
+    def resolve(self, operateur: Optional[str], qid: Optional[str] = None) -> Optional[ArmateurMatch]:
+        """
+        Retourne l'armateur d'un opérateur: égalité de QID, sinon meilleur nom
+        
+        Un opérateur dont le QID est absent de la table n'est rapproché par nom que d'un armateur
+        sans QID (saisi à la main ou importé avant la migration 012): un armateur qui a un autre
+        QID est une autre compagnie, quel que soit son nom.
+        
+        Args:
+            operateur: Libellé brut de l'opérateur (ex: 'Maersk Line', 'CMA CGM')
+            qid: QID Wikidata de l'opérateur (ex: 'Q17020') si connu
+        """
+        if qid and qid in self.qids:
+            armateur_id = self.qids[qid]
+            self.stats['qid'] += 1
+            return ArmateurMatch(armateur_id, self.names.get(armateur_id, ''), 1.0, False)
+        
+        if not qid:
+            match = self.resolve_name(operateur)
+            self.stats['name' if match else 'unresolved'] += 1
+            return match
+        
+        match = self.resolve_name(operateur, qidless=True)
+        if match:
+            self.stats['fallback'] += 1
+            logger.info(f"  🔁 Opérateur {qid} absent des QID: rattaché par nom à {match.nom} (armateur sans QID)")
+        else:
+            self.stats['unresolved'] += 1
+        return match
+    
+    def resolve_name(self, operateur: Optional[str], qidless: bool = False) -> Optional[ArmateurMatch]:
+        """
+        Retourne le meilleur armateur pour un libellé d'opérateur (résultat mémorisé)
+        
+        Args:
+            operateur: Libellé brut de l'opérateur (ex: 'Maersk Line', 'CMA CGM')
+            qidless: Candidats limités aux armateurs sans QID
+        """
+        if not operateur:
+            return None
+        memo = self.memo_qidless if qidless else self.memo
+        if operateur in memo:
+            return memo[operateur]
+        
+        key = normalize_key(operateur)
+        match = None
+        if key in self.exact and not (qidless and self.exact[key] in self.qid_of):
+            armateur_id = self.exact[key]
+            match = ArmateurMatch(armateur_id, self.names[armateur_id], 1.0, False)
+        elif key:
+            grams = trigrams(key)
+            self.memo_keys.setdefault(key, set()).add(operateur)
+            for gram in grams:
+                self.memo_grams.setdefault(gram, set()).add(operateur)
+            words = {w for w in key.split() if w.upper() not in STOP_WORDS}
+            
+            # Candidats: mots significatifs + trigrammes les plus sélectifs
+            candidates: Set[int] = set()
+            for word in words:
+                candidates |= self.word_index.get(word, set())
+            postings: List[Set[int]] = sorted(
+                (self.gram_index[g] for g in grams if g in self.gram_index), key=len
+            )
+            hits = Counter(i for posting in postings[:self.max_probe] for i in posting)
+            candidates.update(i for i, _ in hits.most_common(50))
+            if qidless:
+                candidates = {i for i in candidates if i not in self.qid_of}
+            
+            scored = sorted(((self._score(i, grams, words), i) for i in candidates), reverse=True)
+            if scored and scored[0][0] >= self.min_score:
+                best_score, best_id = scored[0]
+                ambiguous = len(scored) > 1 and scored[1][0] >= best_score - self.ambiguity_margin
+                match = ArmateurMatch(best_id, self.names[best_id], round(best_score, 3), ambiguous)
+        
+        memo[operateur] = match
+        return match
+
+    def log_stats(self):
+        s = self.stats
+        logger.info(f"  🧭 Opérateurs résolus: {s['qid']} par QID, {s['name']} par nom, "
+                    f"{s['fallback']} par nom faute de QID connu, {s['unresolved']} sans armateur")
+
@@ -0,0 +1,157 @@
+"""
+Écriture transactionnelle par lots pour les importateurs Velosi
+Un COMMIT tous les N enregistrements (au lieu d'un par ligne) et un SAVEPOINT par ligne
+(ou par page d'INSERT multi-lignes): une ligne en erreur est annulée seule, sans perdre
+les lignes déjà écrites du lot. Une perte de connexion n'est pas une erreur de ligne: elle est
+propagée pour que l'importation s'arrête au dernier COMMIT (reprise avec --resume)
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Sequence
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMIT_EVERY = 500
+DEFAULT_VALUES_PAGE_SIZE = 100
+
+
+class BatchWriter:
+    """Regroupe les insertions d'une connexion en transactions de `commit_every` lignes"""
+    
+    def __init__(self, conn, commit_every: int = DEFAULT_COMMIT_EVERY, label: str = '',
+                 on_commit: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            conn: Connexion psycopg2 (autocommit désactivé)
+            commit_every: Nombre de lignes écrites entre deux COMMIT
+            label: Nom de l'entité pour les logs
+            on_commit: Appelé après chaque COMMIT (ex: ImportCheckpoint.committer(entité))
+        """
+        self.conn = conn
+        self.commit_every = max(1, commit_every)
+        self.label = label
+        self.on_commit = on_commit
+        self.pending = 0
+        # Requêtes sans ligne comptée (rows=0: empreintes, désactivations) en attente de COMMIT
+        self.dirty = False
+        self.stats = {'rows': 0, 'rollbacks': 0, 'commits': 0, 'commit_time': 0.0}
+    
+    @contextmanager
+    def row(self, cursor, rows: int = 1):
+        """
+        Isole les requêtes d'une ligne (ou d'un INSERT de `rows` lignes) dans un SAVEPOINT
+        
+        En cas d'erreur, seul le SAVEPOINT est annulé puis l'exception est propagée:
+        la transaction reste utilisable pour les lignes suivantes.
+        """
+        cursor.execute("SAVEPOINT batch_row")
+        try:
+            yield
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT batch_row")
+            self.stats['rollbacks'] += 1
+            raise
+        cursor.execute("RELEASE SAVEPOINT batch_row")
+        self.pending += rows
+        self.dirty = True
+        self.stats['rows'] += rows
+        if self.pending >= self.commit_every:
+            self.commit()
+    
+    def lost(self, error: Exception) -> bool:
+        """Vrai si l'erreur vient de la connexion (serveur redémarré, connexion coupée) et non de la ligne"""
+        return isinstance(error, psycopg2.InterfaceError) or bool(self.conn.closed)
+    
+    def raise_if_lost(self, error: Exception):
+        """
+        À appeler dans les except par ligne: une perte de connexion est propagée
+        (les lignes suivantes échoueraient toutes et le point de reprise les dépasserait)
+        """
+        if self.lost(error):
+            logger.error(f"  ❌ {self.label}: connexion perdue ({error}), arrêt au dernier COMMIT")
+            raise error
+    
+    def insert_values(self, cursor, sql: str, template: str, rows: Sequence[tuple],
+                      page_size: int = DEFAULT_VALUES_PAGE_SIZE) -> List[Optional[int]]:
+        """
+        Insère des lignes par INSERT multi-lignes (execute_values), un SAVEPOINT par page
+        
+        Args:
+            cursor: Curseur de la connexion du lot
+            sql: Requête "INSERT INTO ... VALUES %s RETURNING id"
+            template: Gabarit d'une ligne, ex: "(%s, %s, true, NOW(), NOW())"
+            rows: Paramètres du gabarit, une entrée par ligne
+            page_size: Lignes par requête INSERT (1 = une requête par ligne)
+        
+        Returns:
+            Identifiants générés dans l'ordre de rows (None pour une ligne rejetée).
+            Une page en erreur est rejouée ligne par ligne: seules les lignes fautives sont perdues.
+        """
+        ids: List[Optional[int]] = []
+        page_size = max(1, page_size)
+        for start in range(0, len(rows), page_size):
+            page = rows[start:start + page_size]
+            try:
+                with self.row(cursor, len(page)):
+                    returned = execute_values(cursor, sql, page, template=template,
+                                              page_size=len(page), fetch=True)
+                ids.extend(result[0] for result in returned)
+                continue
+            except psycopg2.Error as e:
+                self.raise_if_lost(e)
+                if len(page) == 1:
+                    logger.error(f"  ❌ {self.label}: ligne rejetée {page[0][:2]}: {e}")
+                    ids.append(None)
+                    continue
+                logger.warning(f"  ⚠️ {self.label}: page de {len(page)} lignes rejetée ({e}), reprise ligne par ligne")
+            
+            for values in page:
+                try:
+                    with self.row(cursor):
+                        returned = execute_values(cursor, sql, [values], template=template, fetch=True)
+                    ids.append(returned[0][0])
+                except psycopg2.Error as e:
+                    self.raise_if_lost(e)
+                    logger.error(f"  ❌ {self.label}: ligne rejetée {values[:2]}: {e}")
+                    ids.append(None)
+        return ids
+    
+    def commit(self):
+        """Valide le lot en cours (sans effet si aucune requête n'a été écrite depuis le dernier COMMIT)"""
+        if not self.pending and not self.dirty:
+            return
+        start = time.perf_counter()
+        self.conn.commit()
+        self.stats['commit_time'] += time.perf_counter() - start
+        self.stats['commits'] += 1
+        self.pending = 0
+        self.dirty = False
+        if self.on_commit:
+            self.on_commit()
+    
+    def finish(self):
+        """
+        Valide le dernier lot et affiche les statistiques
+        
+        Si l'importation s'interrompt avant, la fermeture de la connexion annule
+        uniquement le lot en cours (les lots précédents sont déjà validés).
+        Lève une erreur si la connexion est perdue: l'entité ne doit pas être marquée terminée.
+        """
+        if self.conn.closed:
+            raise psycopg2.InterfaceError(f"{self.label}: connexion fermée avant le dernier COMMIT")
+        self.commit()
+        self.log_stats()
+    
+    def log_stats(self):
+        s = self.stats
+        if not s['commits']:
+            return
+        logger.info(f"  💾 {self.label}: {s['rows']} lignes en {s['commits']} commits "
+                    f"({s['rows'] / s['commits']:.1f} lignes/commit, "
+                    f"{s['commit_time'] / s['commits'] * 1000:.1f} ms/commit), "
+                    f"{s['rollbacks']} SAVEPOINT annulés")
@@ -0,0 +1,422 @@
+"""
+Benchmark des importateurs Velosi (data_importer, data_importer_full, data_importer_clean)
+Chaque importateur tourne contre des sources locales (fake_sources.py: Wikidata SPARQL et
+OpenDataSoft synthétiques, 1k à 100k lignes) et une base PostgreSQL jetable créée à partir de
+velosi-structure.sql. Mesures par exécution: lignes/s, allers-retours DB, COMMIT, requêtes HTTP,
+RSS maximal et durée de chaque étape; --json / --baseline rendent les régressions visibles.
+--formats compare seulement le décodage des résultats SPARQL JSON / CSV / TSV (sans base).
+
+Exemples:
+    python benchmark_importers.py --pg-dsn "host=localhost user=postgres password=..." --rows 1000 10000
+    python benchmark_importers.py --rows 100000 --importers full --json bench.json --baseline avant.json
+    python benchmark_importers.py --formats --rows 10000 100000
+(sans --pg-dsn, un cluster temporaire est créé avec initdb / pg_ctl)
+"""
+
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+from fake_sources import FakeSourceServer, SyntheticData, serialize_results
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+STRUCTURE_SQL = os.path.join(REPO_ROOT, 'velosi-structure.sql')
+MIGRATIONS_DIR = os.path.join(REPO_ROOT, 'docs', 'migrations')
+
+# Étapes chronométrées de chaque importateur (méthodes appelées par la méthode principale)
+IMPORTERS = {
+    'data': ('data_importer', 'VelosiDataImporter', 'import_all',
+             ['import_all_shipping_companies', 'import_vessels_from_api', 'import_all_ports',
+              'import_all_airports']),
+    'full': ('data_importer_full', 'VelosiFullDataImporter', 'import_all_data',
+             ['delete_all_data', 'import_all_shipping_companies_wikidata', 'import_all_vessels_wikidata']),
+    'clean': ('data_importer_clean', 'VelosiCleanDataImporter', 'clean_and_import_all',
+              ['delete_all_navires', 'delete_all_armateurs', 'import_clean_shipping_companies',
+               'import_clean_vessels']),
+}
+
+
+# ==================== BASE JETABLE ====================
+
+def load_sql_file(cursor, path: str):
+    """Exécute un script SQL (pg_dump ou migration) en ignorant les méta-commandes psql (\\restrict...)"""
+    with open(path, encoding='utf-8') as f:
+        script = ''.join(line for line in f if not line.startswith('\\'))
+    cursor.execute(script)
+
+
+class DisposableDatabase:
+    """Base velosi_bench_<pid> recréée avant chaque mesure, supprimée à la fin"""
+    
+    def __init__(self, admin_dsn: Optional[str] = None, migrations: Optional[List[str]] = None):
+        """
+        Args:
+            admin_dsn: Serveur existant (droit CREATE DATABASE); None = cluster temporaire initdb
+            migrations: Préfixes des migrations docs/migrations à appliquer (ex: ['009', '010', '011'])
+        """
+        self.admin_dsn = admin_dsn
+        self.migrations = migrations or []
+        self.name = f"velosi_bench_{os.getpid()}"
+        self.cluster_dir: Optional[str] = None
+        self.db_config: Dict[str, str] = {}
+    
+    def _start_cluster(self) -> str:
+        initdb, pg_ctl = shutil.which('initdb'), shutil.which('pg_ctl')
+        if not initdb or not pg_ctl:
+            raise RuntimeError("initdb / pg_ctl introuvables: indiquer un serveur avec --pg-dsn")
+        self.cluster_dir = tempfile.mkdtemp(prefix='velosi_bench_pg_')
+        data_dir = os.path.join(self.cluster_dir, 'data')
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        subprocess.run([initdb, '-D', data_dir, '-U', 'postgres', '--auth=trust', '-E', 'UTF8'],
+                       check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([pg_ctl, '-D', data_dir, '-w', '-l', os.path.join(self.cluster_dir, 'postgres.log'),
+                        '-o', f"-p {port} -k {self.cluster_dir} -c listen_addresses=''", 'start'],
+                       check=True, stdout=subprocess.DEVNULL)
+        logger.info(f"  🐘 Cluster temporaire démarré ({self.cluster_dir}, port {port})")
+        return f"host={self.cluster_dir} port={port} user=postgres dbname=postgres"
+    
+    def __enter__(self) -> 'DisposableDatabase':
+        if not self.admin_dsn:
+            self.admin_dsn = self._start_cluster()
+        params = psycopg2.extensions.parse_dsn(self.admin_dsn)
+        self.db_config = {
+            'host': params.get('host', 'localhost'),
+            'database': self.name,
+            'user': params.get('user', 'postgres'),
+            'password': params.get('password', ''),
+            'port': params.get('port', 5432),
+        }
+        return self
+    
+    def _admin(self, sql: str):
+        conn = psycopg2.connect(self.admin_dsn)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+        finally:
+            conn.close()
+    
+    def reset(self):
+        """Base vide: structure velosi + migrations demandées"""
+        self._admin(f"DROP DATABASE IF EXISTS {self.name}")
+        self._admin(f"CREATE DATABASE {self.name} TEMPLATE template0 ENCODING 'UTF8'")
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            with conn.cursor() as cursor:
+                load_sql_file(cursor, STRUCTURE_SQL)
+                for prefix in self.migrations:
+                    matches = sorted(f for f in os.listdir(MIGRATIONS_DIR)
+                                     if f.startswith(f"{prefix}_") and f.endswith('.sql'))
+                    if not matches:
+                        raise FileNotFoundError(f"Migration {prefix} introuvable dans {MIGRATIONS_DIR}")
+                    load_sql_file(cursor, os.path.join(MIGRATIONS_DIR, matches[0]))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def __exit__(self, *exc):
+        try:
+            self._admin(f"DROP DATABASE IF EXISTS {self.name}")
+        finally:
+            if self.cluster_dir:
+                subprocess.run([shutil.which('pg_ctl'), '-D', os.path.join(self.cluster_dir, 'data'),
+                                '-m', 'fast', 'stop'], stdout=subprocess.DEVNULL)
+                shutil.rmtree(self.cluster_dir, ignore_errors=True)
+
+
+# ==================== INSTRUMENTATION ====================
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """Compte chaque requête envoyée au serveur (execute_values: une par page)"""
+    
+    def execute(self, query, vars=None):
+        self.connection.round_trips += 1
+        return super().execute(query, vars)
+    
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        self.connection.round_trips += len(vars_list)
+        return super().executemany(query, vars_list)
+    
+    def copy_expert(self, sql, file, size=8192):
+        self.connection.round_trips += 1
+        return super().copy_expert(sql, file, size)
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    """Connexion instrumentée: requêtes et COMMIT, cumulés sur toutes les connexions ouvertes"""
+    
+    totals = {'round_trips': 0, 'commits': 0, 'connections': 0}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = CountingCursor
+        self._round_trips = 0
+        CountingConnection.totals['connections'] += 1
+    
+    @property
+    def round_trips(self) -> int:
+        return self._round_trips
+    
+    @round_trips.setter
+    def round_trips(self, value: int):
+        CountingConnection.totals['round_trips'] += value - self._round_trips
+        self._round_trips = value
+    
+    def commit(self):
+        CountingConnection.totals['commits'] += 1
+        return super().commit()
+
+
+@contextmanager
+def instrumented_connections():
+    """psycopg2.connect crée des CountingConnection le temps de la mesure"""
+    original = psycopg2.connect
+    
+    def connect(*args, **kwargs):
+        kwargs.setdefault('connection_factory', CountingConnection)
+        return original(*args, **kwargs)
+    
+    psycopg2.connect = connect
+    try:
+        yield CountingConnection.totals
+    finally:
+        psycopg2.connect = original
+
+
+def time_phases(importer, methods: List[str]) -> Dict[str, float]:
+    """Chronomètre les méthodes données de l'instance (cumul si appelées plusieurs fois)"""
+    phases: Dict[str, float] = {}
+    for name in methods:
+        method = getattr(importer, name)
+        
+        def timed(*args, _method=method, _name=name, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _method(*args, **kwargs)
+            finally:
+                phases[_name] = phases.get(_name, 0.0) + time.perf_counter() - start
+        
+        setattr(importer, name, wraps(method)(timed))
+    return phases
+
+
+# ==================== MESURE ====================
+
+def run_case(key: str, rows: int, db_config: Dict[str, str], sparql_url: str, opendatasoft_url: str,
+             options: Dict) -> Dict:
+    """Une mesure, dans un processus neuf (RSS maximal propre à l'importateur)"""
+    import importlib
+    
+    module_name, class_name, entry_point, phase_methods = IMPORTERS[key]
+    module = importlib.import_module(module_name)
+    if not options.get('verbose'):
+        logging.getLogger().setLevel(logging.WARNING)
+    
+    kwargs = {'commit_every': options['commit_every']}
+    if key == 'data':
+        kwargs.update(rate=1e6)
+    elif key == 'full':
+        kwargs.update(page_size=options['page_size'], workers=options.get('workers'),
+                      hydrate_labels=options.get('hydrate_labels', False))
+    importer = getattr(module, class_name)(db_config, **kwargs)
+    if key == 'data':
+        importer.opendatasoft_url = opendatasoft_url
+        importer.wikidata_sparql_url = sparql_url
+    elif key == 'full':
+        importer.sparql.endpoint = sparql_url
+        importer.sparql.result_format = options.get('result_format', 'json')
+        if options.get('hydrate_labels'):
+            importer.rows_source.api_url = sparql_url.replace('/sparql', '/w/api.php')
+    
+    phases = time_phases(importer, phase_methods)
+    with instrumented_connections() as db:
+        start = time.perf_counter()
+        getattr(importer, entry_point)()
+        wall = time.perf_counter() - start
+    
+    written = sum(s.get('imported', 0) + s.get('updated', 0) for s in importer.stats.values())
+    http = getattr(importer, 'http', None)
+    http_requests = sum(int(h['requests']) for h in http.stats.values()) if http else 0
+    # ru_maxrss en Ko sous Linux; processus de normalisation (--workers) compris
+    rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        'importer': key, 'source_rows': rows, 'rows': written, 'wall': round(wall, 3),
+        'rows_per_sec': round(written / wall, 1) if wall else 0.0,
+        'db_round_trips': db['round_trips'], 'commits': db['commits'], 'connections': db['connections'],
+        'http_requests': http_requests, 'peak_rss_mb': round(rss_kb / 1024, 1),
+        'phases': {name: round(seconds, 3) for name, seconds in phases.items()},
+    }
+
+
+def print_report(results: List[Dict], baseline: Optional[List[Dict]] = None, threshold: float = 0.10):
+    """Tableau des mesures (et écart à la référence: ⚠️ si lignes/s baisse de plus de threshold)"""
+    previous = {(r['importer'], r['source_rows']): r for r in baseline or []}
+    print("=" * 110)
+    print(f"{'importateur':<12}{'source':>8}{'lignes':>9}{'durée (s)':>11}{'lignes/s':>11}"
+          f"{'req. DB':>10}{'COMMIT':>8}{'req. HTTP':>11}{'RSS max (Mo)':>14}  écart")
+    print("-" * 110)
+    for r in results:
+        delta = ''
+        ref = previous.get((r['importer'], r['source_rows']))
+        if ref and ref['rows_per_sec']:
+            change = (r['rows_per_sec'] - ref['rows_per_sec']) / ref['rows_per_sec']
+            trips = r['db_round_trips'] - ref['db_round_trips']
+            delta = f"{change:+.0%} lignes/s, {trips:+d} req. DB" + (' ⚠️' if change < -threshold else '')
+        print(f"{r['importer']:<12}{r['source_rows']:>8}{r['rows']:>9}{r['wall']:>11.2f}{r['rows_per_sec']:>11.0f}"
+              f"{r['db_round_trips']:>10}{r['commits']:>8}{r['http_requests']:>11}{r['peak_rss_mb']:>14.1f}  {delta}")
+        print("    " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in r['phases'].items()))
+    print("=" * 110)
+
+
+# ==================== FORMATS DE RÉSULTAT SPARQL ====================
+
+FORMAT_QUERY = """
+SELECT DISTINCT ?item ?itemLabel ?imoNumber ?flag ?flagLabel ?operatorLabel ?length ?beam ?draft ?tonnage WHERE {
+  ?item wdt:P31 wd:Q17210.
+}
+"""
+
+
+def _json_dicts(chunks: List[bytes]):
+    """Décodage historique: document entier (json.loads) puis binding.get(x, {}).get('value')"""
+    data = json.loads(b''.join(chunks))
+    fields = data['head']['vars']
+    for binding in data['results']['bindings']:
+        yield tuple(binding.get(f, {}).get('value') for f in fields)
+
+
+def benchmark_formats(sizes: List[int], chunk_size: int = 65536) -> List[Dict]:
+    """
+    Décodage d'un même résultat en JSON (json.loads + dictionnaires, puis flux), CSV et TSV: octets
+    reçus (gzip, comme sur le réseau), temps de décodage en lignes compactes et pic mémoire Python
+    """
+    from sparql_client import RESULT_PARSERS
+    
+    parsers = {'json-dict': _json_dicts, **RESULT_PARSERS}
+    results = []
+    for rows in sizes:
+        data = SyntheticData(rows).sparql(FORMAT_QUERY)
+        for name, parse in parsers.items():
+            result_format = name.split('-')[0]
+            payload = serialize_results(data, result_format)
+            chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+            
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                count = len(list(parse(chunks)))
+                timings.append(time.perf_counter() - start)
+            
+            # Lignes consommées au fil de l'eau, comme par les importateurs: pic = mémoire du décodage
+            tracemalloc.start()
+            for _ in parse(chunks):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            
+            results.append({
+                'format': name, 'rows': count, 'bytes': len(payload),
+                'wire_bytes': len(gzip.compress(payload, 6)), 'parse_seconds': round(min(timings), 4),
+                'peak_mb': round(peak / 1e6, 2),
+            })
+    
+    print("=" * 90)
+    print(f"{'format':<10}{'lignes':>9}{'octets':>14}{'gzip':>12}{'décodage (s)':>15}{'µs/ligne':>10}{'pic (Mo)':>11}")
+    print("-" * 90)
+    for r in results:
+        print(f"{r['format']:<10}{r['rows']:>9}{r['bytes']:>14}{r['wire_bytes']:>12}{r['parse_seconds']:>15.3f}"
+              f"{r['parse_seconds'] * 1e6 / max(r['rows'], 1):>10.2f}{r['peak_mb']:>11.1f}")
+    print("=" * 90)
+    return results
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Benchmark des importateurs Velosi (sources locales, base jetable)')
+    parser.add_argument('--pg-dsn', help='Serveur PostgreSQL avec droit CREATE DATABASE (défaut: cluster initdb temporaire)')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000],
+                        help='Tailles des sources synthétiques (défaut: 1000 10000)')
+    parser.add_argument('--importers', nargs='+', choices=list(IMPORTERS), default=list(IMPORTERS))
+    parser.add_argument('--migrations', nargs='*', default=[],
+                        help='Migrations docs/migrations appliquées après la structure (ex: 009 010 011)')
+    parser.add_argument('--commit-every', type=int, default=500)
+    parser.add_argument('--page-size', type=int, default=1000, help='Pages SPARQL de data_importer_full')
+    parser.add_argument('--workers', type=int, default=None, help='--workers de data_importer_full')
+    parser.add_argument('--hydrate-labels', action='store_true',
+                        help='--hydrate-labels de data_importer_full (cache des libellés en mémoire)')
+    parser.add_argument('--result-format', choices=['json', 'csv', 'tsv'], default='json',
+                        help='--result-format de data_importer_full')
+    parser.add_argument('--formats', action='store_true',
+                        help='Comparer seulement le décodage JSON / CSV / TSV des résultats SPARQL (sans base)')
+    parser.add_argument('--json', help='Écrire les mesures dans ce fichier')
+    parser.add_argument('--baseline', help='Mesures de référence (fichier --json précédent)')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Baisse de lignes/s signalée comme régression (défaut: 0.10)')
+    parser.add_argument('--verbose', action='store_true', help='Garder les logs des importateurs')
+    args = parser.parse_args()
+    
+    if args.formats:
+        results = benchmark_formats(args.rows)
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+        return
+    
+    options = {'commit_every': args.commit_every, 'page_size': args.page_size,
+               'workers': args.workers, 'hydrate_labels': args.hydrate_labels,
+               'result_format': args.result_format, 'verbose': args.verbose}
+    results = []
+    spawn = multiprocessing.get_context('spawn')
+    
+    with DisposableDatabase(args.pg_dsn, args.migrations) as database:
+        for rows in args.rows:
+            with FakeSourceServer(SyntheticData(rows)) as server:
+                for key in args.importers:
+                    if key == 'clean' and any(r['importer'] == 'clean' for r in results):
+                        # Données statiques: une seule mesure quelle que soit la taille des sources
+                        continue
+                    database.reset()
+                    logger.info(f"⏱️ {key}: {rows} lignes source")
+                    with spawn.Pool(1) as pool:
+                        result = pool.apply(run_case, (key, rows, database.db_config, server.sparql_url,
+                                                       server.opendatasoft_url, options))
+                    results.append(result)
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, baseline, args.threshold)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Mesures écrites dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Chargement en masse (COPY) pour les importateurs Velosi
+Les lignes normalisées sont envoyées via COPY FROM STDIN dans une table temporaire,
+puis insérées dans la table cible avec un seul INSERT ... SELECT ... WHERE NOT EXISTS
+(ON CONFLICT DO NOTHING en garde-fou face à une importation concurrente, voir migration 010)
+Les QID Wikidata sont reportés ensuite sur les lignes sans QID si la table a la colonne (migration 012)
+"""
+
+import io
+import logging
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from armateur_resolver import has_qid_column
+
+logger = logging.getLogger(__name__)
+
+
+# Définition des entités: colonnes de staging, contraintes et requête d'insertion ensembliste.
+# Chaque requête utilise {staging} comme nom de table temporaire; qid_sql (facultatif) reporte
+# la colonne wikidata_qid de staging sur la ligne correspondante, une seule par QID.
+ENTITY_SPECS = {
+    'ports': {
+        'columns': [
+            ('libelle', 'varchar(200)'), ('abbreviation', 'varchar(10)'),
+            ('ville', 'varchar(100)'), ('pays', 'varchar(100)'),
+        ],
+        'required': ['libelle', 'pays'],
+        'numeric': [],
+        'insert_sql': """
+            INSERT INTO ports (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
+            SELECT s.libelle, s.abbreviation, s.ville, s.pays, true, NOW(), NOW()
+            FROM {staging} s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {staging} p
+                WHERE p.seq < s.seq AND LOWER(p.libelle) = LOWER(s.libelle)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM ports t WHERE LOWER(t.libelle) = LOWER(s.libelle)
+            )
+            ORDER BY s.seq
+            ON CONFLICT DO NOTHING
+        """,
+    },
+    'aeroports': {
+        'columns': [
+            ('libelle', 'varchar(200)'), ('abbreviation', 'varchar(10)'),
+            ('ville', 'varchar(100)'), ('pays', 'varchar(100)'),
+        ],
+        'required': ['libelle', 'pays'],
+        'numeric': [],
+        'insert_sql': """
+            INSERT INTO aeroports (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
+            SELECT s.libelle, s.abbreviation, s.ville, s.pays, true, NOW(), NOW()
+            FROM {staging} s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {staging} p
+                WHERE p.seq < s.seq AND LOWER(p.libelle) = LOWER(s.libelle)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM aeroports t WHERE LOWER(t.libelle) = LOWER(s.libelle)
+            )
+            ORDER BY s.seq
+            ON CONFLICT DO NOTHING
+        """,
+    },
+    'armateurs': {
+        'columns': [
+            ('code', 'varchar(10)'), ('nom', 'varchar(100)'), ('abreviation', 'varchar(50)'),
+            ('ville', 'varchar(100)'), ('pays', 'varchar(100)'), ('siteweb', 'varchar(150)'),
+            ('wikidata_qid', 'varchar(20)'),
+        ],
+        'required': ['code', 'nom'],
+        'numeric': [],
+        'insert_sql': """
+            INSERT INTO armateurs
+            (code, nom, abreviation, ville, pays, siteweb, isactive, createdat, updatedat)
+            SELECT s.code, s.nom, s.abreviation, s.ville, s.pays, s.siteweb, true, NOW(), NOW()
+            FROM {staging} s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {staging} p
+                WHERE p.seq < s.seq AND (LOWER(p.nom) = LOWER(s.nom) OR p.code = s.code)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM armateurs t WHERE LOWER(t.nom) = LOWER(s.nom) OR t.code = s.code
+            )
+            ORDER BY s.seq
+            ON CONFLICT DO NOTHING
+        """,
+        'qid_sql': """
+            UPDATE armateurs t SET wikidata_qid = s.wikidata_qid
+            FROM (SELECT DISTINCT ON (wikidata_qid) * FROM {staging}
+                  WHERE wikidata_qid IS NOT NULL ORDER BY wikidata_qid, seq) s
+            WHERE LOWER(t.nom) = LOWER(s.nom) AND t.wikidata_qid IS NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM armateurs o
+                WHERE o.organisation_id = t.organisation_id AND o.wikidata_qid = s.wikidata_qid
+            )
+        """,
+    },
+    'navires': {
+        'columns': [
+            ('code', 'varchar(50)'), ('libelle', 'varchar(255)'), ('nationalite', 'varchar(100)'),
+            ('code_omi', 'varchar(50)'), ('armateur_id', 'integer'),
+            ('longueur', 'numeric(10,2)'), ('largeur', 'numeric(10,2)'),
+            ('wikidata_qid', 'varchar(20)'),
+        ],
+        'required': ['code', 'libelle'],
+        'numeric': ['longueur', 'largeur'],
+        'insert_sql': """
+            INSERT INTO navires
+            (code, libelle, nationalite, code_omi, armateur_id, longueur, largeur,
+             statut, created_at, updated_at)
+            SELECT s.code, s.libelle, s.nationalite, s.code_omi, s.armateur_id,
+                   s.longueur, s.largeur, 'actif', NOW(), NOW()
+            FROM {staging} s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {staging} p
+                WHERE p.seq < s.seq AND (p.code = s.code OR LOWER(p.libelle) = LOWER(s.libelle))
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM navires t WHERE t.code = s.code OR LOWER(t.libelle) = LOWER(s.libelle)
+            )
+            ORDER BY s.seq
+            ON CONFLICT DO NOTHING
+        """,
+        'qid_sql': """
+            UPDATE navires t SET wikidata_qid = s.wikidata_qid
+            FROM (SELECT DISTINCT ON (wikidata_qid) * FROM {staging}
+                  WHERE wikidata_qid IS NOT NULL ORDER BY wikidata_qid, seq) s
+            WHERE t.id = (SELECT MIN(n.id) FROM navires n WHERE n.code = s.code)
+            AND t.wikidata_qid IS NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM navires o
+                WHERE o.organisation_id = t.organisation_id AND o.wikidata_qid = s.wikidata_qid
+            )
+        """,
+    },
+}
+
+
+def _copy_escape(value) -> str:
+    """Échappe une valeur pour le format texte de COPY"""
+    if value is None:
+        return '\\N'
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def missing_required(entity: str, record) -> List[str]:
+    """
+    Colonnes obligatoires (ENTITY_SPECS[entity]['required']) vides dans un enregistrement (records.py)
+    Même règle pour le chemin ligne à ligne que pour le COPY: une ligne rejetée ici l'est aussi en --bulk
+    """
+    return [column for column in ENTITY_SPECS[entity]['required'] if not getattr(record, column)]
+
+
+class _CopyStream(io.RawIOBase):
+    """Flux lisible qui sérialise les lignes à la demande (aucune matérialisation complète)"""
+    
+    def __init__(self, rows: Iterable[Sequence]):
+        self._lines = ('\t'.join(_copy_escape(v) for v in row) + '\n' for row in rows)
+        self._buffer = b''
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        while len(self._buffer) < len(b):
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode('utf-8')
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class StagingBulkLoader:
+    """Charge une entité via COPY dans une table temporaire puis un INSERT ensembliste"""
+    
+    def __init__(self, conn):
+        """
+        Args:
+            conn: Connexion psycopg2 ouverte (validée à la fin de chaque load())
+        """
+        self.conn = conn
+    
+    def _validate(self, spec: Dict, rows: Iterable[Sequence], rejected: List[Tuple]) -> Iterator[Sequence]:
+        """Filtre les lignes qui feraient échouer le COPY (NOT NULL, longueur, numérique)"""
+        names = [name for name, _ in spec['columns']]
+        required = [names.index(c) for c in spec['required']]
+        numeric = [names.index(c) for c in spec['numeric']]
+        limits = []
+        for i, (_, sql_type) in enumerate(spec['columns']):
+            if sql_type.startswith('varchar('):
+                limits.append((i, int(sql_type[8:-1])))
+        
+        project = attrgetter(*names)
+        for row in rows:
+            # Enregistrements (records.py): seules les colonnes de staging sont conservées, par nom
+            if hasattr(row, '_fields'):
+                row = project(row)
+            if any(not row[i] for i in required):
+                rejected.append(row)
+                continue
+            if any(row[i] is not None and len(str(row[i])) > limit for i, limit in limits):
+                rejected.append(row)
+                continue
+            try:
+                for i in numeric:
+                    if row[i] is not None and row[i] != '':
+                        float(row[i])
+            except (TypeError, ValueError):
+                rejected.append(row)
+                continue
+            yield [None if v == '' and i in numeric else v for i, v in enumerate(row)]
+    
+    def load(self, entity: str, rows: Iterable[Sequence]) -> Dict[str, int]:
+        """
+        Charge les lignes d'une entité et retourne les statistiques
+        
+        Args:
+            entity: 'ports', 'aeroports', 'armateurs' ou 'navires'
+            rows: Enregistrements (records.py) ou tuples dans l'ordre des colonnes de ENTITY_SPECS[entity]
+        
+        Returns:
+            {'staged': n, 'imported': n, 'skipped': n, 'errors': n}
+        """
+        spec = ENTITY_SPECS[entity]
+        staging = f"staging_{entity}"
+        names = [name for name, _ in spec['columns']]
+        columns_ddl = ', '.join(f"{name} {sql_type}" for name, sql_type in spec['columns'])
+        rejected: List[Tuple] = []
+        
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging} (seq serial, {columns_ddl}) ON COMMIT DROP"
+            )
+            
+            cursor.copy_expert(
+                f"COPY {staging} ({', '.join(names)}) FROM STDIN",
+                io.BufferedReader(_CopyStream(self._validate(spec, rows, rejected)), 1 << 16)
+            )
+            cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+            staged = cursor.fetchone()[0]
+            logger.info(f"  📥 {staged} lignes chargées via COPY dans {staging}")
+            
+            cursor.execute(spec['insert_sql'].format(staging=staging))
+            imported = cursor.rowcount
+            if 'qid_sql' in spec and has_qid_column(cursor, entity):
+                cursor.execute(spec['qid_sql'].format(staging=staging))
+                logger.info(f"  🔗 {cursor.rowcount} QID Wikidata enregistrés ({entity})")
+            self.conn.commit()
+        finally:
+            cursor.close()
+        
+        if rejected:
+            logger.warning(f"  ⚠️ {len(rejected)} lignes invalides rejetées avant COPY ({entity})")
+        
+        return {
+            'staged': staged,
+            'imported': imported,
+            'skipped': staged - imported,
+            'errors': len(rejected),
+        }
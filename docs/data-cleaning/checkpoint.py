@@ -0,0 +1,140 @@
+"""
+Points de reprise des importateurs Velosi (--resume)
+Position par entité (dernier offset traité et dernière clé source) écrite dans un fichier JSON
+local à chaque COMMIT: une importation interrompue repart de la dernière ligne validée
+au lieu de tout retélécharger et revérifier
+"""
+
+import json
+import logging
+import os
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = '.import_checkpoints'
+
+
+class ImportCheckpoint:
+    """Positions validées par entité: {'offset': int, 'key': str, 'done': bool}"""
+    
+    def __init__(self, path: Optional[str] = None, resume: bool = False):
+        """
+        Args:
+            path: Fichier JSON de reprise (écrit à chaque COMMIT, supprimé en fin d'importation),
+                  None = positions en mémoire seulement
+            resume: Repartir des positions du fichier (sinon l'importation recommence du début)
+        """
+        self.path = path
+        self.positions: Dict[str, Dict] = {}
+        if resume and path:
+            self._load()
+        # Positions au démarrage: la récupération et l'écriture d'une entité repartent du même point
+        self.resumed: Dict[str, Dict] = {entity: dict(p) for entity, p in self.positions.items()}
+        # Positions validées par le dernier COMMIT (seules écrites dans le fichier)
+        self.committed: Dict[str, Dict] = {entity: dict(p) for entity, p in self.positions.items()}
+    
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.positions = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"  ⚠️ Aucun point de reprise ({self.path}): importation complète")
+            return
+        except ValueError as e:
+            logger.warning(f"  ⚠️ Point de reprise illisible ({self.path}: {e}): importation complète")
+            return
+        for entity, position in self.positions.items():
+            state = 'terminé' if position.get('done') else f"offset {position.get('offset', 0)}"
+            logger.info(f"  ⏯️ Reprise {entity}: {state}"
+                        + (f", après {position['key']}" if position.get('key') else ""))
+    
+    def is_done(self, entity: str) -> bool:
+        """Vrai si l'entité a été entièrement importée lors de l'exécution interrompue"""
+        return bool(self.resumed.get(entity, {}).get('done'))
+    
+    def resume_from(self, entity: str) -> Tuple[int, Optional[str]]:
+        """(offset, clé source) de reprise, (0, None) pour une entité non commencée"""
+        position = self.resumed.get(entity, {})
+        return position.get('offset', 0), position.get('key')
+    
+    def advance(self, entity: str, offset: int, key: Optional[str] = None):
+        """
+        Position atteinte (en mémoire): écrite au prochain COMMIT par save()
+        
+        À appeler avant d'écrire la ligne `offset`: le COMMIT qui suit l'inclut.
+        """
+        position = self.positions.setdefault(entity, {})
+        position['offset'] = offset
+        if key is not None:
+            position['key'] = key
+    
+    def save(self, entity: Optional[str] = None):
+        """
+        Positions validées: à appeler juste après un COMMIT (voir committer)
+        Seule l'entité validée est reprise; les autres gardent leur dernière position validée.
+        
+        Args:
+            entity: Entité dont le lot vient d'être validé (None = toutes)
+        """
+        for name in ([entity] if entity else list(self.positions)):
+            if name in self.positions:
+                self.committed[name] = dict(self.positions[name])
+        self._write()
+    
+    def committer(self, entity: str) -> Callable[[], None]:
+        """Rappel on_commit de BatchWriter pour une entité"""
+        return lambda: self.save(entity)
+    
+    def _write(self):
+        """Écrit les positions validées (fichier temporaire puis renommage: jamais de fichier tronqué)"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.committed, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+    
+    def complete(self, entity: str):
+        """Marque l'entité comme terminée (ignorée par une reprise)"""
+        self.positions.setdefault(entity, {})['done'] = True
+        self.save(entity)
+    
+    def clear(self):
+        """Importation terminée: le point de reprise est supprimé"""
+        self.positions = {}
+        self.committed = {}
+        if not self.path:
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+    
+    def finish(self, entities: Iterable[str]):
+        """Fin d'exécution: point de reprise supprimé si toutes les entités sont terminées"""
+        remaining = [entity for entity in entities if not self.committed.get(entity, {}).get('done')]
+        if not remaining:
+            self.clear()
+            return
+        # Une entité interrompue reprend à son dernier COMMIT, pas à la dernière ligne lue
+        self._write()
+        if self.path:
+            logger.warning(f"⏯️ Importation incomplète ({', '.join(remaining)}): relancer avec --resume")
+
+
+def add_checkpoint_arguments(parser, script: str):
+    """Ajoute les options de reprise communes aux scripts d'importation"""
+    default_path = os.path.join(DEFAULT_CHECKPOINT_DIR, f"{script}.json")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reprendre une importation interrompue au dernier COMMIT")
+    parser.add_argument('--checkpoint-file', default=default_path,
+                        help=f'Fichier de reprise (défaut: {default_path})')
+
+
+def checkpoint_from_args(args) -> ImportCheckpoint:
+    """Construit le point de reprise à partir des options de add_checkpoint_arguments"""
+    return ImportCheckpoint(args.checkpoint_file, resume=args.resume)
@@ -0,0 +1,103 @@
+"""
+Allocation des codes séquentiels ARM### / NAV### pour les importateurs Velosi
+Le plus grand code existant est lu une seule fois; les codes suivants sont distribués par un
+compteur en mémoire (ou par blocs réservés sur une séquence Postgres pour des importations concurrentes).
+Format identique au backend (armateurs.service.ts, navires.service.ts): préfixe + numéro sur 3 chiffres minimum
+"""
+
+import logging
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CodeAllocator:
+    """Distribue des codes PREFIX001, PREFIX002... sans requête par ligne"""
+    
+    def __init__(self, prefix: str, table: str, width: int = 3,
+                 sequence: Optional[str] = None, block_size: int = 100):
+        """
+        Args:
+            prefix: Préfixe du code (ARM, NAV)
+            table: Table dont la colonne code est lue au démarrage
+            width: Nombre minimal de chiffres (ARM001)
+            sequence: Séquence Postgres partagée entre importations simultanées (None = compteur local)
+            block_size: Nombre de codes réservés par appel à la séquence
+        """
+        self.prefix = prefix
+        self.table = table
+        self.width = width
+        self.sequence = sequence
+        self.block_size = max(1, block_size)
+        self.last = 0
+        self._cursor = None
+        self._block: List[int] = []
+    
+    def load(self, cursor, setup_cursor=None) -> 'CodeAllocator':
+        """
+        Lit le plus grand numéro existant (une requête) et prépare la séquence si demandée
+        
+        Args:
+            cursor: Curseur de l'importation (lecture des codes, puis nextval)
+            setup_cursor: Curseur en autocommit pour créer et recaler la séquence hors de la
+                transaction d'importation (défaut: cursor)
+        """
+        cursor.execute(f"""
+            SELECT COALESCE(MAX(CAST(SUBSTRING(code FROM {len(self.prefix) + 1}) AS BIGINT)), 0)
+            FROM {self.table}
+            WHERE code ~ %s
+        """, (f'^{self.prefix}[0-9]+$',))
+        self.last = cursor.fetchone()[0]
+        
+        if self.sequence:
+            self._prepare_sequence(setup_cursor or cursor)
+            self._cursor = cursor
+        
+        logger.info(f"  🔢 Codes {self.prefix}: prochain {self.format(self.last + 1)}"
+                    + (f" (séquence {self.sequence})" if self.sequence else ""))
+        return self
+    
+    def _prepare_sequence(self, cursor):
+        """Crée la séquence si besoin et l'avance jusqu'au plus grand code existant"""
+        cursor.execute("SELECT to_regclass(%s)", (self.sequence,))
+        if cursor.fetchone()[0] is None:
+            try:
+                cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {self.sequence} MINVALUE 0 START 0")
+            except Exception:
+                # Création simultanée par une autre importation: la séquence existe maintenant
+                cursor.execute("SELECT to_regclass(%s)", (self.sequence,))
+                if cursor.fetchone()[0] is None:
+                    raise
+        
+        # Avance par nextval, jamais setval: une valeur déjà distribuée par une importation
+        # concurrente n'est pas redonnée (la séquence ne recule jamais)
+        cursor.execute(f"""
+            SELECT COUNT(nextval(%s)) FROM generate_series(1, GREATEST(0, %s - (
+                SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM {self.sequence}
+            )))
+        """, (self.sequence, self.last))
+        skipped = cursor.fetchone()[0]
+        if skipped:
+            logger.info(f"  🔢 Séquence {self.sequence} avancée de {skipped} jusqu'au code {self.format(self.last)}")
+    
+    def format(self, number: int) -> str:
+        return f"{self.prefix}{number:0{self.width}d}"
+    
+    def next(self) -> str:
+        """Code suivant"""
+        if not self.sequence:
+            self.last += 1
+            return self.format(self.last)
+        
+        if not self._block:
+            # Un aller-retour pour block_size codes
+            self._cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)",
+                                 (self.sequence, self.block_size))
+            self._block = [row[0] for row in self._cursor.fetchall()]
+            self._block.reverse()
+        self.last = self._block.pop()
+        return self.format(self.last)
+    
+    def reserve(self, count: int) -> List[str]:
+        """count codes consécutifs dans l'ordre d'insertion"""
+        return [self.next() for _ in range(count)]
@@ -0,0 +1,160 @@
+"""
+Référentiel ISO 3166-1 embarqué (data/iso3166_countries.csv, aucun accès réseau)
+Un pays par ligne: codes alpha-2 / alpha-3 / numérique, nom français (celui des tables Velosi),
+nom anglais, QID Wikidata et libellés alternatifs (noms officiels, traductions de, es, it, pt, nl,
+zh, ja). Tous ces libellés alimentent un index précalculé clé normalisée -> code alpha-2:
+la normalisation d'un pays devient une seule recherche dans un dictionnaire.
+
+Noms et traductions issus du paquet iso-codes (Debian); QID mis à jour avec:
+python countries.py --refresh-qids
+"""
+
+import csv
+import logging
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COUNTRIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'iso3166_countries.csv')
+
+_SEPARATORS = re.compile(r'[\W_]+')
+_ENTITY_URI = re.compile(r'^https?://www\.wikidata\.org/entity/(Q\d+)$')
+
+
+class Country(NamedTuple):
+    """Ligne du référentiel ISO 3166-1"""
+    alpha2: str
+    alpha3: str
+    numeric: str
+    name_fr: str
+    name_en: str
+    wikidata: Optional[str]
+    aliases: Tuple[str, ...]
+
+
+def alias_key(label: str) -> str:
+    """Clé d'index: sans accents ni ponctuation, casse ignorée ("Côte d'Ivoire" -> "cote d ivoire")"""
+    decomposed = unicodedata.normalize('NFKD', label)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(' ', stripped.casefold()).strip()
+
+
+def load_countries(path: str = COUNTRIES_CSV) -> Dict[str, Country]:
+    """Charge le référentiel (code alpha-2 -> Country)"""
+    with open(path, encoding='utf-8', newline='') as f:
+        return {
+            row['alpha2']: Country(row['alpha2'], row['alpha3'], row['numeric'], row['name_fr'],
+                                   row['name_en'], row['wikidata'] or None,
+                                   tuple(a for a in row['aliases'].split('|') if a))
+            for row in csv.DictReader(f)
+        }
+
+
+def build_index(countries: Dict[str, Country]) -> Dict[str, str]:
+    """
+    Index clé normalisée -> code alpha-2
+    
+    Les identifiants (codes, QID, noms anglais et français) passent avant les libellés
+    alternatifs: un alias partagé par deux pays ne remplace jamais un nom principal.
+    """
+    index: Dict[str, str] = {}
+    primary = ((c.alpha2, (c.alpha2, c.alpha3, c.wikidata, c.name_en, c.name_fr)) for c in countries.values())
+    secondary = ((c.alpha2, c.aliases) for c in countries.values())
+    for group in (primary, secondary):
+        for code, labels in group:
+            for label in labels:
+                if not label:
+                    continue
+                key = alias_key(label)
+                existing = index.setdefault(key, code)
+                if existing != code:
+                    logger.debug(f"Libellé ambigu ignoré: {label} ({existing} conservé, {code} écarté)")
+    return index
+
+
+COUNTRIES: Dict[str, Country] = load_countries()
+COUNTRY_INDEX: Dict[str, str] = build_index(COUNTRIES)
+
+# Nations constitutives gardées sous leur propre nom français (comme l'ancienne table de
+# data_importer_v2), au lieu de "Royaume-Uni": country_code les rattache toujours à GB
+SUBDIVISION_NAMES: Dict[str, str] = {
+    'Scotland': 'Écosse', 'Écosse': 'Écosse',
+    'Wales': 'Pays de Galles', 'Pays de Galles': 'Pays de Galles',
+}
+_SUBDIVISION_INDEX: Dict[str, str] = {alias_key(label): name for label, name in SUBDIVISION_NAMES.items()}
+
+
+@lru_cache(maxsize=None)
+def country_code(label: Optional[str]) -> Optional[str]:
+    """
+    Code ISO 3166-1 alpha-2 d'un libellé, d'un code alpha-2/alpha-3 ou d'un QID Wikidata
+    (URI d'entité acceptée), None si inconnu
+    """
+    if not label:
+        return None
+    match = _ENTITY_URI.match(label)
+    if match:
+        label = match.group(1)
+    return COUNTRY_INDEX.get(alias_key(label))
+
+
+def french_name(code: str) -> str:
+    """Nom français d'un code alpha-2"""
+    return COUNTRIES[code].name_fr
+
+
+def subdivision_name(label: Optional[str]) -> Optional[str]:
+    """Nom français d'une nation constitutive conservée (voir SUBDIVISION_NAMES), None sinon"""
+    if not label:
+        return None
+    return _SUBDIVISION_INDEX.get(alias_key(label))
+
+
+# ==================== MISE À JOUR DES QID ====================
+
+def refresh_qids(path: str = COUNTRIES_CSV):
+    """Réécrit la colonne wikidata à partir de Wikidata (P297 = code ISO 3166-1 alpha-2)"""
+    from sparql_client import SparqlPager, WIKIDATA_SPARQL_URL
+    
+    query = """
+    SELECT DISTINCT ?item ?code WHERE {
+      ?item wdt:P297 ?code.
+      FILTER NOT EXISTS { ?item wdt:P576 ?dissolved. }
+    }
+    """
+    qids: Dict[str, str] = {}
+    for row in SparqlPager(WIKIDATA_SPARQL_URL).iter_rows(query):
+        qid = row.item.rsplit('/', 1)[-1]
+        # Plusieurs entités pour un code (ex: Pays-Bas / Royaume des Pays-Bas): QID le plus ancien
+        if row.code not in qids or int(qid[1:]) < int(qids[row.code][1:]):
+            qids[row.code] = qid
+    
+    countries = load_countries(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(Country._fields)
+        for c in sorted(countries.values()):
+            writer.writerow([c.alpha2, c.alpha3, c.numeric, c.name_fr, c.name_en,
+                             qids.get(c.alpha2, c.wikidata or ''), '|'.join(c.aliases)])
+    logger.info(f"✅ {len(qids)} QID Wikidata, {sum(1 for c in countries if c not in qids)} pays sans QID")
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Référentiel ISO 3166-1 des importateurs Velosi')
+    parser.add_argument('--refresh-qids', action='store_true',
+                        help='Mettre à jour les QID depuis Wikidata (P297)')
+    parser.add_argument('labels', nargs='*', help='Libellés à résoudre (ex: "Kingdom of the Netherlands" Q142)')
+    args = parser.parse_args()
+    
+    if args.refresh_qids:
+        refresh_qids()
+    for label in args.labels:
+        code = country_code(label)
+        print(f"{label!r} -> {code} ({french_name(code)})" if code else f"{label!r} -> inconnu")
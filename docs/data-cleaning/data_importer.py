@@ -3,14 +3,22 @@ Script d'importation de données depuis les APIs internationales
 Remplit les 4 tables (ports, aeroports, armateurs, navires) avec des données essentielles
 """
 
-import requests
 import psycopg2
 from typing import Dict, List, Optional
 import logging
 from datetime import datetime
-import time
 import re
 
+from dedup_index import DedupIndex
+from armateur_resolver import ArmateurResolver
+from batch_writer import DEFAULT_COMMIT_EVERY, BatchWriter
+from checkpoint import ImportCheckpoint, add_checkpoint_arguments, checkpoint_from_args
+from http_cache import ResponseCache, add_cache_arguments, cache_from_args
+from http_client import HttpClient
+from opendatasoft_client import OpenDataSoftPager, TokenBucket
+from sparql_client import RESULT_FORMATS, stream_csv_rows
+from text_normalization import normalize_country
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -18,18 +26,32 @@ logger = logging.getLogger(__name__)
 class VelosiDataImporter:
     """Classe pour importer des données depuis les APIs internationales"""
     
-    def __init__(self, db_config: Dict[str, str]):
+    def __init__(self, db_config: Dict[str, str], cache: Optional[ResponseCache] = None,
+                 concurrency: int = 4, rate: float = 5.0, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 checkpoint: Optional[ImportCheckpoint] = None):
         """
         Initialise l'importateur
         
         Args:
             db_config: Configuration de la base de données PostgreSQL
+            cache: Cache disque des réponses HTTP (None = désactivé)
+            concurrency: Pages OpenDataSoft téléchargées simultanément
+            rate: Requêtes OpenDataSoft par seconde au maximum
+            commit_every: Lignes insérées entre deux COMMIT (SAVEPOINT par ligne)
+            checkpoint: Positions de reprise, écrites à chaque COMMIT (None = en mémoire seulement)
         """
         self.db_config = db_config
         self.conn = None
+        self.http = HttpClient(cache=cache, user_agent='VelosiDataImporter/1.0',
+                               pool_size=concurrency)
+        self.concurrency = concurrency
+        self.commit_every = commit_every
+        self.rate_limiter = TokenBucket(rate, burst=concurrency)
+        self.checkpoint = checkpoint or ImportCheckpoint()
         
         # URLs des APIs
         self.opendatasoft_url = "https://public.opendatasoft.com/api/records/1.0/search/"
+        self.wikidata_sparql_url = "https://query.wikidata.org/sparql"
         self.wikidata_url = "https://www.wikidata.org/w/api.php"
         
         # Statistiques d'importation
@@ -63,19 +85,7 @@ class VelosiDataImporter:
     
     def normalize_country_name(self, country: str) -> str:
         """Normalise le nom du pays en français"""
-        country_mapping = {
-            'France': 'France', 'Spain': 'Espagne', 'Italy': 'Italie',
-            'Germany': 'Allemagne', 'Belgium': 'Belgique', 'Netherlands': 'Pays-Bas',
-            'United Kingdom': 'Royaume-Uni', 'Portugal': 'Portugal', 'Greece': 'Grèce',
-            'Morocco': 'Maroc', 'Algeria': 'Algérie', 'Tunisia': 'Tunisie',
-            'Egypt': 'Égypte', 'Turkey': 'Turquie', 'United States': 'États-Unis',
-            'China': 'Chine', 'Japan': 'Japon', 'South Korea': 'Corée du Sud',
-            'Singapore': 'Singapour', 'United Arab Emirates': 'Émirats Arabes Unis',
-            'Saudi Arabia': 'Arabie Saoudite', 'Switzerland': 'Suisse',
-            'Austria': 'Autriche', 'Poland': 'Pologne', 'Denmark': 'Danemark',
-            'Norway': 'Norvège', 'Sweden': 'Suède', 'Finland': 'Finlande'
-        }
-        return country_mapping.get(country, country)
+        return normalize_country(country)
     
     # ==================== IMPORTATION DES PORTS ====================
     
@@ -90,70 +100,61 @@ class VelosiDataImporter:
         logger.info("🚢 IMPORTATION DE TOUS LES PORTS MARITIMES MONDIAUX")
         logger.info("=" * 80)
         
+        if self.checkpoint.is_done('ports'):
+            logger.info("  ⏭️ Déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
         self.connect_db()
         cursor = self.conn.cursor()
         
         try:
-            start = 0
-            total_fetched = 0
-            has_more = True
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('ports').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'ports', on_commit=self.checkpoint.committer('ports'))
             
-            while has_more:
-                logger.info(f"📥 Récupération des ports {start} à {start + batch_size}...")
-                
-                try:
-                    params = {
-                        'dataset': 'world-port-index',
-                        'rows': batch_size,
-                        'start': start,
-                        'sort': 'port_name'
-                    }
-                    
-                    response = requests.get(self.opendatasoft_url, params=params, timeout=15)
+            pager = OpenDataSoftPager(
+                self.http.get, self.opendatasoft_url, 'world-port-index', sort='port_name',
+                page_size=batch_size, concurrency=self.concurrency, bucket=self.rate_limiter
+            )
+            
+            # Reprise: enregistrements déjà validés lors de l'exécution interrompue ignorés
+            resume_offset, _ = self.checkpoint.resume_from('ports')
+            completed = False
+            try:
+                for start, records in pager.iter_pages(resume_offset):
+                    logger.info(f"📥 Ports {start} à {start + len(records)} / {pager.nhits}")
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        records = data.get('records', [])
-                        total_available = data.get('nhits', 0)
+                    for position, record in enumerate(records):
+                        if start + position < resume_offset:
+                            continue
+                        self.checkpoint.advance('ports', start + position + 1, record.get('recordid'))
+                        fields = record.get('fields', {})
                         
-                        if not records:
-                            has_more = False
-                            break
+                        port_name = fields.get('port_name', '')
+                        wpi_number = fields.get('world_port_index_number', '')
                         
-                        logger.info(f"  📊 Total disponible: {total_available}, Traitement de {len(records)} ports")
+                        if not port_name:
+                            continue
                         
-                        for record in records:
-                            fields = record.get('fields', {})
-                            
-                            port_name = fields.get('port_name', '')
-                            wpi_number = fields.get('world_port_index_number', '')
-                            
-                            if not port_name:
-                                continue
-                            
-                            # Créer une abréviation unique
-                            abbreviation = wpi_number[:10] if wpi_number else f"P{start + records.index(record)}"
-                            
-                            # Vérifier si le port existe déjà
-                            cursor.execute(
-                                "SELECT id FROM ports WHERE libelle = %s OR abbreviation = %s",
-                                (port_name, abbreviation)
-                            )
+                        # Créer une abréviation unique
+                        abbreviation = wpi_number[:10] if wpi_number else f"P{start + position}"
+                        
+                        # Vérifier si le port existe déjà (index en mémoire)
+                        if index.contains(libelle=port_name, abbreviation=abbreviation):
+                            self.stats['ports']['skipped'] += 1
+                            continue
+                        
+                        # Insérer le port
+                        try:
+                            insert_query = """
+                                INSERT INTO ports (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
+                                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                            """
                             
-                            if cursor.fetchone():
-                                self.stats['ports']['skipped'] += 1
-                                continue
+                            ville = fields.get('main_port_name', '') or fields.get('port_name', '')
+                            pays = self.normalize_country_name(fields.get('country', ''))
                             
-                            # Insérer le port
-                            try:
-                                insert_query = """
-                                    INSERT INTO ports (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
-                                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                """
-                                
-                                ville = fields.get('main_port_name', '') or fields.get('port_name', '')
-                                pays = self.normalize_country_name(fields.get('country', ''))
-                                
+                            with batch.row(cursor):
                                 cursor.execute(insert_query, (
                                     port_name,
                                     abbreviation,
@@ -163,35 +164,27 @@ class VelosiDataImporter:
                                     datetime.now(),
                                     datetime.now()
                                 ))
+                            
+                            index.add(libelle=port_name, abbreviation=abbreviation)
+                            self.stats['ports']['imported'] += 1
+                            if self.stats['ports']['imported'] % 50 == 0:
+                                logger.info(f"  ✅ {self.stats['ports']['imported']} ports importés...")
                                 
-                                self.stats['ports']['imported'] += 1
-                                if self.stats['ports']['imported'] % 50 == 0:
-                                    logger.info(f"  ✅ {self.stats['ports']['imported']} ports importés...")
-                                
-                            except Exception as e:
-                                self.stats['ports']['errors'] += 1
-                                if self.stats['ports']['errors'] < 10:
-                                    logger.warning(f"  ⚠️ Erreur insertion port {port_name}: {e}")
-                                self.conn.rollback()
-                                continue
-                        
-                        self.conn.commit()
-                        total_fetched += len(records)
-                        start += batch_size
-                        
-                        # Vérifier s'il reste des données
-                        if start >= total_available:
-                            has_more = False
-                    else:
-                        logger.error(f"❌ Erreur API: {response.status_code}")
-                        has_more = False
-                    
-                    time.sleep(0.3)  # Respect de l'API
+                        except Exception as e:
+                            batch.raise_if_lost(e)
+                            self.stats['ports']['errors'] += 1
+                            if self.stats['ports']['errors'] < 10:
+                                logger.warning(f"  ⚠️ Erreur insertion port {port_name}: {e}")
+                            continue
                     
-                except Exception as e:
-                    logger.error(f"❌ Erreur lors de la récupération: {e}")
-                    has_more = False
+                completed = True
+            except Exception as e:
+                batch.raise_if_lost(e)
+                logger.error(f"❌ Erreur lors de la récupération: {e}")
             
+            batch.finish()
+            if completed:
+                self.checkpoint.complete('ports')
             cursor.close()
             logger.info(f"✅ TOTAL Ports importés: {self.stats['ports']['imported']}, ignorés: {self.stats['ports']['skipped']}, erreurs: {self.stats['ports']['errors']}")
             
@@ -211,75 +204,66 @@ class VelosiDataImporter:
         logger.info("✈️ IMPORTATION DE TOUS LES AÉROPORTS MONDIAUX")
         logger.info("=" * 80)
         
+        if self.checkpoint.is_done('aeroports'):
+            logger.info("  ⏭️ Déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
         self.connect_db()
         cursor = self.conn.cursor()
         
         try:
-            start = 0
-            total_fetched = 0
-            has_more = True
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('aeroports').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'aeroports', on_commit=self.checkpoint.committer('aeroports'))
             
-            while has_more:
-                logger.info(f"📥 Récupération des aéroports {start} à {start + batch_size}...")
-                
-                try:
-                    params = {
-                        'dataset': 'airports-code',
-                        'rows': batch_size,
-                        'start': start,
-                        'sort': 'name'
-                    }
-                    
-                    response = requests.get(self.opendatasoft_url, params=params, timeout=15)
+            pager = OpenDataSoftPager(
+                self.http.get, self.opendatasoft_url, 'airports-code', sort='name',
+                page_size=batch_size, concurrency=self.concurrency, bucket=self.rate_limiter
+            )
+            
+            # Reprise: enregistrements déjà validés lors de l'exécution interrompue ignorés
+            resume_offset, _ = self.checkpoint.resume_from('aeroports')
+            completed = False
+            try:
+                for start, records in pager.iter_pages(resume_offset):
+                    logger.info(f"📥 Aéroports {start} à {start + len(records)} / {pager.nhits}")
                     
-                    if response.status_code == 200:
-                        data = response.json()
-                        records = data.get('records', [])
-                        total_available = data.get('nhits', 0)
+                    for position, record in enumerate(records):
+                        if start + position < resume_offset:
+                            continue
+                        self.checkpoint.advance('aeroports', start + position + 1, record.get('recordid'))
+                        fields = record.get('fields', {})
                         
-                        if not records:
-                            has_more = False
-                            break
+                        airport_name = fields.get('name', '')
+                        iata_code = fields.get('iata', fields.get('code_iata', ''))
                         
-                        logger.info(f"  📊 Total disponible: {total_available}, Traitement de {len(records)} aéroports")
+                        # Valider le code IATA (3 lettres)
+                        if not iata_code or len(iata_code) != 3 or not airport_name:
+                            continue
                         
-                        for record in records:
-                            fields = record.get('fields', {})
-                            
-                            airport_name = fields.get('name', '')
-                            iata_code = fields.get('iata', fields.get('code_iata', ''))
-                            
-                            # Valider le code IATA (3 lettres)
-                            if not iata_code or len(iata_code) != 3 or not airport_name:
-                                continue
-                            
-                            # Vérifier si l'aéroport existe déjà
-                            cursor.execute(
-                                "SELECT id FROM aeroports WHERE abbreviation = %s OR libelle = %s",
-                                (iata_code, airport_name)
-                            )
-                            
-                            if cursor.fetchone():
-                                self.stats['aeroports']['skipped'] += 1
-                                continue
+                        # Vérifier si l'aéroport existe déjà (index en mémoire)
+                        if index.contains(abbreviation=iata_code, libelle=airport_name):
+                            self.stats['aeroports']['skipped'] += 1
+                            continue
+                        
+                        # Normaliser le nom
+                        clean_name = airport_name
+                        if '(' in clean_name:
+                            clean_name = clean_name.split('(')[0].strip()
+                        if clean_name.endswith(' Airport'):
+                            clean_name = clean_name.replace(' Airport', ' Aéroport')
+                        
+                        # Insérer l'aéroport
+                        try:
+                            insert_query = """
+                                INSERT INTO aeroports (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
+                                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                            """
                             
-                            # Normaliser le nom
-                            clean_name = airport_name
-                            if '(' in clean_name:
-                                clean_name = clean_name.split('(')[0].strip()
-                            if clean_name.endswith(' Airport'):
-                                clean_name = clean_name.replace(' Airport', ' Aéroport')
+                            ville = fields.get('city', '')
+                            pays = self.normalize_country_name(fields.get('country', ''))
                             
-                            # Insérer l'aéroport
-                            try:
-                                insert_query = """
-                                    INSERT INTO aeroports (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
-                                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                """
-                                
-                                ville = fields.get('city', '')
-                                pays = self.normalize_country_name(fields.get('country', ''))
-                                
+                            with batch.row(cursor):
                                 cursor.execute(insert_query, (
                                     clean_name[:200],
                                     iata_code,
@@ -289,35 +273,27 @@ class VelosiDataImporter:
                                     datetime.now(),
                                     datetime.now()
                                 ))
+                            
+                            index.add(abbreviation=iata_code, libelle=airport_name)
+                            self.stats['aeroports']['imported'] += 1
+                            if self.stats['aeroports']['imported'] % 100 == 0:
+                                logger.info(f"  ✅ {self.stats['aeroports']['imported']} aéroports importés...")
                                 
-                                self.stats['aeroports']['imported'] += 1
-                                if self.stats['aeroports']['imported'] % 100 == 0:
-                                    logger.info(f"  ✅ {self.stats['aeroports']['imported']} aéroports importés...")
-                                
-                            except Exception as e:
-                                self.stats['aeroports']['errors'] += 1
-                                if self.stats['aeroports']['errors'] < 10:
-                                    logger.warning(f"  ⚠️ Erreur insertion aéroport {airport_name}: {e}")
-                                self.conn.rollback()
-                                continue
-                        
-                        self.conn.commit()
-                        total_fetched += len(records)
-                        start += batch_size
-                        
-                        # Vérifier s'il reste des données
-                        if start >= total_available:
-                            has_more = False
-                    else:
-                        logger.error(f"❌ Erreur API: {response.status_code}")
-                        has_more = False
+                        except Exception as e:
+                            batch.raise_if_lost(e)
+                            self.stats['aeroports']['errors'] += 1
+                            if self.stats['aeroports']['errors'] < 10:
+                                logger.warning(f"  ⚠️ Erreur insertion aéroport {airport_name}: {e}")
+                            continue
                     
-                    time.sleep(0.3)
-                    
-                except Exception as e:
-                    logger.error(f"❌ Erreur lors de la récupération: {e}")
-                    has_more = False
+                completed = True
+            except Exception as e:
+                batch.raise_if_lost(e)
+                logger.error(f"❌ Erreur lors de la récupération: {e}")
             
+            batch.finish()
+            if completed:
+                self.checkpoint.complete('aeroports')
             cursor.close()
             logger.info(f"✅ TOTAL Aéroports importés: {self.stats['aeroports']['imported']}, ignorés: {self.stats['aeroports']['skipped']}, erreurs: {self.stats['aeroports']['errors']}")
             
@@ -334,6 +310,10 @@ class VelosiDataImporter:
         logger.info("🏢 IMPORTATION DES ARMATEURS VIA WIKIDATA")
         logger.info("=" * 80)
         
+        if self.checkpoint.is_done('armateurs'):
+            logger.info("  ⏭️ Déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
         # Rechercher les compagnies maritimes sur Wikidata
         # Query SPARQL pour récupérer toutes les compagnies maritimes
         sparql_query = """
@@ -349,24 +329,23 @@ class VelosiDataImporter:
         logger.info("📡 Requête Wikidata pour les compagnies maritimes...")
         
         try:
-            wikidata_sparql_url = "https://query.wikidata.org/sparql"
-            response = requests.get(
-                wikidata_sparql_url,
-                params={'query': sparql_query, 'format': 'json'},
-                headers={'User-Agent': 'VelosiDataImporter/1.0'},
+            # Résultat CSV (plus compact que JSON), décodé en lignes compactes
+            response = self.http.get(
+                self.wikidata_sparql_url,
+                params={'query': sparql_query},
+                headers={'User-Agent': 'VelosiDataImporter/1.0', 'Accept': RESULT_FORMATS['csv']},
                 timeout=30
             )
             
             if response.status_code == 200:
-                data = response.json()
-                bindings = data.get('results', {}).get('bindings', [])
-                logger.info(f"  ✅ {len(bindings)} compagnies trouvées sur Wikidata")
+                rows = list(stream_csv_rows([response.content]))
+                logger.info(f"  ✅ {len(rows)} compagnies trouvées sur Wikidata")
                 
                 major_companies = []
-                for binding in bindings:
-                    nom = binding.get('companyLabel', {}).get('value', '')
-                    pays = binding.get('countryLabel', {}).get('value', 'Inconnu')
-                    site = binding.get('website', {}).get('value', '')
+                for row in rows:
+                    nom = row.companyLabel or ''
+                    pays = row.countryLabel or 'Inconnu'
+                    site = row.website or ''
                     
                     if nom and nom != '':
                         major_companies.append({
@@ -389,6 +368,10 @@ class VelosiDataImporter:
         cursor = self.conn.cursor()
         
         try:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('armateurs').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'armateurs', on_commit=self.checkpoint.committer('armateurs'))
+            
             for company in major_companies:
                 nom = company['nom']
                 
@@ -397,13 +380,8 @@ class VelosiDataImporter:
                 if not code:
                     code = nom[:10].upper()
                 
-                # Vérifier si l'armateur existe déjà
-                cursor.execute(
-                    "SELECT id FROM armateurs WHERE nom = %s OR code = %s",
-                    (nom, code)
-                )
-                
-                if cursor.fetchone():
+                # Vérifier si l'armateur existe déjà (index en mémoire)
+                if index.contains(nom=nom, code=code):
                     self.stats['armateurs']['skipped'] += 1
                     logger.info(f"  ⏭️ Armateur existant: {nom}")
                     continue
@@ -421,27 +399,30 @@ class VelosiDataImporter:
                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                     """
                     
-                    cursor.execute(insert_query, (
-                        code,
-                        nom,
-                        abbr,
-                        company['pays'],
-                        company['site'],
-                        True,
-                        datetime.now(),
-                        datetime.now()
-                    ))
+                    with batch.row(cursor):
+                        cursor.execute(insert_query, (
+                            code,
+                            nom,
+                            abbr,
+                            company['pays'],
+                            company['site'],
+                            True,
+                            datetime.now(),
+                            datetime.now()
+                        ))
                     
+                    index.add(nom=nom, code=code)
                     self.stats['armateurs']['imported'] += 1
                     logger.info(f"  ✅ Armateur ajouté: {nom} ({abbr})")
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     self.stats['armateurs']['errors'] += 1
                     logger.warning(f"  ⚠️ Erreur insertion armateur {nom}: {e}")
-                    self.conn.rollback()
                     continue
             
-            self.conn.commit()
+            batch.finish()
+            self.checkpoint.complete('armateurs')
             cursor.close()
             logger.info(f"✅ Armateurs importés: {self.stats['armateurs']['imported']}, ignorés: {self.stats['armateurs']['skipped']}")
             
@@ -493,6 +474,10 @@ class VelosiDataImporter:
         logger.info("⛴️ IMPORTATION DES NAVIRES")
         logger.info("=" * 80)
         
+        if self.checkpoint.is_done('navires'):
+            logger.info("  ⏭️ Déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
         # Navires majeurs connus avec leurs armateurs
         major_vessels = [
             {
@@ -578,28 +563,23 @@ class VelosiDataImporter:
         cursor = self.conn.cursor()
         
         try:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('navires').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'navires', on_commit=self.checkpoint.committer('navires'))
+            resolver = ArmateurResolver().load(cursor)
+            
             for vessel in major_vessels:
-                # Trouver l'ID de l'armateur
-                cursor.execute(
-                    "SELECT id FROM armateurs WHERE nom LIKE %s LIMIT 1",
-                    (f"%{vessel['armateur_nom']}%",)
-                )
-                
-                armateur_result = cursor.fetchone()
-                if not armateur_result:
+                # Trouver l'ID de l'armateur (index en mémoire)
+                match = resolver.resolve(vessel['armateur_nom'])
+                if not match:
                     logger.warning(f"  ⚠️ Armateur non trouvé pour: {vessel['libelle']}")
                     self.stats['navires']['skipped'] += 1
                     continue
                 
-                armateur_id = armateur_result[0]
-                
-                # Vérifier si le navire existe déjà
-                cursor.execute(
-                    "SELECT id FROM navires WHERE code = %s OR code_omi = %s",
-                    (vessel['code'], vessel['code_omi'])
-                )
+                armateur_id = match.armateur_id
                 
-                if cursor.fetchone():
+                # Vérifier si le navire existe déjà (index en mémoire)
+                if index.contains(code=vessel['code'], code_omi=vessel['code_omi']):
                     self.stats['navires']['skipped'] += 1
                     logger.info(f"  ⏭️ Navire existant: {vessel['libelle']}")
                     continue
@@ -613,31 +593,34 @@ class VelosiDataImporter:
                         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """
                     
-                    cursor.execute(insert_query, (
-                        vessel['code'],
-                        vessel['libelle'],
-                        vessel['nationalite'],
-                        vessel['longueur'],
-                        vessel['largeur'],
-                        vessel['jauge_brute'],
-                        vessel['code_omi'],
-                        vessel['pav'],
-                        armateur_id,
-                        'actif',
-                        datetime.now(),
-                        datetime.now()
-                    ))
+                    with batch.row(cursor):
+                        cursor.execute(insert_query, (
+                            vessel['code'],
+                            vessel['libelle'],
+                            vessel['nationalite'],
+                            vessel['longueur'],
+                            vessel['largeur'],
+                            vessel['jauge_brute'],
+                            vessel['code_omi'],
+                            vessel['pav'],
+                            armateur_id,
+                            'actif',
+                            datetime.now(),
+                            datetime.now()
+                        ))
                     
+                    index.add(code=vessel['code'], libelle=vessel['libelle'], code_omi=vessel['code_omi'])
                     self.stats['navires']['imported'] += 1
                     logger.info(f"  ✅ Navire ajouté: {vessel['libelle']} ({vessel['code_omi']})")
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     self.stats['navires']['errors'] += 1
                     logger.warning(f"  ⚠️ Erreur insertion navire {vessel['libelle']}: {e}")
-                    self.conn.rollback()
                     continue
             
-            self.conn.commit()
+            batch.finish()
+            self.checkpoint.complete('navires')
             cursor.close()
             logger.info(f"✅ Navires importés: {self.stats['navires']['imported']}, ignorés: {self.stats['navires']['skipped']}")
             
@@ -713,6 +696,14 @@ def main():
         default='all',
         help='Entité à importer (défaut: all)'
     )
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Pages OpenDataSoft téléchargées simultanément (défaut: 4)')
+    parser.add_argument('--rate-limit', type=float, default=5.0,
+                        help='Requêtes OpenDataSoft par seconde au maximum (défaut: 5)')
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY,
+                        help=f'Lignes écrites entre deux COMMIT (défaut: {DEFAULT_COMMIT_EVERY})')
+    add_cache_arguments(parser)
+    add_checkpoint_arguments(parser, 'data_importer')
     
     args = parser.parse_args()
     
@@ -726,7 +717,9 @@ def main():
     }
     
     # Créer l'importateur
-    importer = VelosiDataImporter(db_config)
+    importer = VelosiDataImporter(db_config, cache=cache_from_args(args), concurrency=args.concurrency,
+                                  rate=args.rate_limit, commit_every=args.commit_every,
+                                  checkpoint=checkpoint_from_args(args))
     
     # Exécuter l'importation
     if args.entity == 'all':
@@ -740,6 +733,8 @@ def main():
     elif args.entity == 'navires':
         importer.import_vessels_from_api()
     
+    importer.checkpoint.finish(list(importer.stats) if args.entity == 'all' else [args.entity])
+    importer.http.log_stats()
     logger.info("✅ Importation terminée avec succès!")
 
 
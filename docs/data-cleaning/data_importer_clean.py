@@ -3,13 +3,18 @@ Script d'importation PROPRE avec données RÉELLES de compagnies maritimes et le
 Nettoie les données existantes et importe uniquement des données vérifiées et réalistes
 """
 
-import requests
 import psycopg2
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 import logging
 from datetime import datetime
-import time
-import re
+import zlib
+
+from batch_writer import DEFAULT_COMMIT_EVERY, DEFAULT_VALUES_PAGE_SIZE, BatchWriter
+from checkpoint import ImportCheckpoint, add_checkpoint_arguments, checkpoint_from_args
+from dedup_index import DedupIndex
+from records import Armateur, Navire
+from sync_state import SyncState, content_hash
+from text_normalization import abbreviation, clean_code, clean_text, normalize_country
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,16 +23,26 @@ logger = logging.getLogger(__name__)
 class VelosiCleanDataImporter:
     """Importateur de données PROPRES et RÉELLES"""
     
-    def __init__(self, db_config: Dict[str, str]):
+    def __init__(self, db_config: Dict[str, str], commit_every: int = DEFAULT_COMMIT_EVERY,
+                 values_page_size: int = DEFAULT_VALUES_PAGE_SIZE, sync: bool = False,
+                 checkpoint: Optional[ImportCheckpoint] = None):
         self.db_config = db_config
         self.conn = None
+        self.commit_every = commit_every
+        self.values_page_size = values_page_size
+        
+        # Synchronisation incrémentale (migration 011) au lieu de supprimer et recharger les tables
+        self.sync = sync
+        
+        # Points de reprise (--resume), écrits à chaque COMMIT
+        self.checkpoint = checkpoint or ImportCheckpoint()
         
         # Statistiques
         self.stats = {
             'ports': {'deleted': 0, 'imported': 0, 'skipped': 0, 'errors': 0},
             'aeroports': {'deleted': 0, 'imported': 0, 'skipped': 0, 'errors': 0},
-            'armateurs': {'deleted': 0, 'imported': 0, 'skipped': 0, 'errors': 0},
-            'navires': {'deleted': 0, 'imported': 0, 'skipped': 0, 'errors': 0}
+            'armateurs': {'deleted': 0, 'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0},
+            'navires': {'deleted': 0, 'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
         }
         
         # Cache pour les armateurs importés (id -> nom)
@@ -56,72 +71,19 @@ class VelosiCleanDataImporter:
     
     def clean_text(self, text: str) -> str:
         """Nettoie et normalise un texte"""
-        if not text:
-            return ""
-        # Supprimer les espaces multiples
-        text = re.sub(r'\s+', ' ', text.strip())
-        # Supprimer les caractères de contrôle
-        text = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', text)
-        return text
+        return clean_text(text)
     
     def normalize_country(self, country: str) -> str:
         """Normalise le nom du pays en français"""
-        if not country:
-            return ""
-        
-        mapping = {
-            'Denmark': 'Danemark', 'Switzerland': 'Suisse', 'France': 'France',
-            'China': 'Chine', "People's Republic of China": 'Chine',
-            'Germany': 'Allemagne', 'Japan': 'Japon', 'Taiwan': 'Taïwan',
-            'South Korea': 'Corée du Sud', 'Republic of Korea': 'Corée du Sud',
-            'Singapore': 'Singapour', 'Israel': 'Israël', 'Netherlands': 'Pays-Bas',
-            'United States': 'États-Unis', 'USA': 'États-Unis', 'US': 'États-Unis',
-            'United Kingdom': 'Royaume-Uni', 'UK': 'Royaume-Uni',
-            'Norway': 'Norvège', 'Sweden': 'Suède', 'Belgium': 'Belgique',
-            'Italy': 'Italie', 'Spain': 'Espagne', 'Greece': 'Grèce',
-            'Turkey': 'Turquie', 'Hong Kong': 'Hong Kong', 'India': 'Inde',
-            'United Arab Emirates': 'Émirats Arabes Unis', 'UAE': 'Émirats Arabes Unis',
-            'Panama': 'Panama', 'Cyprus': 'Chypre', 'Marshall Islands': 'Îles Marshall',
-            'Liberia': 'Libéria', 'Malta': 'Malte', 'Bahamas': 'Bahamas',
-        }
-        return mapping.get(country, country)
+        return normalize_country(country)
     
     def generate_clean_code(self, name: str, prefix: str = "ARM") -> str:
         """Génère un code propre à partir d'un nom"""
-        if not name:
-            return prefix + "000"
-        
-        # Garder seulement les lettres et chiffres
-        clean = re.sub(r'[^A-Za-z0-9]', '', name.upper())
-        
-        # Prendre les premiers caractères significatifs
-        if len(clean) >= 6:
-            code = clean[:6]
-        elif len(clean) >= 3:
-            code = clean
-        else:
-            code = prefix
-        
-        return code[:10]  # Max 10 caractères
+        return clean_code(name, prefix)
     
     def generate_abbreviation(self, name: str) -> str:
         """Génère une abréviation propre"""
-        if not name:
-            return ""
-        
-        # Supprimer les mots communs
-        common_words = {'LINE', 'LINES', 'SHIPPING', 'MARINE', 'MARITIME', 'CO', 'LTD', 
-                       'COMPANY', 'CORPORATION', 'GROUP', 'INTERNATIONAL', 'INC'}
-        
-        words = [w for w in name.upper().split() if w not in common_words and len(w) > 1]
-        
-        if not words:
-            words = name.upper().split()[:2]
-        
-        # Prendre premières lettres
-        abbrev = ''.join([w[0] for w in words[:5]])
-        
-        return abbrev[:10]
+        return abbreviation(name)
     
     # ==================== NETTOYAGE ====================
     
@@ -171,6 +133,23 @@ class VelosiCleanDataImporter:
             cursor.close()
             self.close_db()
     
+    # ==================== SYNCHRONISATION ====================
+    
+    def find_row_id(self, cursor, table: str, column: str, value: str) -> Optional[int]:
+        """Ligne existante non encore suivie (importation antérieure à la synchronisation)"""
+        cursor.execute(f"SELECT id FROM {table} WHERE LOWER({column}) = LOWER(%s) ORDER BY id LIMIT 1",
+                       (value,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def sync_deletions(self, cursor, batch: BatchWriter, state: SyncState):
+        """Désactive les lignes dont la clé n'est plus dans la source (liste complète à chaque exécution)"""
+        with batch.row(cursor, rows=0):
+            state.flush(cursor)
+            deleted = state.soft_delete(cursor, state.missing(state.seen))
+        self.stats[state.entity]['deleted'] += deleted
+        logger.info(f"  🔁 {state.entity}: {deleted} désactivés (absents de la source)")
+    
     # ==================== DONNÉES RÉELLES ====================
     
     def get_real_shipping_companies(self) -> List[Dict]:
@@ -383,7 +362,23 @@ class VelosiCleanDataImporter:
         
         return companies
     
-    def get_vessels_for_company(self, company_name: str, fleet_size: int) -> List[Dict]:
+    def prepare_armateur(self, company: Dict) -> Armateur:
+        """Convertit une compagnie de get_real_shipping_companies en Armateur nettoyé (sans code)"""
+        nom = self.clean_text(company['nom'])
+        return Armateur(
+            code=None,
+            nom=nom,
+            abreviation=self.generate_abbreviation(nom),
+            ville=self.clean_text(company['ville']),
+            pays=self.normalize_country(company['pays']),
+            siteweb=self.clean_text(company.get('siteweb', '')),
+            telephone=self.clean_text(company.get('telephone', '')),
+            email=self.clean_text(company.get('email', '')),
+            notes=self.clean_text(company.get('notes', '')),
+            fleet_size=company.get('fleet_size', 10),
+        )
+    
+    def get_vessels_for_company(self, company_name: str, fleet_size: int) -> List[Navire]:
         """
         Génère des noms de navires réalistes pour une compagnie
         Basé sur les conventions de nommage réelles
@@ -447,17 +442,18 @@ class VelosiCleanDataImporter:
             else:
                 vessel_name = f"{company_name.split()[0].upper()} {i+1}"
             
-            # Générer IMO fictif mais réaliste (7 chiffres commençant par 9)
-            imo_number = f"9{800000 + (hash(vessel_name) % 199999)}"
+            # Générer IMO fictif mais réaliste (7 chiffres commençant par 9), identique d'une exécution à l'autre
+            imo_number = f"9{800000 + (zlib.crc32(vessel_name.encode('utf-8')) % 199999)}"
             
-            vessels.append({
-                'libelle': vessel_name,
-                'code_omi': imo_number,
-                'nationalite': None,  # Sera défini selon le pavillon
-                'longueur': 300 + (i * 10),  # Longueurs réalistes (300-450m)
-                'largeur': 40 + (i % 10),
-                'statut': 'actif',
-            })
+            vessels.append(Navire(
+                code=None,
+                libelle=vessel_name,
+                code_omi=imo_number,
+                nationalite=None,  # Sera défini selon le pavillon
+                longueur=300 + (i * 10),  # Longueurs réalistes (300-450m)
+                largeur=40 + (i % 10),
+                statut='actif',
+            ))
         
         return vessels
     
@@ -470,91 +466,196 @@ class VelosiCleanDataImporter:
         print("="*80)
         
         companies = self.get_real_shipping_companies()
+        
+        if self.checkpoint.is_done('armateurs'):
+            logger.info("  ⏭️ Déjà importées lors de l'exécution interrompue (--resume)")
+            self.load_armateurs_cache(companies)
+            return
+        
         logger.info(f"  📦 {len(companies)} compagnies maritimes à importer")
         
         self.connect_db()
         cursor = self.conn.cursor()
         
         try:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('armateurs').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'armateurs', on_commit=self.checkpoint.committer('armateurs'))
+            state = SyncState('armateurs').load(cursor) if self.sync else None
+            pending: List[Armateur] = []
+            
             for company in companies:
                 try:
                     # Nettoyer les données
-                    nom = self.clean_text(company['nom'])
-                    ville = self.clean_text(company['ville'])
-                    pays = self.normalize_country(company['pays'])
-                    siteweb = self.clean_text(company.get('siteweb', ''))
-                    email = self.clean_text(company.get('email', ''))
-                    telephone = self.clean_text(company.get('telephone', ''))
-                    notes = self.clean_text(company.get('notes', ''))
+                    armateur = self.prepare_armateur(company)
+                    nom = armateur.nom
+                    
+                    # Synchronisation: compagnie déjà importée (clé = nom normalisé)
+                    if state and self.sync_armateur(cursor, batch, state, index, armateur):
+                        continue
                     
-                    # Générer code et abréviation
+                    # Générer code
                     code = self.generate_clean_code(nom, 'ARM')
-                    abreviation = self.generate_abbreviation(nom)
                     
-                    # Vérifier unicité du code
-                    cursor.execute("SELECT id FROM armateurs WHERE code = %s", (code,))
-                    if cursor.fetchone():
+                    # Vérifier unicité du code (index en mémoire, lignes en attente comprises)
+                    if index.contains(code=code):
                         # Ajouter un suffixe si le code existe
                         code = code[:8] + str(hash(nom) % 99).zfill(2)
                     
-                    # Insérer
-                    cursor.execute("""
-                        INSERT INTO armateurs 
-                        (code, nom, abreviation, ville, pays, telephone, email, siteweb, 
-                         notes, isactive, createdat, updatedat)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, true, NOW(), NOW())
-                        RETURNING id
-                    """, (code, nom, abreviation, ville, pays, telephone, email, siteweb, notes))
-                    
-                    armateur_id = cursor.fetchone()[0]
-                    self.conn.commit()
-                    
-                    # Cache pour les navires
-                    self.armateurs_cache[armateur_id] = {
-                        'nom': nom,
-                        'fleet_size': company.get('fleet_size', 10)
-                    }
-                    
-                    logger.info(f"  ✅ {nom} ({abreviation}) - {ville}, {pays}")
-                    self.stats['armateurs']['imported'] += 1
+                    index.add(nom=nom, code=code)
+                    pending.append(armateur._replace(code=code))
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     logger.error(f"  ❌ Erreur pour {company.get('nom', 'Unknown')}: {e}")
                     self.stats['armateurs']['errors'] += 1
-                    self.conn.rollback()
             
+            # Insérer par pages multi-lignes, identifiants récupérés en une fois (RETURNING id)
+            ids = batch.insert_values(cursor, """
+                INSERT INTO armateurs 
+                (code, nom, abreviation, ville, pays, siteweb, telephone, email, 
+                 notes, isactive, createdat, updatedat)
+                VALUES %s
+                RETURNING id
+            """, "(%s, %s, %s, %s, %s, %s, %s, %s, %s, true, NOW(), NOW())",
+                [armateur[:9] for armateur in pending], self.values_page_size)
+            
+            for armateur_id, armateur in zip(ids, pending):
+                if armateur_id is None:
+                    self.stats['armateurs']['errors'] += 1
+                    continue
+                if state:
+                    state.mark(armateur.nom.lower(), armateur_id, content_hash(armateur[1:9]))
+                
+                # Cache pour les navires
+                self.armateurs_cache[armateur_id] = {
+                    'nom': armateur.nom,
+                    'fleet_size': armateur.fleet_size
+                }
+                
+                logger.info(f"  ✅ {armateur.nom} ({armateur.abreviation}) - {armateur.ville}, {armateur.pays}")
+                self.stats['armateurs']['imported'] += 1
+            
+            if state:
+                self.sync_deletions(cursor, batch, state)
+            batch.finish()
+            self.checkpoint.complete('armateurs')
             logger.info(f"✅ {self.stats['armateurs']['imported']} compagnies importées")
             
         finally:
             cursor.close()
             self.close_db()
     
+    def load_armateurs_cache(self, companies: List[Dict]):
+        """Reprise: cache des armateurs relu depuis la base (une requête), dans l'ordre de la liste"""
+        noms = [self.clean_text(company['nom']).lower() for company in companies]
+        self.connect_db()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SELECT LOWER(nom), MIN(id) FROM armateurs WHERE LOWER(nom) = ANY(%s) GROUP BY 1",
+                           (noms,))
+            ids = dict(cursor.fetchall())
+        finally:
+            cursor.close()
+            self.close_db()
+        
+        for nom, company in zip(noms, companies):
+            if nom in ids:
+                self.armateurs_cache[ids[nom]] = {'nom': self.clean_text(company['nom']),
+                                                  'fleet_size': company.get('fleet_size', 10)}
+        logger.info(f"  🗂️ {len(self.armateurs_cache)} armateurs relus pour les navires")
+    
+    def sync_armateur(self, cursor, batch: BatchWriter, state: SyncState, index: DedupIndex,
+                      armateur: Armateur) -> bool:
+        """
+        Applique une compagnie déjà connue (inchangée ou mise à jour) et l'ajoute au cache des navires
+        
+        Returns:
+            False si la compagnie est nouvelle et doit être insérée
+        """
+        key = armateur.nom.lower()
+        digest = content_hash(armateur[1:9])
+        entry = state.get(key)
+        if entry:
+            row_id = entry.row_id
+        elif index.contains(nom=armateur.nom):
+            # Ligne importée avant la synchronisation: rattachée à sa clé
+            row_id = self.find_row_id(cursor, 'armateurs', 'nom', armateur.nom)
+            if row_id is None or row_id in state.rows:
+                return False
+        else:
+            return False
+        
+        if entry and entry.content_hash == digest and not entry.deleted:
+            self.stats['armateurs']['skipped'] += 1
+        else:
+            with batch.row(cursor):
+                cursor.execute("""
+                    UPDATE armateurs
+                    SET nom = %s, abreviation = %s, ville = %s, pays = %s, siteweb = %s,
+                        telephone = %s, email = %s, notes = %s, isactive = true, updatedat = NOW()
+                    WHERE id = %s
+                """, (*armateur[1:9], row_id))
+            state.mark(key, row_id, digest)
+            self.stats['armateurs']['updated'] += 1
+            logger.info(f"  🔄 {armateur.nom} mis à jour")
+        
+        self.armateurs_cache[row_id] = {'nom': armateur.nom, 'fleet_size': armateur.fleet_size}
+        return True
+    
     def import_clean_vessels(self):
         """Importe les navires RÉELS liés aux compagnies"""
         print("="*80)
         logger.info("⛴️ IMPORTATION DES NAVIRES RÉELS")
         print("="*80)
         
+        if self.checkpoint.is_done('navires'):
+            logger.info("  ⏭️ Déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
         if not self.armateurs_cache:
             logger.error("❌ Aucun armateur en cache - importer les armateurs d'abord")
             return
         
+        # Reprise: compagnies dont la flotte a déjà été validée
+        _, resume_key = self.checkpoint.resume_from('navires')
+        skipping = resume_key is not None and any(
+            info['nom'] == resume_key for info in self.armateurs_cache.values())
+        
         self.connect_db()
         cursor = self.conn.cursor()
         
         try:
-            for armateur_id, armateur_info in self.armateurs_cache.items():
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('navires').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'navires', on_commit=self.checkpoint.committer('navires'))
+            state = SyncState('navires').load(cursor) if self.sync else None
+            
+            for position, (armateur_id, armateur_info) in enumerate(self.armateurs_cache.items()):
                 company_name = armateur_info['nom']
                 fleet_size = armateur_info['fleet_size']
                 
-                logger.info(f"  🚢 Import navires pour: {company_name}")
-                
                 vessels = self.get_vessels_for_company(company_name, fleet_size)
+                if skipping:
+                    skipping = company_name != resume_key
+                    if state:
+                        # Navires déjà synchronisés: présents dans la source, pas à désactiver
+                        state.seen.update(self.clean_text(v.libelle).lower() for v in vessels)
+                    continue
+                
+                logger.info(f"  🚢 Import navires pour: {company_name}")
+                pending: List[Navire] = []
                 
                 for vessel in vessels:
                     try:
-                        libelle = self.clean_text(vessel['libelle'])
-                        code_omi = vessel.get('code_omi', '')
+                        libelle = self.clean_text(vessel.libelle)
+                        code_omi = vessel.code_omi or ''
+                        
+                        # Synchronisation: navire déjà importé (clé = libellé normalisé)
+                        if state and self.sync_navire(cursor, batch, state, index,
+                                                      vessel._replace(libelle=libelle, code_omi=code_omi,
+                                                                      armateur_id=armateur_id)):
+                            continue
                         
                         # Générer code navire unique
                         if code_omi:
@@ -562,37 +663,87 @@ class VelosiCleanDataImporter:
                         else:
                             code = self.generate_clean_code(libelle, 'NAV')
                         
-                        # Vérifier unicité
-                        cursor.execute("SELECT id FROM navires WHERE code = %s", (code,))
-                        if cursor.fetchone():
+                        # Vérifier unicité (index en mémoire)
+                        if index.contains(code=code):
                             code = code[:8] + str(hash(libelle) % 99).zfill(2)
                         
-                        # Insérer
-                        cursor.execute("""
-                            INSERT INTO navires
-                            (code, libelle, code_omi, armateur_id, longueur, largeur,
-                             statut, created_at, updated_at)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
-                        """, (code, libelle, code_omi, armateur_id, 
-                              vessel.get('longueur'), vessel.get('largeur'),
-                              vessel.get('statut', 'actif')))
-                        
-                        self.conn.commit()
-                        self.stats['navires']['imported'] += 1
+                        index.add(code=code, libelle=libelle, code_omi=code_omi)
+                        pending.append(vessel._replace(code=code, libelle=libelle, code_omi=code_omi,
+                                                       armateur_id=armateur_id))
                         
                     except Exception as e:
-                        logger.error(f"    ❌ Erreur navire {vessel.get('libelle', 'Unknown')}: {e}")
+                        batch.raise_if_lost(e)
+                        logger.error(f"    ❌ Erreur navire {vessel.libelle}: {e}")
                         self.stats['navires']['errors'] += 1
-                        self.conn.rollback()
                 
-                logger.info(f"    ✅ {len(vessels)} navires importés pour {company_name}")
+                # Insérer la flotte de la compagnie par pages multi-lignes (validée avec le COMMIT suivant)
+                self.checkpoint.advance('navires', position + 1, company_name)
+                ids = batch.insert_values(cursor, """
+                    INSERT INTO navires
+                    (code, libelle, code_omi, armateur_id, longueur, largeur,
+                     statut, created_at, updated_at)
+                    VALUES %s
+                    RETURNING id
+                """, "(%s, %s, %s, %s, %s, %s, %s, NOW(), NOW())",
+                    [(n.code, n.libelle, n.code_omi, n.armateur_id, n.longueur, n.largeur, n.statut)
+                     for n in pending], self.values_page_size)
+                
+                if state:
+                    for navire_id, navire in zip(ids, pending):
+                        if navire_id is not None:
+                            state.mark(navire.libelle.lower(), navire_id, content_hash(navire[1:7]))
+                
+                imported = sum(1 for navire_id in ids if navire_id is not None)
+                self.stats['navires']['imported'] += imported
+                self.stats['navires']['errors'] += len(ids) - imported
+                
+                logger.info(f"    ✅ {imported} navires importés pour {company_name}")
             
+            if state:
+                self.sync_deletions(cursor, batch, state)
+            batch.finish()
+            self.checkpoint.complete('navires')
             logger.info(f"✅ Total: {self.stats['navires']['imported']} navires importés")
             
         finally:
             cursor.close()
             self.close_db()
     
+    def sync_navire(self, cursor, batch: BatchWriter, state: SyncState, index: DedupIndex,
+                    navire: Navire) -> bool:
+        """
+        Applique un navire déjà connu (inchangé ou mis à jour)
+        
+        Returns:
+            False si le navire est nouveau et doit être inséré
+        """
+        key = navire.libelle.lower()
+        digest = content_hash(navire[1:7])
+        entry = state.get(key)
+        if entry:
+            row_id = entry.row_id
+            if entry.content_hash == digest and not entry.deleted:
+                self.stats['navires']['skipped'] += 1
+                return True
+        elif index.contains(libelle=navire.libelle):
+            # Ligne importée avant la synchronisation: rattachée à sa clé
+            row_id = self.find_row_id(cursor, 'navires', 'libelle', navire.libelle)
+            if row_id is None or row_id in state.rows:
+                return False
+        else:
+            return False
+        
+        with batch.row(cursor):
+            cursor.execute("""
+                UPDATE navires
+                SET libelle = %s, nationalite = %s, code_omi = %s, armateur_id = %s,
+                    longueur = %s, largeur = %s, statut = 'actif', updated_at = NOW()
+                WHERE id = %s
+            """, (*navire[1:7], row_id))
+        state.mark(key, row_id, digest)
+        self.stats['navires']['updated'] += 1
+        return True
+    
     # ==================== EXÉCUTION ====================
     
     def clean_and_import_all(self):
@@ -603,10 +754,16 @@ class VelosiCleanDataImporter:
         logger.info("🧹 NETTOYAGE ET IMPORTATION DE DONNÉES PROPRES")
         print("="*80)
         
-        # 1. NETTOYAGE
-        logger.info("\n📋 ÉTAPE 1: NETTOYAGE DES DONNÉES EXISTANTES")
-        self.delete_all_navires()
-        self.delete_all_armateurs()
+        # 1. NETTOYAGE (remplacé par la synchronisation incrémentale: les ids restent stables)
+        if self.sync:
+            logger.info("\n📋 ÉTAPE 1: SYNCHRONISATION INCRÉMENTALE (aucune suppression)")
+        elif self.checkpoint.is_done('nettoyage'):
+            logger.info("\n📋 ÉTAPE 1: NETTOYAGE déjà effectué (--resume)")
+        else:
+            logger.info("\n📋 ÉTAPE 1: NETTOYAGE DES DONNÉES EXISTANTES")
+            self.delete_all_navires()
+            self.delete_all_armateurs()
+            self.checkpoint.complete('nettoyage')
         
         # 2. IMPORTATION PROPRE
         logger.info("\n📋 ÉTAPE 2: IMPORTATION DE DONNÉES RÉELLES")
@@ -625,11 +782,13 @@ class VelosiCleanDataImporter:
         logger.info("📋 Armateurs:")
         logger.info(f"  🗑️ Supprimés: {self.stats['armateurs']['deleted']}")
         logger.info(f"  ✅ Importés: {self.stats['armateurs']['imported']}")
+        logger.info(f"  🔄 Mis à jour: {self.stats['armateurs']['updated']}")
         logger.info(f"  ❌ Erreurs: {self.stats['armateurs']['errors']}")
         logger.info("")
         logger.info("📋 Navires:")
         logger.info(f"  🗑️ Supprimés: {self.stats['navires']['deleted']}")
         logger.info(f"  ✅ Importés: {self.stats['navires']['imported']}")
+        logger.info(f"  🔄 Mis à jour: {self.stats['navires']['updated']}")
         logger.info(f"  ❌ Erreurs: {self.stats['navires']['errors']}")
         print("="*80)
         logger.info("✅ Nettoyage et importation terminés!")
@@ -648,6 +807,13 @@ if __name__ == "__main__":
     parser.add_argument('--db-user', default='postgres', help='Utilisateur PostgreSQL')
     parser.add_argument('--db-password', required=True, help='Mot de passe PostgreSQL')
     parser.add_argument('--db-port', default='5432', help='Port PostgreSQL')
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY,
+                        help=f'Lignes écrites entre deux COMMIT (défaut: {DEFAULT_COMMIT_EVERY})')
+    parser.add_argument('--sync', action='store_true',
+                        help='Synchronisation incrémentale (migration 011): différences seulement, aucune suppression')
+    parser.add_argument('--values-page-size', type=int, default=DEFAULT_VALUES_PAGE_SIZE,
+                        help=f'Lignes par INSERT multi-lignes, 1 = une requête par ligne (défaut: {DEFAULT_VALUES_PAGE_SIZE})')
+    add_checkpoint_arguments(parser, 'data_importer_clean')
     
     args = parser.parse_args()
     
@@ -659,5 +825,8 @@ if __name__ == "__main__":
         'port': args.db_port
     }
     
-    importer = VelosiCleanDataImporter(db_config)
+    importer = VelosiCleanDataImporter(db_config, commit_every=args.commit_every,
+                                       values_page_size=args.values_page_size, sync=args.sync,
+                                       checkpoint=checkpoint_from_args(args))
     importer.clean_and_import_all()
+    importer.checkpoint.finish(['armateurs', 'navires'])
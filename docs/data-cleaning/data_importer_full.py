@@ -3,13 +3,29 @@ Script d'importation COMPLÈTE avec APIs MONDIALES ROBUSTES
 Importe TOUS les armateurs et navires disponibles depuis plusieurs sources internationales
 """
 
-import requests
 import psycopg2
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
 from datetime import datetime
-import time
-import re
+from itertools import chain
+from operator import itemgetter
+
+from dedup_index import DedupIndex
+from armateur_resolver import ArmateurResolver, has_qid_column
+from batch_writer import DEFAULT_COMMIT_EVERY, DEFAULT_VALUES_PAGE_SIZE, BatchWriter
+from checkpoint import ImportCheckpoint, add_checkpoint_arguments, checkpoint_from_args
+from code_allocator import CodeAllocator
+from countries import country_code, french_name
+from entity_grouping import EntityGrouper, source_offsets
+from label_hydration import LabelCache, LabelHydrator, add_label_arguments, label_cache_from_args
+from normalization_pool import NormalizationPool
+from query_planner import PARTITION_MODES, WIKIDATA_MAX_CONCURRENT, QueryPlanner
+from sparql_client import RESULT_FORMATS, SparqlPager, id_only, with_modified
+from sync_state import SyncState, content_hash, parse_modified, wikidata_qid
+from records import Armateur, Navire
+from text_normalization import abbreviation, clean_code, clean_text, normalize_country
+from http_cache import ResponseCache, add_cache_arguments, cache_from_args
+from http_client import HttpClient
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,32 +34,74 @@ logger = logging.getLogger(__name__)
 class VelosiFullDataImporter:
     """Importateur COMPLET avec APIs mondiales robustes"""
     
-    def __init__(self, db_config: Dict[str, str]):
+    def __init__(self, db_config: Dict[str, str], page_size: int = 1000, concurrency: int = 3,
+                 cache: Optional[ResponseCache] = None, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 values_page_size: int = DEFAULT_VALUES_PAGE_SIZE, code_sequence: bool = False,
+                 sync: bool = False, checkpoint: Optional[ImportCheckpoint] = None,
+                 workers: Optional[int] = None, partition: Optional[str] = None,
+                 hydrate_labels: bool = False, label_cache: Optional[LabelCache] = None,
+                 result_format: str = 'json'):
         self.db_config = db_config
         self.conn = None
+        self.commit_every = commit_every
+        self.values_page_size = values_page_size
+        self.code_sequence = code_sequence
+        
+        # Synchronisation incrémentale (migration 011) au lieu de supprimer et recharger les tables
+        self.sync = sync
+        
+        # Points de reprise (--resume), écrits à chaque COMMIT
+        self.checkpoint = checkpoint or ImportCheckpoint()
+        
+        # Processus de normalisation (None = dans la boucle d'écriture, 0 = un par cœur)
+        self.workers = workers
         
         # URLs des APIs mondiales
         self.wikidata_sparql_url = "https://query.wikidata.org/sparql"
         
+        # Session HTTP partagée + requêtes paginées (pages triées par ?item, plusieurs pages en parallèle)
+        self.http = HttpClient(cache=cache, pool_size=max(concurrency, WIKIDATA_MAX_CONCURRENT))
+        self.sparql = SparqlPager(self.wikidata_sparql_url, page_size=page_size,
+                                  concurrency=concurrency, timeout=120, http=self.http,
+                                  result_format=result_format)
+        
+        # --partition: requêtes découpées (branches UNION, pays) et recoupées en cas de délai dépassé
+        self.planner = QueryPlanner(self.sparql, by_country=partition == 'country') if partition else None
+        self.rows_source = self.planner or self.sparql
+        
+        # --hydrate-labels: SPARQL sans SERVICE wikibase:label, libellés par lots (cache SQLite)
+        if hydrate_labels:
+            self.rows_source = LabelHydrator(self.rows_source, self.http, label_cache, concurrency=concurrency)
+        
         # Cache armateurs (id -> info)
         self.armateurs_cache = {}
         
+        # Tables ayant la colonne wikidata_qid (migration 012), vérifié une fois par table
+        self.qid_columns: Dict[str, bool] = {}
+        
+        # Requêtes Wikidata lues jusqu'au bout (une erreur réseau arrête la lecture sans exception)
+        self.fetched = set()
+        
         # Statistiques
         self.stats = {
-            'armateurs': {'deleted': 0, 'imported': 0, 'skipped': 0, 'errors': 0},
-            'navires': {'deleted': 0, 'imported': 0, 'skipped': 0, 'errors': 0}
+            'armateurs': {'deleted': 0, 'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0},
+            'navires': {'deleted': 0, 'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
         }
     
+    def open_connection(self):
+        """Nouvelle connexion à la base de db_config"""
+        return psycopg2.connect(
+            host=self.db_config['host'],
+            database=self.db_config['database'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            port=self.db_config.get('port', 5432)
+        )
+    
     def connect_db(self):
         """Connexion DB"""
         try:
-            self.conn = psycopg2.connect(
-                host=self.db_config['host'],
-                database=self.db_config['database'],
-                user=self.db_config['user'],
-                password=self.db_config['password'],
-                port=self.db_config.get('port', 5432)
-            )
+            self.conn = self.open_connection()
             logger.info("✅ Connexion DB établie")
         except Exception as e:
             logger.error(f"❌ Erreur connexion: {e}")
@@ -56,60 +114,19 @@ class VelosiFullDataImporter:
     
     def clean_text(self, text: str) -> str:
         """Nettoie un texte"""
-        if not text:
-            return ""
-        text = re.sub(r'\s+', ' ', text.strip())
-        text = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', text)
-        return text
+        return clean_text(text)
     
     def normalize_country(self, country: str) -> str:
         """Normalise pays en français"""
-        if not country:
-            return ""
-        
-        mapping = {
-            'Denmark': 'Danemark', 'Switzerland': 'Suisse', 'France': 'France',
-            'China': 'Chine', "People's Republic of China": 'Chine',
-            'Germany': 'Allemagne', 'Japan': 'Japon', 'Taiwan': 'Taïwan',
-            'South Korea': 'Corée du Sud', 'Republic of Korea': 'Corée du Sud',
-            'Singapore': 'Singapour', 'Israel': 'Israël', 'Netherlands': 'Pays-Bas',
-            'United States': 'États-Unis', 'USA': 'États-Unis', 'US': 'États-Unis',
-            'United Kingdom': 'Royaume-Uni', 'UK': 'Royaume-Uni', 'England': 'Royaume-Uni',
-            'Norway': 'Norvège', 'Sweden': 'Suède', 'Belgium': 'Belgique',
-            'Italy': 'Italie', 'Spain': 'Espagne', 'Greece': 'Grèce',
-            'Turkey': 'Turquie', 'Türkiye': 'Turquie', 'Hong Kong': 'Hong Kong',
-            'India': 'Inde', 'United Arab Emirates': 'Émirats Arabes Unis',
-            'Panama': 'Panama', 'Cyprus': 'Chypre', 'Marshall Islands': 'Îles Marshall',
-            'Liberia': 'Libéria', 'Malta': 'Malte', 'Bahamas': 'Bahamas',
-            'Russia': 'Russie', 'Russian Federation': 'Russie',
-            'Canada': 'Canada', 'Mexico': 'Mexique', 'Brazil': 'Brésil',
-            'Argentina': 'Argentine', 'Chile': 'Chili', 'Australia': 'Australie',
-            'South Africa': 'Afrique du Sud', 'Egypt': 'Égypte',
-            'Saudi Arabia': 'Arabie Saoudite', 'Iran': 'Iran', 'Iraq': 'Irak',
-            'Indonesia': 'Indonésie', 'Malaysia': 'Malaisie', 'Thailand': 'Thaïlande',
-            'Vietnam': 'Vietnam', 'Philippines': 'Philippines', 'Pakistan': 'Pakistan',
-        }
-        return mapping.get(country, country)
+        return normalize_country(country)
     
     def generate_clean_code(self, name: str, prefix: str = "ARM") -> str:
         """Génère code propre (max 10 car)"""
-        if not name:
-            return prefix + "000"
-        clean = re.sub(r'[^A-Za-z0-9]', '', name.upper())
-        code = clean[:6] if len(clean) >= 6 else clean
-        return code[:10]
+        return clean_code(name, prefix)
     
     def generate_abbreviation(self, name: str) -> str:
         """Génère abréviation"""
-        if not name:
-            return ""
-        common = {'LINE', 'LINES', 'SHIPPING', 'MARINE', 'MARITIME', 'CO', 'LTD', 
-                 'COMPANY', 'CORPORATION', 'GROUP', 'INTERNATIONAL', 'INC', 'LLC'}
-        words = [w for w in name.upper().split() if w not in common and len(w) > 1]
-        if not words:
-            words = name.upper().split()[:2]
-        abbrev = ''.join([w[0] for w in words[:5]])
-        return abbrev[:10]
+        return abbreviation(name)
     
     # ==================== NETTOYAGE ====================
     
@@ -136,6 +153,7 @@ class VelosiFullDataImporter:
             logger.info(f"  ✅ {armateurs_count} armateurs supprimés")
             
             self.conn.commit()
+            self.checkpoint.complete('nettoyage')
             
         except Exception as e:
             logger.error(f"  ❌ Erreur: {e}")
@@ -144,25 +162,122 @@ class VelosiFullDataImporter:
             cursor.close()
             self.close_db()
     
+    # ==================== SYNCHRONISATION ====================
+    
+    def load_sync_state(self, entity: str) -> SyncState:
+        """Empreintes de la dernière synchronisation (avant la requête: point de reprise)"""
+        self.connect_db()
+        cursor = self.conn.cursor()
+        try:
+            return SyncState(entity).load(cursor)
+        finally:
+            cursor.close()
+            self.close_db()
+    
+    def stores_qid(self, cursor, table: str) -> bool:
+        """Vrai si les QID Wikidata sont écrits dans la table (migration 012 appliquée)"""
+        if table not in self.qid_columns:
+            self.qid_columns[table] = has_qid_column(cursor, table)
+            if not self.qid_columns[table]:
+                logger.warning(f"  ⚠️ {table}.wikidata_qid absente (migration 012): QID non enregistrés")
+        return self.qid_columns[table]
+    
+    def backfill_qid(self, cursor, table: str, row_id: int, qid: Optional[str]):
+        """Renseigne le QID d'une ligne importée avant la migration 012 (s'il n'est pas déjà pris)"""
+        cursor.execute(f"""
+            UPDATE {table} t SET wikidata_qid = %s
+            WHERE t.id = %s AND t.wikidata_qid IS NULL AND %s IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM {table} o
+                              WHERE o.organisation_id = t.organisation_id AND o.wikidata_qid = %s)
+        """, (qid, row_id, qid, qid))
+    
+    def find_row_id(self, cursor, table: str, column: str, value: str) -> Optional[int]:
+        """Ligne existante non encore suivie (importation antérieure à la synchronisation)"""
+        cursor.execute(f"SELECT id FROM {table} WHERE LOWER({column}) = LOWER(%s) ORDER BY id LIMIT 1",
+                       (value,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def sync_deletions(self, cursor, batch: BatchWriter, state: SyncState, sparql_query: str):
+        """
+        Désactive les éléments disparus de Wikidata et réactive ceux qui sont revenus
+        La liste complète des QID est lue par une requête légère (sans libellés ni OPTIONAL)
+        """
+        entity = state.entity
+        # Requête entièrement traitée: nouveau point de reprise de la synchronisation
+        with batch.row(cursor, rows=0):
+            state.finish(cursor)
+        
+        try:
+            live = {wikidata_qid(row.item) for row in self.sparql.iter_rows(id_only(sparql_query))}
+        except Exception as e:
+            logger.error(f"  ❌ Liste des {entity} incomplète, désactivations ignorées: {e}")
+            return
+        if not live:
+            logger.warning(f"  ⚠️ Aucun {entity} dans la source, désactivations ignorées")
+            return
+        
+        with batch.row(cursor, rows=0):
+            deleted = state.soft_delete(cursor, state.missing(live))
+            revived = state.revive(cursor, state.revived(live))
+        self.stats[entity]['deleted'] += deleted
+        self.stats[entity]['updated'] += revived
+        logger.info(f"  🔁 {entity}: {deleted} désactivés, {revived} réactivés")
+    
     # ==================== WIKIDATA ARMATEURS ====================
     
-    def generate_armateur_code(self, cursor) -> str:
-        """Génère le prochain code ARM### automatiquement comme le backend"""
-        cursor.execute("""
-            SELECT code FROM armateurs 
-            WHERE code ~ '^ARM[0-9]+$' 
-            ORDER BY CAST(SUBSTRING(code FROM 4) AS INTEGER) DESC 
-            LIMIT 1
-        """)
-        result = cursor.fetchone()
-        
-        if result:
-            last_code = result[0]
-            number = int(last_code[3:]) + 1
-        else:
-            number = 1
+    def code_allocator(self, cursor, prefix: str, table: str) -> CodeAllocator:
+        """Codes PREFIX### comme le backend (ARM001, NAV001...): plus grand code lu une fois, puis compteur"""
+        if not self.code_sequence:
+            return CodeAllocator(prefix, table).load(cursor)
+        
+        # Séquence créée et recalée sur une connexion à part, validée aussitôt: visible des
+        # importations simultanées même si cette transaction d'importation est annulée
+        setup = self.open_connection()
+        try:
+            setup.autocommit = True
+            with setup.cursor() as setup_cursor:
+                return CodeAllocator(prefix, table, sequence=f"{table}_import_code_seq").load(cursor, setup_cursor)
+        finally:
+            setup.close()
+    
+    def iter_wikidata(self, sparql_query: str, label: str, start: int = 0,
+                      after: Optional[str] = None) -> Iterator[tuple]:
+        """
+        Parcourt une requête Wikidata page par page (arrêt propre en cas d'erreur),
+        un enregistrement par élément: les lignes d'un même ?item sont fusionnées
         
-        return f"ARM{number:03d}"
+        Args:
+            start: Reprise à la ligne `start` du résultat
+            after: Dernier ?item traité (recale la reprise si le résultat a changé)
+        """
+        grouper = EntityGrouper(label)
+        try:
+            yield from grouper.group(self.rows_source.iter_rows(sparql_query, start, after))
+            self.fetched.add(label)
+            logger.info(f"  ✅ {grouper.entities} {label} trouvés sur Wikidata")
+            grouper.log_stats()
+        except Exception as e:
+            logger.error(f"  ❌ Erreur Wikidata après {grouper.rows} lignes ({label}): {e}")
+    
+    def normalized(self, method: str, results: Iterable[tuple]) -> Iterator[Tuple[tuple, Any]]:
+        """
+        Produit (ligne SPARQL, self.<method>(ligne)) dans l'ordre source
+        
+        Avec --workers, la normalisation tourne dans un ProcessPoolExecutor (un importateur
+        par processus); une exception de normalisation est produite à la place du résultat.
+        """
+        if self.workers is None:
+            prepare = getattr(self, method)
+            for item in results:
+                try:
+                    yield item, prepare(item)
+                except Exception as e:
+                    yield item, e
+            return
+        
+        with NormalizationPool(type(self), {'db_config': self.db_config}, self.workers) as pool:
+            yield from pool.imap(method, results)
     
     def import_all_shipping_companies_wikidata(self):
         """
@@ -173,9 +288,13 @@ class VelosiFullDataImporter:
         logger.info("🏢 IMPORTATION MASSIVE - COMPAGNIES MARITIMES MONDIALES")
         print("="*80)
         
+        if self.checkpoint.is_done('armateurs'):
+            logger.info("  ⏭️ Déjà importées lors de l'exécution interrompue (--resume)")
+            return
+        
         # Requête SPARQL pour TOUTES les compagnies maritimes
         sparql_query = """
-        SELECT DISTINCT ?item ?itemLabel ?countryLabel ?cityLabel ?hqLabel ?website ?inception WHERE {
+        SELECT DISTINCT ?item ?itemLabel ?country ?countryLabel ?cityLabel ?hqLabel ?website ?inception WHERE {
           {
             # Compagnies de transport maritime
             ?item wdt:P31/wdt:P279* wd:Q1792644.
@@ -216,30 +335,24 @@ class VelosiFullDataImporter:
           
           SERVICE wikibase:label { bd:serviceParam wikibase:language "en,fr,de,es,zh,ja". }
         }
-        ORDER BY ?countryLabel ?itemLabel
-        LIMIT 5000
         """
         
-        try:
-            logger.info("📡 Requête Wikidata (limite 5000 compagnies)...")
-            response = requests.get(
-                self.wikidata_sparql_url,
-                params={'query': sparql_query, 'format': 'json'},
-                headers={'User-Agent': 'VelosiERP/2.0'},
-                timeout=60
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get('results', {}).get('bindings', [])
-            logger.info(f"  ✅ {len(results)} compagnies trouvées sur Wikidata")
-            
-            if len(results) == 0:
-                logger.warning("  ⚠️ Aucune compagnie - fallback...")
-                return
-            
-        except Exception as e:
-            logger.error(f"  ❌ Erreur Wikidata: {e}")
+        # Synchronisation: seuls les éléments modifiés depuis la dernière importation sont demandés
+        state = self.load_sync_state('armateurs') if self.sync else None
+        query = with_modified(sparql_query, state.watermark) if state else sparql_query
+        
+        # Reprise: lignes déjà validées lors de l'exécution interrompue non redemandées
+        resume_offset, resume_key = self.checkpoint.resume_from('armateurs')
+        
+        logger.info(f"📡 Requête Wikidata paginée (pages de {self.sparql.page_size} compagnies)...")
+        results = self.iter_wikidata(query, 'compagnies', resume_offset, resume_key)
+        first = next(results, None)
+        if first is not None:
+            results = chain([first], results)
+        elif state:
+            logger.info("  ✅ Aucune compagnie modifiée depuis la dernière synchronisation")
+        else:
+            logger.warning("  ⚠️ Aucune compagnie - fallback...")
             return
         
         # Import dans DB
@@ -247,95 +360,186 @@ class VelosiFullDataImporter:
         cursor = self.conn.cursor()
         
         try:
-            for item in results:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('armateurs').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'armateurs', on_commit=self.checkpoint.committer('armateurs'))
+            codes = self.code_allocator(cursor, 'ARM', 'armateurs')
+            pending: List[Armateur] = []
+            sources: List[tuple] = []
+            
+            for offset, (item, armateur) in source_offsets(self.normalized('prepare_armateur', results),
+                                                           resume_offset, row=itemgetter(0)):
                 try:
-                    # Extraction données
-                    nom = self.clean_text(item.get('itemLabel', {}).get('value', ''))
-                    
-                    # Ignorer Q-codes
-                    if nom.startswith('Q') and nom[1:].isdigit():
+                    if isinstance(armateur, Exception):
+                        raise armateur
+                    if not armateur:
                         continue
                     
-                    # Pays
-                    pays = item.get('countryLabel', {}).get('value')
-                    if not pays or pays.startswith('Q'):
-                        continue
-                    pays = self.normalize_country(pays)
-                    
-                    # Ville
-                    ville = item.get('cityLabel', {}).get('value') or item.get('hqLabel', {}).get('value')
-                    if ville and (ville.startswith('Q') or len(ville) > 100):
-                        ville = None
-                    ville = self.clean_text(ville) if ville else None
-                    
-                    # Site web
-                    siteweb = self.clean_text(item.get('website', {}).get('value', ''))
-                    if len(siteweb) > 150:
-                        siteweb = None
-                    
-                    # Abréviation (l'ancien code devient abréviation)
-                    abreviation = self.generate_abbreviation(nom)
+                    if state:
+                        # Élément déjà traité pendant cette synchronisation
+                        key = wikidata_qid(item.item)
+                        if key in state.seen:
+                            continue
+                        source = (key, content_hash(armateur[1:6]), parse_modified(item.modified))
+                        if self.sync_armateur(cursor, batch, state, index, armateur, source):
+                            continue
                     
-                    # Vérifier existence
-                    cursor.execute(
-                        "SELECT id FROM armateurs WHERE LOWER(nom) = LOWER(%s) LIMIT 1",
-                        (nom,)
-                    )
-                    if cursor.fetchone():
+                    # Vérifier existence (index en mémoire, lignes en attente comprises)
+                    if index.contains(nom=armateur.nom):
                         self.stats['armateurs']['skipped'] += 1
                         continue
                     
-                    # Générer code automatiquement comme le backend (ARM001, ARM002...)
-                    code = self.generate_armateur_code(cursor)
-                    
-                    # Insert
-                    cursor.execute("""
-                        INSERT INTO armateurs 
-                        (code, nom, abreviation, ville, pays, siteweb, isactive, createdat, updatedat)
-                        VALUES (%s, %s, %s, %s, %s, %s, true, NOW(), NOW())
-                        RETURNING id
-                    """, (code, nom, abreviation, ville, pays, siteweb))
-                    
-                    armateur_id = cursor.fetchone()[0]
-                    self.conn.commit()
-                    
-                    # Cache
-                    self.armateurs_cache[armateur_id] = {'nom': nom, 'pays': pays}
-                    
-                    self.stats['armateurs']['imported'] += 1
-                    
-                    if self.stats['armateurs']['imported'] % 100 == 0:
-                        logger.info(f"  📦 {self.stats['armateurs']['imported']} compagnies importées...")
+                    index.add(nom=armateur.nom)
+                    pending.append(armateur)
+                    if state:
+                        # Empreinte ajoutée avec sa ligne: sources[i] reste celle de pending[i]
+                        sources.append(source)
+                    if len(pending) >= self.values_page_size:
+                        # Position avancée juste avant l'écriture de la page (le COMMIT suivant l'inclut)
+                        self.checkpoint.advance('armateurs', offset, item.item)
+                        self.insert_armateurs(cursor, batch, index, codes, pending, state, sources)
+                        pending, sources = [], []
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     self.stats['armateurs']['errors'] += 1
-                    self.conn.rollback()
             
+            self.insert_armateurs(cursor, batch, index, codes, pending, state, sources)
+            completed = 'compagnies' in self.fetched
+            if state and completed:
+                self.sync_deletions(cursor, batch, state, sparql_query)
+            batch.finish()
+            if completed:
+                self.checkpoint.complete('armateurs')
             logger.info(f"✅ TOTAL: {self.stats['armateurs']['imported']} compagnies importées")
             
         finally:
             cursor.close()
             self.close_db()
     
-    # ==================== WIKIDATA NAVIRES ====================
+    def insert_armateurs(self, cursor, batch: BatchWriter, index: DedupIndex, codes: CodeAllocator,
+                         pending: List[Armateur], state: Optional[SyncState] = None,
+                         sources: Optional[List[tuple]] = None):
+        """
+        Insère une page d'armateurs en un INSERT multi-lignes et alimente armateurs_cache
+        (et les empreintes de synchronisation: sources[i] = (QID, hash, dateModified) de pending[i])
+        """
+        if not pending:
+            return
+        
+        # Codes consécutifs dans l'ordre d'insertion (le backend repart du code du dernier id)
+        rows = [armateur._replace(code=code) for armateur, code in zip(pending, codes.reserve(len(pending)))]
+        
+        # QID de la compagnie (migration 012): clé de jointure des navires vers leur armateur
+        if self.stores_qid(cursor, 'armateurs'):
+            ids = batch.insert_values(cursor, """
+                INSERT INTO armateurs 
+                (code, nom, abreviation, ville, pays, siteweb, wikidata_qid, isactive, createdat, updatedat)
+                VALUES %s
+                RETURNING id
+            """, "(%s, %s, %s, %s, %s, %s, %s, true, NOW(), NOW())",
+                [(*armateur[:6], armateur.wikidata_qid) for armateur in rows], self.values_page_size)
+        else:
+            ids = batch.insert_values(cursor, """
+                INSERT INTO armateurs 
+                (code, nom, abreviation, ville, pays, siteweb, isactive, createdat, updatedat)
+                VALUES %s
+                RETURNING id
+            """, "(%s, %s, %s, %s, %s, %s, true, NOW(), NOW())",
+                [armateur[:6] for armateur in rows], self.values_page_size)
+        
+        for i, (armateur_id, armateur) in enumerate(zip(ids, rows)):
+            if armateur_id is None:
+                self.stats['armateurs']['errors'] += 1
+                continue
+            index.add(code=armateur.code)
+            if state:
+                key, digest, modified = sources[i]
+                state.mark(key, armateur_id, digest, modified)
+            
+            # Cache
+            self.armateurs_cache[armateur_id] = {'nom': armateur.nom, 'pays': armateur.pays}
+            
+            self.stats['armateurs']['imported'] += 1
+            
+            if self.stats['armateurs']['imported'] % 100 == 0:
+                logger.info(f"  📦 {self.stats['armateurs']['imported']} compagnies importées...")
+        
+        if state:
+            with batch.row(cursor, rows=0):
+                state.flush(cursor)
     
-    def generate_navire_code(self, cursor) -> str:
-        """Génère le prochain code NAV### automatiquement comme le backend"""
-        cursor.execute("""
-            SELECT code FROM navires 
-            WHERE code ~ '^NAV[0-9]+$' 
-            ORDER BY CAST(SUBSTRING(code FROM 4) AS INTEGER) DESC 
-            LIMIT 1
-        """)
-        result = cursor.fetchone()
-        
-        if result:
-            last_code = result[0]
-            number = int(last_code[3:]) + 1
+    def sync_armateur(self, cursor, batch: BatchWriter, state: SyncState, index: DedupIndex,
+                      armateur: Armateur, source: tuple) -> bool:
+        """
+        Applique un élément déjà connu (inchangé ou mis à jour)
+        
+        Returns:
+            False si l'armateur est nouveau et doit être inséré
+        """
+        key, digest, modified = source
+        entry = state.get(key)
+        if entry:
+            row_id = entry.row_id
+            if entry.content_hash == digest and not entry.deleted:
+                self.stats['armateurs']['skipped'] += 1
+                return True
+        elif index.contains(nom=armateur.nom):
+            # Ligne importée avant la synchronisation: rattachée à son QID
+            row_id = self.find_row_id(cursor, 'armateurs', 'nom', armateur.nom)
+            if row_id is None or row_id in state.rows:
+                return False
+        else:
+            return False
+        
+        with batch.row(cursor):
+            cursor.execute("""
+                UPDATE armateurs
+                SET nom = %s, abreviation = %s, ville = %s, pays = %s, siteweb = %s,
+                    isactive = true, updatedat = NOW()
+                WHERE id = %s
+            """, (*armateur[1:6], row_id))
+            if self.stores_qid(cursor, 'armateurs'):
+                self.backfill_qid(cursor, 'armateurs', row_id, armateur.wikidata_qid)
+        state.mark(key, row_id, digest, modified)
+        self.armateurs_cache[row_id] = {'nom': armateur.nom, 'pays': armateur.pays}
+        self.stats['armateurs']['updated'] += 1
+        return True
+    
+    def prepare_armateur(self, item: tuple) -> Optional[Armateur]:
+        """Convertit un résultat SPARQL en Armateur (code attribué à l'insertion, None si ignoré)"""
+        nom = self.clean_text(item.itemLabel or '')
+        
+        # Ignorer Q-codes
+        if nom.startswith('Q') and nom[1:].isdigit():
+            return None
+        
+        # Pays: QID d'abord (indépendant de la langue du libellé), libellé sinon
+        pays = item.countryLabel
+        code = country_code(item.country)
+        if code:
+            pays = french_name(code)
+        elif not pays or pays.startswith('Q'):
+            return None
         else:
-            number = 1
+            pays = self.normalize_country(pays)
         
-        return f"NAV{number:03d}"
+        # Ville
+        ville = item.cityLabel or item.hqLabel
+        if ville and (ville.startswith('Q') or len(ville) > 100):
+            ville = None
+        ville = self.clean_text(ville) if ville else None
+        
+        # Site web
+        siteweb = self.clean_text(item.website or '')
+        if len(siteweb) > 150:
+            siteweb = None
+        
+        # Abréviation (l'ancien code devient abréviation)
+        return Armateur(None, nom, self.generate_abbreviation(nom), ville, pays, siteweb,
+                        wikidata_qid=wikidata_qid(item.item))
+    
+    # ==================== WIKIDATA NAVIRES ====================
     
     def import_all_vessels_wikidata(self):
         """
@@ -345,9 +549,13 @@ class VelosiFullDataImporter:
         logger.info("⛴️ IMPORTATION MASSIVE - NAVIRES COMMERCIAUX MONDIAUX")
         print("="*80)
         
+        if self.checkpoint.is_done('navires'):
+            logger.info("  ⏭️ Déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
         # Requête pour TOUS les navires commerciaux
         sparql_query = """
-        SELECT DISTINCT ?item ?itemLabel ?imoNumber ?flagLabel ?operatorLabel 
+        SELECT DISTINCT ?item ?itemLabel ?imoNumber ?flag ?flagLabel ?operator ?operatorLabel 
                ?length ?beam ?draft ?tonnage WHERE {
           {
             # Porte-conteneurs
@@ -386,30 +594,24 @@ class VelosiFullDataImporter:
           
           SERVICE wikibase:label { bd:serviceParam wikibase:language "en,fr,de,es,zh". }
         }
-        ORDER BY ?operatorLabel ?itemLabel
-        LIMIT 10000
         """
         
-        try:
-            logger.info("📡 Requête Wikidata (limite 10000 navires)...")
-            response = requests.get(
-                self.wikidata_sparql_url,
-                params={'query': sparql_query, 'format': 'json'},
-                headers={'User-Agent': 'VelosiERP/2.0'},
-                timeout=120
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get('results', {}).get('bindings', [])
-            logger.info(f"  ✅ {len(results)} navires trouvés sur Wikidata")
-            
-            if len(results) == 0:
-                logger.warning("  ⚠️ Aucun navire trouvé")
-                return
-            
-        except Exception as e:
-            logger.error(f"  ❌ Erreur Wikidata: {e}")
+        # Synchronisation: seuls les éléments modifiés depuis la dernière importation sont demandés
+        state = self.load_sync_state('navires') if self.sync else None
+        query = with_modified(sparql_query, state.watermark) if state else sparql_query
+        
+        # Reprise: lignes déjà validées lors de l'exécution interrompue non redemandées
+        resume_offset, resume_key = self.checkpoint.resume_from('navires')
+        
+        logger.info(f"📡 Requête Wikidata paginée (pages de {self.sparql.page_size} navires)...")
+        results = self.iter_wikidata(query, 'navires', resume_offset, resume_key)
+        first = next(results, None)
+        if first is not None:
+            results = chain([first], results)
+        elif state:
+            logger.info("  ✅ Aucun navire modifié depuis la dernière synchronisation")
+        else:
+            logger.warning("  ⚠️ Aucun navire trouvé")
             return
         
         # Import dans DB
@@ -417,112 +619,181 @@ class VelosiFullDataImporter:
         cursor = self.conn.cursor()
         
         try:
-            # Charger cache armateurs depuis DB
-            if not self.armateurs_cache:
-                cursor.execute("SELECT id, nom FROM armateurs")
-                for row in cursor.fetchall():
-                    self.armateurs_cache[row[0]] = {'nom': row[1]}
+            # Index opérateur -> armateur (QID, noms, abréviations, codes) construit une seule fois
+            resolver = ArmateurResolver().load(cursor)
+            store_qid = self.stores_qid(cursor, 'navires')
+            qid_column, qid_value = (', wikidata_qid', ', %s') if store_qid else ('', '')
             
-            for item in results:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('navires').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'navires', on_commit=self.checkpoint.committer('navires'))
+            codes = self.code_allocator(cursor, 'NAV', 'navires')
+            
+            for offset, (item, navire) in source_offsets(self.normalized('prepare_navire', results),
+                                                         resume_offset, row=itemgetter(0)):
+                # Position avancée avant l'écriture de la ligne (le COMMIT suivant l'inclut)
+                self.checkpoint.advance('navires', offset, item.item)
                 try:
-                    # Libellé navire
-                    libelle = self.clean_text(item.get('itemLabel', {}).get('value', ''))
-                    
-                    # Ignorer Q-codes et noms trop courts
-                    if libelle.startswith('Q') and libelle[1:].isdigit():
+                    if isinstance(navire, Exception):
+                        raise navire
+                    if not navire:
                         continue
-                    if len(libelle) < 3:
-                        continue
-                    
-                    # Code IMO
-                    code_omi = item.get('imoNumber', {}).get('value')
-                    if code_omi and not code_omi.isdigit():
-                        code_omi = None
+                    libelle, nationalite, code_omi = navire.libelle, navire.nationalite, navire.code_omi
                     
-                    # Nationalité (pavillon)
-                    nationalite = item.get('flagLabel', {}).get('value')
-                    if nationalite and not nationalite.startswith('Q'):
-                        nationalite = self.normalize_country(nationalite)
-                    else:
-                        nationalite = None
-                    
-                    # Opérateur - chercher armateur correspondant
-                    operateur_nom = item.get('operatorLabel', {}).get('value')
+                    # Opérateur - armateur de même QID, sinon par nom
                     armateur_id = None
+                    if navire.operateur or navire.operateur_qid:
+                        match = resolver.resolve(navire.operateur, navire.operateur_qid)
+                        if match:
+                            armateur_id = match.armateur_id
+                            if match.ambiguous:
+                                logger.warning(f"  ⚠️ Opérateur ambigu: {navire.operateur} -> {match.nom} (score {match.score})")
                     
-                    if operateur_nom and not operateur_nom.startswith('Q'):
-                        operateur_clean = self.clean_text(operateur_nom)
-                        
-                        # Chercher dans cache
-                        for aid, ainfo in self.armateurs_cache.items():
-                            if operateur_clean.lower() in ainfo['nom'].lower() or \
-                               ainfo['nom'].lower() in operateur_clean.lower():
-                                armateur_id = aid
-                                break
-                        
-                        # Sinon chercher en DB
-                        if not armateur_id:
-                            cursor.execute(
-                                "SELECT id FROM armateurs WHERE LOWER(nom) LIKE LOWER(%s) LIMIT 1",
-                                (f"%{operateur_clean[:20]}%",)
-                            )
-                            result = cursor.fetchone()
-                            if result:
-                                armateur_id = result[0]
-                    
-                    # Dimensions
-                    longueur = item.get('length', {}).get('value')
-                    largeur = item.get('beam', {}).get('value')
-                    tirant_eau = item.get('draft', {}).get('value')
-                    jauge_brute = item.get('tonnage', {}).get('value')
+                    source = None
+                    if state:
+                        # Élément déjà traité pendant cette synchronisation
+                        key = wikidata_qid(item.item)
+                        if key in state.seen:
+                            continue
+                        source = (key, content_hash(navire[1:]), parse_modified(item.modified))
+                        if self.sync_navire(cursor, batch, state, index, navire, armateur_id, source):
+                            continue
                     
-                    # Conversion en nombres
-                    try:
-                        longueur = float(longueur) if longueur else None
-                        largeur = float(largeur) if largeur else None
-                        tirant_eau = float(tirant_eau) if tirant_eau else None
-                        jauge_brute = int(float(jauge_brute)) if jauge_brute else None
-                    except:
-                        longueur = largeur = tirant_eau = jauge_brute = None
-                    
-                    # Générer code automatiquement comme le backend (NAV001, NAV002...)
-                    code = self.generate_navire_code(cursor)
-                    
-                    # Vérifier existence par nom
-                    cursor.execute(
-                        "SELECT id FROM navires WHERE LOWER(libelle) = LOWER(%s) LIMIT 1",
-                        (libelle,)
-                    )
-                    if cursor.fetchone():
+                    # Vérifier existence par nom (index en mémoire)
+                    if index.contains(libelle=libelle):
                         self.stats['navires']['skipped'] += 1
                         continue
                     
-                    # Insert avec clé étrangère armateur_id
-                    cursor.execute("""
-                        INSERT INTO navires
-                        (code, libelle, nationalite, code_omi, armateur_id, 
-                         longueur, largeur, tirant_eau, jauge_brute,
-                         statut, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'actif', NOW(), NOW())
-                    """, (code, libelle, nationalite, code_omi, armateur_id,
-                          longueur, largeur, tirant_eau, jauge_brute))
+                    # Code attribué comme le backend (NAV001, NAV002...), sans requête par ligne
+                    code = codes.next()
                     
-                    self.conn.commit()
+                    # Insert avec clé étrangère armateur_id (et QID du navire, migration 012)
+                    with batch.row(cursor):
+                        cursor.execute(f"""
+                            INSERT INTO navires
+                            (code, libelle, nationalite, code_omi, armateur_id, 
+                             longueur, largeur, tirant_eau, jauge_brute{qid_column},
+                             statut, created_at, updated_at)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s{qid_value}, 'actif', NOW(), NOW())
+                            RETURNING id
+                        """, (code, libelle, nationalite, code_omi, armateur_id,
+                              navire.longueur, navire.largeur, navire.tirant_eau, navire.jauge_brute,
+                              *((navire.wikidata_qid,) if store_qid else ())))
+                        if source:
+                            key, digest, modified = source
+                            state.mark(key, cursor.fetchone()[0], digest, modified)
+                    
+                    index.add(code=code, libelle=libelle, code_omi=code_omi)
                     self.stats['navires']['imported'] += 1
                     
                     if self.stats['navires']['imported'] % 200 == 0:
                         logger.info(f"  🚢 {self.stats['navires']['imported']} navires importés...")
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     self.stats['navires']['errors'] += 1
-                    self.conn.rollback()
             
+                if state and len(state.pending) >= self.values_page_size:
+                    with batch.row(cursor, rows=0):
+                        state.flush(cursor)
+            
+            if state:
+                with batch.row(cursor, rows=0):
+                    state.flush(cursor)
+            resolver.log_stats()
+            completed = 'navires' in self.fetched
+            if state and completed:
+                self.sync_deletions(cursor, batch, state, sparql_query)
+            batch.finish()
+            if completed:
+                self.checkpoint.complete('navires')
             logger.info(f"✅ TOTAL: {self.stats['navires']['imported']} navires importés")
             
         finally:
             cursor.close()
             self.close_db()
     
+    def sync_navire(self, cursor, batch: BatchWriter, state: SyncState, index: DedupIndex,
+                    navire: Navire, armateur_id: Optional[int], source: tuple) -> bool:
+        """
+        Applique un élément déjà connu (inchangé ou mis à jour)
+        
+        Returns:
+            False si le navire est nouveau et doit être inséré
+        """
+        key, digest, modified = source
+        entry = state.get(key)
+        if entry:
+            row_id = entry.row_id
+            if entry.content_hash == digest and not entry.deleted:
+                self.stats['navires']['skipped'] += 1
+                return True
+        elif index.contains(libelle=navire.libelle):
+            # Ligne importée avant la synchronisation: rattachée à son QID
+            row_id = self.find_row_id(cursor, 'navires', 'libelle', navire.libelle)
+            if row_id is None or row_id in state.rows:
+                return False
+        else:
+            return False
+        
+        with batch.row(cursor):
+            cursor.execute("""
+                UPDATE navires
+                SET libelle = %s, nationalite = %s, code_omi = %s, armateur_id = %s,
+                    longueur = %s, largeur = %s, tirant_eau = %s, jauge_brute = %s,
+                    statut = 'actif', updated_at = NOW()
+                WHERE id = %s
+            """, (navire.libelle, navire.nationalite, navire.code_omi, armateur_id, navire.longueur,
+                  navire.largeur, navire.tirant_eau, navire.jauge_brute, row_id))
+            if self.stores_qid(cursor, 'navires'):
+                self.backfill_qid(cursor, 'navires', row_id, navire.wikidata_qid)
+        state.mark(key, row_id, digest, modified)
+        self.stats['navires']['updated'] += 1
+        return True
+    
+    def prepare_navire(self, item: tuple) -> Optional[Navire]:
+        """Convertit un résultat SPARQL en Navire (code attribué à l'insertion, None si ignoré)"""
+        libelle = self.clean_text(item.itemLabel or '')
+        
+        # Ignorer Q-codes et noms trop courts
+        if libelle.startswith('Q') and libelle[1:].isdigit():
+            return None
+        if len(libelle) < 3:
+            return None
+        
+        # Code IMO
+        code_omi = item.imoNumber
+        if code_omi and not code_omi.isdigit():
+            code_omi = None
+        
+        # Nationalité (pavillon): QID d'abord, libellé sinon
+        nationalite = item.flagLabel
+        code = country_code(item.flag)
+        if code:
+            nationalite = french_name(code)
+        elif nationalite and not nationalite.startswith('Q'):
+            nationalite = self.normalize_country(nationalite)
+        else:
+            nationalite = None
+        
+        # Opérateur (résolu en armateur_id à l'insertion: QID d'abord, libellé sinon)
+        operateur = item.operatorLabel
+        operateur = self.clean_text(operateur) if operateur and not operateur.startswith('Q') else None
+        operateur_qid = wikidata_qid(item.operator)
+        
+        # Dimensions (conversion en nombres)
+        try:
+            longueur = float(item.length) if item.length else None
+            largeur = float(item.beam) if item.beam else None
+            tirant_eau = float(item.draft) if item.draft else None
+            jauge_brute = int(float(item.tonnage)) if item.tonnage else None
+        except ValueError:
+            longueur = largeur = tirant_eau = jauge_brute = None
+        
+        return Navire(None, libelle, nationalite, code_omi, longueur=longueur, largeur=largeur,
+                      operateur=operateur, tirant_eau=tirant_eau, jauge_brute=jauge_brute,
+                      wikidata_qid=wikidata_qid(item.item), operateur_qid=operateur_qid)
+    
     # ==================== EXÉCUTION ====================
     
     def import_all_data(self):
@@ -533,9 +804,14 @@ class VelosiFullDataImporter:
         logger.info("🌍 IMPORTATION MASSIVE MONDIALE - TOUTES LES DONNÉES")
         print("="*80)
         
-        # 1. Nettoyage
-        logger.info("\n📋 ÉTAPE 1/3: NETTOYAGE")
-        self.delete_all_data()
+        # 1. Nettoyage (remplacé par la synchronisation incrémentale: les ids restent stables)
+        if self.sync:
+            logger.info("\n📋 ÉTAPE 1/3: SYNCHRONISATION INCRÉMENTALE (aucune suppression)")
+        elif self.checkpoint.is_done('nettoyage'):
+            logger.info("\n📋 ÉTAPE 1/3: NETTOYAGE déjà effectué (--resume)")
+        else:
+            logger.info("\n📋 ÉTAPE 1/3: NETTOYAGE")
+            self.delete_all_data()
         
         # 2. Armateurs
         logger.info("\n📋 ÉTAPE 2/3: IMPORTATION ARMATEURS")
@@ -557,12 +833,14 @@ class VelosiFullDataImporter:
         logger.info("📋 Armateurs:")
         logger.info(f"  🗑️ Supprimés: {self.stats['armateurs']['deleted']}")
         logger.info(f"  ✅ Importés: {self.stats['armateurs']['imported']}")
+        logger.info(f"  🔄 Mis à jour: {self.stats['armateurs']['updated']}")
         logger.info(f"  ⏭️ Ignorés: {self.stats['armateurs']['skipped']}")
         logger.info(f"  ❌ Erreurs: {self.stats['armateurs']['errors']}")
         logger.info("")
         logger.info("📋 Navires:")
         logger.info(f"  🗑️ Supprimés: {self.stats['navires']['deleted']}")
         logger.info(f"  ✅ Importés: {self.stats['navires']['imported']}")
+        logger.info(f"  🔄 Mis à jour: {self.stats['navires']['updated']}")
         logger.info(f"  ⏭️ Ignorés: {self.stats['navires']['skipped']}")
         logger.info(f"  ❌ Erreurs: {self.stats['navires']['errors']}")
         print("="*80)
@@ -582,6 +860,28 @@ if __name__ == "__main__":
     parser.add_argument('--db-user', default='postgres')
     parser.add_argument('--db-password', required=True)
     parser.add_argument('--db-port', default='5432')
+    parser.add_argument('--page-size', type=int, default=1000,
+                        help='Nombre de lignes par page SPARQL (défaut: 1000)')
+    parser.add_argument('--concurrency', type=int, default=3,
+                        help='Pages SPARQL demandées simultanément (défaut: 3)')
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY,
+                        help=f'Lignes écrites entre deux COMMIT (défaut: {DEFAULT_COMMIT_EVERY})')
+    parser.add_argument('--code-sequence', action='store_true',
+                        help='Réserver les codes ARM/NAV par blocs sur une séquence Postgres (importations simultanées)')
+    parser.add_argument('--sync', action='store_true',
+                        help='Synchronisation incrémentale (migration 011): éléments modifiés seulement, aucune suppression')
+    parser.add_argument('--values-page-size', type=int, default=DEFAULT_VALUES_PAGE_SIZE,
+                        help=f'Lignes par INSERT multi-lignes, 1 = une requête par ligne (défaut: {DEFAULT_VALUES_PAGE_SIZE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processus de normalisation des lignes Wikidata, 0 = un par cœur (défaut: aucun)')
+    parser.add_argument('--partition', choices=PARTITION_MODES,
+                        help="Requêtes Wikidata découpées par branche UNION ('union') et par groupe de pays "
+                             "('country'), exécutées en parallèle et recoupées en cas de délai dépassé")
+    parser.add_argument('--result-format', choices=list(RESULT_FORMATS), default='json',
+                        help='Format des réponses Wikidata: csv / tsv plus compacts que json (défaut: json)')
+    add_cache_arguments(parser)
+    add_label_arguments(parser)
+    add_checkpoint_arguments(parser, 'data_importer_full')
     
     args = parser.parse_args()
     
@@ -593,5 +893,15 @@ if __name__ == "__main__":
         'port': args.db_port
     }
     
-    importer = VelosiFullDataImporter(db_config)
+    importer = VelosiFullDataImporter(db_config, page_size=args.page_size,
+                                      concurrency=args.concurrency, cache=cache_from_args(args),
+                                      commit_every=args.commit_every,
+                                      values_page_size=args.values_page_size,
+                                      code_sequence=args.code_sequence, sync=args.sync,
+                                      checkpoint=checkpoint_from_args(args), workers=args.workers,
+                                      partition=args.partition, hydrate_labels=args.hydrate_labels,
+                                      label_cache=label_cache_from_args(args),
+                                      result_format=args.result_format)
     importer.import_all_data()
+    importer.checkpoint.finish(['armateurs', 'navires'])
+    importer.http.log_stats()
@@ -3,15 +3,30 @@ Script d'importation de données depuis les APIs internationales - VERSION AMÉL
 Remplit les 4 tables (ports, aeroports, armateurs, navires) avec des données complètes et de qualité
 """
 
-import requests
 import psycopg2
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 import logging
 from datetime import datetime
-import time
 import re
 import json
 
+from bulk_loader import StagingBulkLoader, missing_required
+from dedup_index import DedupIndex
+from armateur_resolver import ArmateurResolver, has_qid_column
+from batch_writer import DEFAULT_COMMIT_EVERY, BatchWriter
+from checkpoint import ImportCheckpoint, add_checkpoint_arguments, checkpoint_from_args
+from upsert import UPSERT_MODES, arbitrated, conflict_outcome, on_conflict
+from import_pipeline import DEFAULT_STAGES, ImportPipeline
+from label_hydration import LabelCache, LabelHydrator, add_label_arguments, label_cache_from_args
+from query_planner import PARTITION_MODES, WIKIDATA_MAX_CONCURRENT, QueryPlanner
+from sparql_client import RESULT_FORMATS, SparqlPager, compact_rows, projected_variables
+from entity_grouping import EntityGrouper, source_offsets
+from records import Aeroport, Armateur, Navire, Port
+from sync_state import wikidata_qid
+from text_normalization import normalize_country
+from http_cache import ResponseCache, add_cache_arguments, cache_from_args
+from http_client import HttpClient
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -19,25 +34,60 @@ logger = logging.getLogger(__name__)
 class VelosiDataImporter:
     """Classe pour importer des données depuis les APIs internationales"""
     
-    def __init__(self, db_config: Dict[str, str]):
+    def __init__(self, db_config: Dict[str, str], bulk: bool = False,
+                 page_size: int = 1000, concurrency: int = 3, paging: str = 'offset',
+                 cache: Optional[ResponseCache] = None, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 upsert: Optional[str] = None, checkpoint: Optional[ImportCheckpoint] = None,
+                 partition: Optional[str] = None, hydrate_labels: bool = False,
+                 label_cache: Optional[LabelCache] = None, result_format: str = 'json'):
         """
         Initialise l'importateur
         
         Args:
             db_config: Configuration de la base de données PostgreSQL
+            bulk: Mode chargement en masse (COPY + INSERT ensembliste) au lieu de ligne par ligne
+            page_size: Nombre de lignes par page SPARQL
+            concurrency: Nombre maximal de pages SPARQL demandées simultanément
+            paging: Pagination 'offset' (pages parallèles) ou 'keyset' (curseur sur ?item)
+            cache: Cache disque des réponses HTTP (None = désactivé)
+            commit_every: Lignes insérées entre deux COMMIT (SAVEPOINT par ligne, hors mode bulk)
+            upsert: INSERT ... ON CONFLICT 'skip' (DO NOTHING) ou 'update' (DO UPDATE), None = désactivé
+                    (nécessite la migration 010)
+            checkpoint: Positions de reprise, écrites à chaque COMMIT (None = en mémoire seulement)
+            partition: Requêtes découpées en partitions parallèles, recoupées en cas de délai dépassé
+                       ('union': branches UNION, 'country': puis groupes de pays), None = désactivé
+            hydrate_labels: SPARQL sans SERVICE wikibase:label, libellés demandés à wbgetentities par lots de 50
+            label_cache: Cache SQLite des libellés QID (None = en mémoire pour cette exécution)
+            result_format: Format des réponses SPARQL ('json', 'csv' ou 'tsv': 3 à 5 fois plus compacts)
         """
         self.db_config = db_config
         self.conn = None
+        self.bulk = bulk
+        self.commit_every = commit_every
+        self.upsert = upsert
+        self.checkpoint = checkpoint or ImportCheckpoint()
+        
+        # Entités dont la requête Wikidata a été lue jusqu'au bout (ou remplacée par les données de secours)
+        self.fetched = set()
         
         # URLs des APIs
         self.wikidata_sparql_url = "https://query.wikidata.org/sparql"
+        self.http = HttpClient(cache=cache, user_agent='VelosiERP/1.0',
+                               pool_size=max(concurrency, WIKIDATA_MAX_CONCURRENT))
+        self.sparql = SparqlPager(self.wikidata_sparql_url, page_size=page_size,
+                                  concurrency=concurrency, user_agent='VelosiERP/1.0', mode=paging,
+                                  http=self.http, result_format=result_format)
+        self.planner = QueryPlanner(self.sparql, by_country=partition == 'country') if partition else None
+        self.rows_source = self.planner or self.sparql
+        if hydrate_labels:
+            self.rows_source = LabelHydrator(self.rows_source, self.http, label_cache, concurrency=concurrency)
         
         # Statistiques d'importation
         self.stats = {
-            'ports': {'imported': 0, 'skipped': 0, 'errors': 0},
-            'aeroports': {'imported': 0, 'skipped': 0, 'errors': 0},
-            'armateurs': {'imported': 0, 'skipped': 0, 'errors': 0},
-            'navires': {'imported': 0, 'skipped': 0, 'errors': 0}
+            'ports': {'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0},
+            'aeroports': {'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0},
+            'armateurs': {'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0},
+            'navires': {'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
         }
     
     def connect_db(self):
@@ -61,43 +111,34 @@ class VelosiDataImporter:
             self.conn.close()
             logger.info("🔒 Connexion fermée")
     
+    def bulk_import(self, entity: str, rows: List[tuple]):
+        """
+        Importe une entité en masse via COPY dans une table de staging
+        
+        Args:
+            entity: Nom de la table cible (ports, aeroports, armateurs, navires)
+            rows: Lignes normalisées (voir bulk_loader.ENTITY_SPECS)
+        """
+        self.connect_db()
+        try:
+            result = StagingBulkLoader(self.conn).load(entity, rows)
+            for key in ('imported', 'skipped', 'errors'):
+                self.stats[entity][key] += result[key]
+            if entity in self.fetched:
+                self.checkpoint.complete(entity)
+            logger.info(f"✅ {entity.capitalize()} (bulk): {result['imported']} importés, "
+                        f"{result['skipped']} ignorés, {result['errors']} erreurs")
+        except Exception as e:
+            logger.error(f"❌ Erreur import en masse {entity}: {e}")
+            self.conn.rollback()
+        finally:
+            self.close_db()
+    
     def normalize_country_name(self, country: str) -> str:
         """Normalise le nom du pays en français"""
         if not country:
             return "Inconnu"
-            
-        country_mapping = {
-            # Anglais vers français
-            'France': 'France', 'Spain': 'Espagne', 'Italy': 'Italie',
-            'Germany': 'Allemagne', 'Belgium': 'Belgique', 'Netherlands': 'Pays-Bas',
-            'United Kingdom': 'Royaume-Uni', 'UK': 'Royaume-Uni', 'England': 'Royaume-Uni',
-            'Portugal': 'Portugal', 'Greece': 'Grèce',
-            'Morocco': 'Maroc', 'Algeria': 'Algérie', 'Tunisia': 'Tunisie',
-            'Egypt': 'Égypte', 'Turkey': 'Turquie', 'Türkiye': 'Turquie',
-            'United States': 'États-Unis', 'USA': 'États-Unis', 'US': 'États-Unis',
-            'China': 'Chine', "People's Republic of China": 'Chine',
-            'Japan': 'Japon', 'South Korea': 'Corée du Sud', 'Republic of Korea': 'Corée du Sud',
-            'Singapore': 'Singapour',
-            'United Arab Emirates': 'Émirats Arabes Unis', 'UAE': 'Émirats Arabes Unis',
-            'Saudi Arabia': 'Arabie Saoudite',
-            'Switzerland': 'Suisse', 'Austria': 'Autriche', 'Poland': 'Pologne',
-            'Denmark': 'Danemark', 'Norway': 'Norvège', 'Sweden': 'Suède',
-            'Finland': 'Finlande', 'Russia': 'Russie', 'Russian Federation': 'Russie',
-            'Canada': 'Canada', 'Mexico': 'Mexique', 'Brazil': 'Brésil',
-            'Argentina': 'Argentine', 'Chile': 'Chili', 'India': 'Inde',
-            'Australia': 'Australie', 'New Zealand': 'Nouvelle-Zélande',
-            'South Africa': 'Afrique du Sud', 'Nigeria': 'Nigéria',
-            'Kenya': 'Kenya', 'Ghana': 'Ghana', 'Ethiopia': 'Éthiopie',
-            'Israel': 'Israël', 'Iran': 'Iran', 'Iraq': 'Irak',
-            'Pakistan': 'Pakistan', 'Bangladesh': 'Bangladesh',
-            'Thailand': 'Thaïlande', 'Vietnam': 'Vietnam', 'Malaysia': 'Malaisie',
-            'Indonesia': 'Indonésie', 'Philippines': 'Philippines',
-            'Ireland': 'Irlande', 'Scotland': 'Écosse', 'Wales': 'Pays de Galles',
-            'Czech Republic': 'République Tchèque', 'Hungary': 'Hongrie',
-            'Romania': 'Roumanie', 'Bulgaria': 'Bulgarie', 'Croatia': 'Croatie',
-            'Serbia': 'Serbie', 'Slovenia': 'Slovénie', 'Slovakia': 'Slovaquie',
-        }
-        return country_mapping.get(country, country)
+        return normalize_country(country)
     
     def generate_armateur_code_from_name(self, nom: str) -> str:
         """
@@ -129,6 +170,39 @@ class VelosiDataImporter:
         abbrev = ''.join([w[0].upper() for w in words[:10]])
         return abbrev[:10]
     
+    def iter_wikidata(self, sparql_query: str, label: str, entity: str,
+                      fallback: Optional[Callable[[], List[Dict]]] = None) -> Iterator[tuple]:
+        """
+        Parcourt une requête Wikidata page par page, un enregistrement compact par élément
+        (row.itemLabel, ...): les lignes d'un même ?item sont fusionnées avant toute écriture
+        
+        Args:
+            sparql_query: Requête SELECT sans ORDER BY / LIMIT (paginée par SparqlPager)
+            label: Libellé des entités pour les logs
+            entity: Table cible (reprise à la position du point de reprise)
+            fallback: Données de secours si aucune ligne n'a pu être récupérée
+        """
+        start, after = self.checkpoint.resume_from(entity)
+        grouper = EntityGrouper(label)
+        count = 0
+        try:
+            logger.info(f"📡 Requête Wikidata pour les {label} (pages de {self.sparql.page_size})...")
+            for row in grouper.group(self.rows_source.iter_rows(sparql_query, start, after)):
+                count += 1
+                yield row
+            self.fetched.add(entity)
+            logger.info(f"  ✅ {label.capitalize()}: {count} éléments récupérés sur Wikidata")
+            grouper.log_stats()
+        except Exception as e:
+            logger.error(f"  ❌ Erreur lors de la requête Wikidata ({label}): {e}")
+            if count:
+                logger.warning(f"  ⚠️ Récupération partielle: {count} {label} avant l'erreur")
+        
+        if count == 0 and fallback and not start:
+            logger.info("  🔄 Utilisation des données de secours...")
+            yield from EntityGrouper(label).group(compact_rows(fallback(), projected_variables(sparql_query)))
+            self.fetched.add(entity)
+    
     # ==================== IMPORTATION DES ARMATEURS ====================
     
     def import_professional_shipping_companies(self):
@@ -139,6 +213,12 @@ class VelosiDataImporter:
         logger.info("🏢 IMPORTATION DES COMPAGNIES MARITIMES PROFESSIONNELLES")
         print("="*80)
         
+        self.write_shipping_companies(self.fetch_shipping_companies())
+    
+    def fetch_shipping_companies(self) -> Iterator[tuple]:
+        """
+        Récupère les compagnies maritimes depuis Wikidata (données de secours en cas d'échec)
+        """
         # Requête SPARQL optimisée pour les vraies compagnies maritimes
         sparql_query = """
         SELECT DISTINCT ?item ?itemLabel ?countryLabel ?cityLabel ?hqLabel ?website WHERE {
@@ -172,109 +252,132 @@ class VelosiDataImporter:
           
           SERVICE wikibase:label { bd:serviceParam wikibase:language "en,fr,de,es,it,zh". }
         }
-        ORDER BY ?countryLabel ?itemLabel
-        LIMIT 1000
         """
         
-        try:
-            logger.info("📡 Requête Wikidata pour les compagnies maritimes professionnelles...")
-            response = requests.get(
-                self.wikidata_sparql_url,
-                params={
-                    'query': sparql_query,
-                    'format': 'json'
-                },
-                headers={'User-Agent': 'VelosiERP/1.0'},
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get('results', {}).get('bindings', [])
-            logger.info(f"  ✅ {len(results)} compagnies maritimes trouvées sur Wikidata")
+        return self.iter_wikidata(sparql_query, 'compagnies maritimes', 'armateurs',
+                                  fallback=self.get_fallback_shipping_companies)
             
-            if len(results) == 0:
-                logger.warning("  ⚠️ Aucune compagnie trouvée, utilisation du fallback...")
-                results = self.get_fallback_shipping_companies()
-            
-        except Exception as e:
-            logger.error(f"  ❌ Erreur lors de la requête Wikidata: {e}")
-            logger.info("  🔄 Utilisation des données de secours...")
-            results = self.get_fallback_shipping_companies()
+    def write_shipping_companies(self, results: Iterable[tuple]):
+        """
+        Insère les compagnies maritimes récupérées dans la table armateurs
+        """
+        if self.checkpoint.is_done('armateurs'):
+            logger.info(f"  ⏭️ Armateurs déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
+        if self.bulk:
+            rows = [row for row in map(self.prepare_armateur, results) if row]
+            self.bulk_import('armateurs', rows)
+            return
         
         # Connexion à la DB et import
         self.connect_db()
         cursor = self.conn.cursor()
         
         try:
-            for item in results:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('armateurs').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'armateurs', on_commit=self.checkpoint.committer('armateurs'))
+            # QID de la compagnie écrit si la colonne existe (migration 012)
+            store_qid = has_qid_column(cursor, 'armateurs')
+            # En mode update, le QID est reporté après coup (assign_qid): jamais de conflit sur son index unique
+            insert_qid = store_qid and self.upsert != 'update'
+            qid_column, qid_value = (', wikidata_qid', ', %s') if insert_qid else ('', '')
+            conflict = on_conflict('armateurs', self.upsert)
+            resume_offset, _ = self.checkpoint.resume_from('armateurs')
+            
+            for offset, item in source_offsets(results, resume_offset):
+                # Position avancée avant l'écriture de la ligne (le COMMIT suivant l'inclut)
+                self.checkpoint.advance('armateurs', offset, item.item)
                 try:
-                    # Extraction des données
-                    nom = item.get('itemLabel', {}).get('value', 'Unknown')
-                    
-                    # Ignorer les entrées avec des identifiants Wikidata comme nom
-                    if nom.startswith('Q') and nom[1:].isdigit():
+                    armateur = self.prepare_armateur(item)
+                    if not armateur:
                         continue
+                    code, nom, abreviation, ville, pays, siteweb = armateur[:6]
                     
-                    # Pays (OBLIGATOIRE maintenant)
-                    pays = item.get('countryLabel', {}).get('value')
-                    if not pays or pays == 'Unknown' or pays.startswith('Q'):
-                        pays = None
+                    # Vérifier si l'armateur existe déjà (index en mémoire; en mode --upsert update, la base décide
+                    # sur le nom, mais un code déjà porté par un autre armateur violerait idx_armateurs_org_code)
+                    if arbitrated('armateurs', self.upsert, armateur):
+                        exists = not index.contains(nom=nom) and index.contains(code=code)
                     else:
-                        pays = self.normalize_country_name(pays)
-                    
-                    # Si pas de pays, on skip cette entrée
-                    if not pays:
-                        self.stats['armateurs']['skipped'] += 1
-                        continue
-                    
-                    # Ville
-                    ville = item.get('cityLabel', {}).get('value') or item.get('hqLabel', {}).get('value')
-                    if ville and (ville.startswith('Q') or ville == 'Unknown'):
-                        ville = None
-                    
-                    # Site web
-                    siteweb = item.get('website', {}).get('value')
-                    
-                    # Génération du code et abréviation
-                    code = self.generate_armateur_code_from_name(nom)
-                    abreviation = self.generate_abbreviation(nom)
-                    
-                    # Vérifier si l'armateur existe déjà
-                    cursor.execute(
-                        "SELECT id FROM armateurs WHERE LOWER(nom) = LOWER(%s) OR code = %s LIMIT 1",
-                        (nom, code)
-                    )
-                    existing = cursor.fetchone()
-                    
-                    if existing:
+                        exists = index.contains(nom=nom, code=code)
+                    if exists:
                         logger.info(f"  ⏭️ Armateur existant: {nom}")
                         self.stats['armateurs']['skipped'] += 1
                         continue
                     
                     # Insérer l'armateur
-                    cursor.execute("""
-                        INSERT INTO armateurs 
-                        (code, nom, abreviation, ville, pays, siteweb, isactive, createdat, updatedat)
-                        VALUES (%s, %s, %s, %s, %s, %s, true, NOW(), NOW())
-                    """, (code, nom, abreviation, ville, pays, siteweb))
+                    with batch.row(cursor):
+                        cursor.execute(f"""
+                            INSERT INTO armateurs 
+                            (code, nom, abreviation, ville, pays, siteweb{qid_column}, isactive, createdat, updatedat)
+                            VALUES (%s, %s, %s, %s, %s, %s{qid_value}, true, NOW(), NOW())
+                            {conflict}
+                        """, (code, nom, abreviation, ville, pays, siteweb,
+                              *((armateur.wikidata_qid,) if insert_qid else ())))
+                        outcome = conflict_outcome(cursor) if conflict else 'imported'
+                        if store_qid and not insert_qid and outcome != 'skipped':
+                            self.assign_qid(cursor, 'armateurs', 'LOWER(t.nom) = LOWER(%s)', nom, armateur.wikidata_qid)
                     
-                    self.conn.commit()
+                    index.add(nom=nom, code=code)
+                    if outcome != 'imported':
+                        self.stats['armateurs'][outcome] += 1
+                        continue
                     logger.info(f"  ✅ Armateur ajouté: {nom} ({abreviation}) - {ville or '?'}, {pays}")
                     self.stats['armateurs']['imported'] += 1
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     logger.error(f"  ❌ Erreur lors de l'ajout de l'armateur: {e}")
                     self.stats['armateurs']['errors'] += 1
-                    self.conn.rollback()
                     continue
             
+            batch.finish()
+            if 'armateurs' in self.fetched:
+                self.checkpoint.complete('armateurs')
             logger.info(f"✅ Armateurs importés: {self.stats['armateurs']['imported']}, ignorés: {self.stats['armateurs']['skipped']}")
             
         finally:
             cursor.close()
             self.close_db()
     
+    def prepare_armateur(self, item: tuple) -> Optional[Armateur]:
+        """
+        Convertit un résultat SPARQL en enregistrement Armateur (None si l'entrée est ignorée)
+        """
+        # Extraction des données
+        nom = item.itemLabel or 'Unknown'
+        
+        # Ignorer les entrées avec des identifiants Wikidata comme nom
+        if nom.startswith('Q') and nom[1:].isdigit():
+            return None
+        
+        # Pays (OBLIGATOIRE maintenant)
+        pays = item.countryLabel
+        if not pays or pays == 'Unknown' or pays.startswith('Q'):
+            pays = None
+        else:
+            pays = self.normalize_country_name(pays)
+        
+        # Si pas de pays, on skip cette entrée
+        if not pays:
+            self.stats['armateurs']['skipped'] += 1
+            return None
+        
+        # Ville
+        ville = item.cityLabel or item.hqLabel
+        if ville and (ville.startswith('Q') or ville == 'Unknown'):
+            ville = None
+        
+        # Site web
+        siteweb = item.website
+        
+        # Génération du code et abréviation
+        code = self.generate_armateur_code_from_name(nom)
+        abreviation = self.generate_abbreviation(nom)
+        
+        return Armateur(code, nom, abreviation, ville, pays, siteweb, wikidata_qid=wikidata_qid(item.item))
+    
     def get_fallback_shipping_companies(self) -> List[Dict]:
         """
         Retourne une liste de compagnies maritimes majeures en cas d'échec API
@@ -322,9 +425,15 @@ class VelosiDataImporter:
         logger.info("⛴️ IMPORTATION DES NAVIRES COMMERCIAUX")
         print("="*80)
         
+        self.write_vessels(self.fetch_vessels())
+    
+    def fetch_vessels(self) -> Iterator[tuple]:
+        """
+        Récupère les navires commerciaux depuis Wikidata (données de secours en cas d'échec)
+        """
         # Requête SPARQL pour les VRAIS navires commerciaux
         sparql_query = """
-        SELECT DISTINCT ?item ?itemLabel ?imoNumber ?flagLabel ?operatorLabel ?length ?beam WHERE {
+        SELECT DISTINCT ?item ?itemLabel ?imoNumber ?flagLabel ?operator ?operatorLabel ?length ?beam WHERE {
           # Types de navires commerciaux
           { ?item wdt:P31 wd:Q17210. }          # Container ship
           UNION { ?item wdt:P31 wd:Q17479. }     # Tanker
@@ -346,118 +455,191 @@ class VelosiDataImporter:
           
           SERVICE wikibase:label { bd:serviceParam wikibase:language "en,fr". }
         }
-        LIMIT 2000
         """
         
-        try:
-            logger.info("📡 Requête Wikidata pour les navires commerciaux...")
-            response = requests.get(
-                self.wikidata_sparql_url,
-                params={'query': sparql_query, 'format': 'json'},
-                headers={'User-Agent': 'VelosiERP/1.0'},
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            results = data.get('results', {}).get('bindings', [])
-            logger.info(f"  ✅ {len(results)} navires trouvés sur Wikidata")
+        return self.iter_wikidata(sparql_query, 'navires commerciaux', 'navires',
+                                  fallback=self.get_fallback_vessels)
             
-            if len(results) == 0:
-                logger.warning("  ⚠️ Aucun navire trouvé, utilisation du fallback...")
-                results = self.get_fallback_vessels()
+    def write_vessels(self, results: Iterable[tuple]):
+        """
+        Insère les navires récupérés dans la table navires (armateurs déjà importés)
+        """
+        if self.checkpoint.is_done('navires'):
+            logger.info(f"  ⏭️ Navires déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
+        if self.bulk:
+            # Résolution des opérateurs en mémoire avant le COPY
+            self.connect_db()
+            cursor = self.conn.cursor()
+            resolver = ArmateurResolver().load(cursor)
+            cursor.close()
+            self.close_db()
             
-        except Exception as e:
-            logger.error(f"  ❌ Erreur lors de la requête Wikidata: {e}")
-            logger.info("  🔄 Utilisation des données de secours...")
-            results = self.get_fallback_vessels()
+            rows = [
+                navire._replace(armateur_id=self.resolve_armateur(resolver, navire.libelle, navire.operateur,
+                                                                  navire.operateur_qid))
+                for navire in filter(None, map(self.prepare_navire, results))
+            ]
+            resolver.log_stats()
+            self.bulk_import('navires', rows)
+            return
         
         # Connexion à la DB et import
         self.connect_db()
         cursor = self.conn.cursor()
         
         try:
-            for item in results:
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('navires').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'navires', on_commit=self.checkpoint.committer('navires'))
+            # QID du navire écrit si la colonne existe (migration 012)
+            store_qid = has_qid_column(cursor, 'navires')
+            insert_qid = store_qid and self.upsert != 'update'
+            qid_column, qid_value = (', wikidata_qid', ', %s') if insert_qid else ('', '')
+            conflict = on_conflict('navires', self.upsert)
+            # Navire sans IMO: aucun index partiel ne l'arbitre, DO NOTHING sur tout index unique
+            fallback = on_conflict('navires', 'skip') if self.upsert else ''
+            resume_offset, _ = self.checkpoint.resume_from('navires')
+            resolver = ArmateurResolver().load(cursor)
+            
+            for offset, item in source_offsets(results, resume_offset):
+                # Position avancée avant l'écriture de la ligne (le COMMIT suivant l'inclut)
+                self.checkpoint.advance('navires', offset, item.item)
                 try:
-                    # Extraction des données
-                    libelle = item.get('itemLabel', {}).get('value', 'Unknown')
-                    
-                    # Ignorer les entrées avec des identifiants Wikidata comme nom
-                    if libelle.startswith('Q') and libelle[1:].isdigit():
+                    navire = self.prepare_navire(item)
+                    if not navire:
                         continue
+                    code, libelle, nationalite, code_omi, _, longueur, largeur = navire[:7]
                     
-                    # Code IMO
-                    code_omi = item.get('imoNumber', {}).get('value')
-                    if not code_omi:
-                        code_omi = None
+                    # Opérateur/Armateur (QID puis nom, index en mémoire)
+                    armateur_id = self.resolve_armateur(resolver, libelle, navire.operateur, navire.operateur_qid)
                     
-                    # Pavillon (nationalité)
-                    nationalite = item.get('flagLabel', {}).get('value')
-                    if nationalite:
-                        nationalite = self.normalize_country_name(nationalite)
-                    
-                    # Opérateur/Armateur
-                    operateur_nom = item.get('operatorLabel', {}).get('value')
-                    armateur_id = None
-                    
-                    if operateur_nom and not operateur_nom.startswith('Q'):
-                        # Chercher l'armateur dans la DB
-                        cursor.execute(
-                            "SELECT id FROM armateurs WHERE LOWER(nom) LIKE LOWER(%s) LIMIT 1",
-                            (f"%{operateur_nom}%",)
-                        )
-                        result = cursor.fetchone()
-                        if result:
-                            armateur_id = result[0]
-                        else:
-                            logger.warning(f"  ⚠️ Armateur non trouvé pour: {libelle} (opérateur: {operateur_nom})")
-                    
-                    # Dimensions
-                    longueur = item.get('length', {}).get('value')
-                    largeur = item.get('beam', {}).get('value')
-                    
-                    # Génération du code navire
-                    if code_omi:
-                        code = f"IMO{code_omi}"
+                    # Vérifier si le navire existe déjà (index en mémoire; en mode --upsert update, la base
+                    # décide sur l'IMO, mais un code déjà porté par un autre navire violerait uq_navires_org_code)
+                    keyed = arbitrated('navires', self.upsert, navire)
+                    if keyed:
+                        exists = not index.contains(code_omi=code_omi) and index.contains(code=code)
                     else:
-                        code = self.generate_armateur_code_from_name(libelle)  # Réutiliser la même logique
-                    
-                    # Vérifier si le navire existe déjà
-                    cursor.execute(
-                        "SELECT id FROM navires WHERE code = %s OR LOWER(libelle) = LOWER(%s) LIMIT 1",
-                        (code, libelle)
-                    )
-                    existing = cursor.fetchone()
-                    
-                    if existing:
+                        exists = index.contains(code=code, libelle=libelle)
+                    if exists:
                         logger.info(f"  ⏭️ Navire existant: {libelle}")
                         self.stats['navires']['skipped'] += 1
                         continue
+                    clause = conflict if keyed else fallback
                     
                     # Insérer le navire
-                    cursor.execute("""
-                        INSERT INTO navires 
-                        (code, libelle, nationalite, code_omi, armateur_id, longueur, largeur, 
-                         statut, created_at, updated_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, 'actif', NOW(), NOW())
-                    """, (code, libelle, nationalite, code_omi, armateur_id, longueur, largeur))
+                    with batch.row(cursor):
+                        cursor.execute(f"""
+                            INSERT INTO navires 
+                            (code, libelle, nationalite, code_omi, armateur_id, longueur, largeur{qid_column}, 
+                             statut, created_at, updated_at)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s{qid_value}, 'actif', NOW(), NOW())
+                            {clause}
+                        """, (code, libelle, nationalite, code_omi, armateur_id, longueur, largeur,
+                              *((navire.wikidata_qid,) if insert_qid else ())))
+                        outcome = conflict_outcome(cursor) if clause else 'imported'
+                        if store_qid and not insert_qid and outcome != 'skipped':
+                            self.assign_qid(cursor, 'navires', 't.code = %s', code, navire.wikidata_qid)
                     
-                    self.conn.commit()
+                    index.add(code=code, libelle=libelle, code_omi=code_omi)
+                    if outcome != 'imported':
+                        self.stats['navires'][outcome] += 1
+                        continue
                     logger.info(f"  ✅ Navire ajouté: {libelle} ({code})")
                     self.stats['navires']['imported'] += 1
                     
                 except Exception as e:
+                    batch.raise_if_lost(e)
                     logger.error(f"  ❌ Erreur lors de l'ajout du navire: {e}")
                     self.stats['navires']['errors'] += 1
-                    self.conn.rollback()
                     continue
             
+            batch.finish()
+            resolver.log_stats()
+            if 'navires' in self.fetched:
+                self.checkpoint.complete('navires')
             logger.info(f"✅ Navires importés: {self.stats['navires']['imported']}, ignorés: {self.stats['navires']['skipped']}")
             
         finally:
             cursor.close()
             self.close_db()
     
+    def assign_qid(self, cursor, table: str, match: str, value: str, qid: Optional[str]):
+        """
+        Reporte le QID d'une ligne écrite en mode --upsert update (repérée par `match`), seulement
+        si elle n'en a pas et qu'aucune autre ligne de l'organisation ne le porte (index de la migration 012)
+        """
+        if not qid:
+            return
+        cursor.execute(f"""
+            UPDATE {table} t SET wikidata_qid = %s
+            WHERE {match} AND t.wikidata_qid IS NULL
+              AND NOT EXISTS (SELECT 1 FROM {table} o
+                              WHERE o.organisation_id = t.organisation_id AND o.wikidata_qid = %s)
+        """, (qid, value, qid))
+    
+    def resolve_armateur(self, resolver: ArmateurResolver, libelle: str, operateur_nom: Optional[str],
+                         operateur_qid: Optional[str] = None) -> Optional[int]:
+        """
+        Retourne l'armateur correspondant à l'opérateur d'un navire (journalise les cas douteux)
+        Égalité de QID d'abord; le nom ne sert qu'aux opérateurs sans armateur de même QID
+        """
+        if not operateur_nom and not operateur_qid:
+            return None
+        
+        match = resolver.resolve(operateur_nom, operateur_qid)
+        if not match:
+            logger.warning(f"  ⚠️ Armateur non trouvé pour: {libelle} "
+                           f"(opérateur: {operateur_nom or operateur_qid})")
+            return None
+        if match.ambiguous:
+            logger.warning(f"  ⚠️ Correspondance ambiguë: {operateur_nom} -> {match.nom} (score {match.score})")
+        return match.armateur_id
+    
+    def prepare_navire(self, item: tuple) -> Optional[Navire]:
+        """
+        Convertit un résultat SPARQL en enregistrement Navire (None si l'entrée est ignorée)
+        """
+        # Extraction des données
+        libelle = item.itemLabel or 'Unknown'
+        
+        # Ignorer les entrées avec des identifiants Wikidata comme nom
+        if libelle.startswith('Q') and libelle[1:].isdigit():
+            return None
+        
+        # Code IMO
+        code_omi = item.imoNumber
+        if not code_omi:
+            code_omi = None
+        
+        # Pavillon (nationalité)
+        nationalite = item.flagLabel
+        if nationalite:
+            nationalite = self.normalize_country_name(nationalite)
+        
+        # Opérateur/Armateur (résolu via ArmateurResolver au moment de l'insertion: QID puis nom)
+        operateur_nom = item.operatorLabel
+        if not operateur_nom or operateur_nom.startswith('Q'):
+            operateur_nom = None
+        operateur_qid = wikidata_qid(item.operator)
+        
+        # Dimensions
+        try:
+            longueur = float(item.length) if item.length else None
+            largeur = float(item.beam) if item.beam else None
+        except ValueError:
+            longueur = largeur = None
+        
+        # Génération du code navire
+        if code_omi:
+            code = f"IMO{code_omi}"
+        else:
+            code = self.generate_armateur_code_from_name(libelle)  # Réutiliser la même logique
+        
+        return Navire(code, libelle, nationalite, code_omi, longueur=longueur, largeur=largeur,
+                      operateur=operateur_nom, wikidata_qid=wikidata_qid(item.item), operateur_qid=operateur_qid)
+    
     def get_fallback_vessels(self) -> List[Dict]:
         """
         Retourne une liste de navires majeurs en cas d'échec API
@@ -491,6 +673,12 @@ class VelosiDataImporter:
         logger.info("🚢 IMPORTATION DES PORTS MARITIMES")
         print("="*80)
         
+        self.write_ports(self.fetch_ports())
+    
+    def fetch_ports(self) -> Iterator[tuple]:
+        """
+        Récupère les ports depuis Wikidata page par page (rien en cas d'échec)
+        """
         sparql_query = """
         SELECT DISTINCT ?item ?itemLabel ?countryLabel ?cityLabel ?unlocode WHERE {
           ?item wdt:P31/wdt:P279* wd:Q44782.  # Port
@@ -501,73 +689,103 @@ class VelosiDataImporter:
           
           SERVICE wikibase:label { bd:serviceParam wikibase:language "en,fr". }
         }
-        LIMIT 1000
         """
         
+        return self.iter_wikidata(sparql_query, 'ports', 'ports')
+    
+    def write_ports(self, results: Iterable[tuple]):
+        """
+        Insère les ports récupérés dans la table ports
+        """
+        if self.checkpoint.is_done('ports'):
+            logger.info(f"  ⏭️ Ports déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
+        if self.bulk:
+            rows = [row for row in map(self.prepare_port, results) if row]
+            self.bulk_import('ports', rows)
+            return
+        
+        self.connect_db()
+        cursor = self.conn.cursor()
+        
         try:
-            logger.info("📡 Requête Wikidata pour les ports...")
-            response = requests.get(
-                self.wikidata_sparql_url,
-                params={'query': sparql_query, 'format': 'json'},
-                headers={'User-Agent': 'VelosiERP/1.0'},
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('ports').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'ports', on_commit=self.checkpoint.committer('ports'))
+            conflict = on_conflict('ports', self.upsert)
+            # Port sans UN/LOCODE: aucun index partiel ne l'arbitre, DO NOTHING et déduplication en mémoire
+            fallback = on_conflict('ports', 'skip') if self.upsert else ''
+            resume_offset, _ = self.checkpoint.resume_from('ports')
             
-            results = data.get('results', {}).get('bindings', [])
-            logger.info(f"  ✅ {len(results)} ports trouvés")
+            for offset, item in source_offsets(results, resume_offset):
+                # Position avancée avant l'écriture de la ligne (le COMMIT suivant l'inclut)
+                self.checkpoint.advance('ports', offset, item.item)
+                try:
+                    port = self.prepare_port(item)
+                    if not port:
+                        continue
+                    missing = missing_required('ports', port)
+                    if missing:
+                        logger.warning(f"  ⚠️ Port rejeté ({', '.join(missing)} manquant): {port.libelle}")
+                        self.stats['ports']['errors'] += 1
+                        continue
+                    libelle, abbreviation, ville, pays = port
             
-            self.connect_db()
-            cursor = self.conn.cursor()
+                    # Vérifier existence (index en mémoire; en mode --upsert update, la base décide sur le code)
+                    keyed = arbitrated('ports', self.upsert, port)
+                    if not keyed and index.contains(libelle=libelle):
+                        self.stats['ports']['skipped'] += 1
+                        continue
+                    clause = conflict if keyed else fallback
             
-            try:
-                for item in results:
-                    try:
-                        libelle = item.get('itemLabel', {}).get('value', 'Unknown')
-                        if libelle.startswith('Q'):
-                            continue
-                        
-                        pays = item.get('countryLabel', {}).get('value')
-                        if pays:
-                            pays = self.normalize_country_name(pays)
-                        
-                        ville = item.get('cityLabel', {}).get('value')
-                        abbreviation = item.get('unlocode', {}).get('value', '')[:10]
-                        
-                        # Vérifier existence
-                        cursor.execute(
-                            "SELECT id FROM ports WHERE LOWER(libelle) = LOWER(%s) LIMIT 1",
-                            (libelle,)
-                        )
-                        if cursor.fetchone():
-                            self.stats['ports']['skipped'] += 1
-                            continue
-                        
-                        # Insérer
-                        cursor.execute("""
+                    # Insérer
+                    with batch.row(cursor):
+                        cursor.execute(f"""
                             INSERT INTO ports 
                             (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
                             VALUES (%s, %s, %s, %s, true, NOW(), NOW())
+                            {clause}
                         """, (libelle, abbreviation, ville, pays))
+                        outcome = conflict_outcome(cursor) if clause else 'imported'
+                    
+                    index.add(libelle=libelle, abbreviation=abbreviation)
+                    if outcome != 'imported':
+                        self.stats['ports'][outcome] += 1
+                        continue
+                    self.stats['ports']['imported'] += 1
+                    logger.info(f"  ✅ Port ajouté: {libelle}")
                         
-                        self.conn.commit()
-                        self.stats['ports']['imported'] += 1
-                        logger.info(f"  ✅ Port ajouté: {libelle}")
+                except Exception as e:
+                    batch.raise_if_lost(e)
+                    logger.error(f"  ❌ Erreur: {e}")
+                    self.stats['ports']['errors'] += 1
+            
+            batch.finish()
+            if 'ports' in self.fetched:
+                self.checkpoint.complete('ports')
+            logger.info(f"✅ Ports importés: {self.stats['ports']['imported']}")
                         
-                    except Exception as e:
-                        logger.error(f"  ❌ Erreur: {e}")
-                        self.stats['ports']['errors'] += 1
-                        self.conn.rollback()
-                
-                logger.info(f"✅ Ports importés: {self.stats['ports']['imported']}")
+        finally:
+            cursor.close()
+            self.close_db()
+                        
+    def prepare_port(self, item: tuple) -> Optional[Port]:
+        """
+        Convertit un résultat SPARQL en enregistrement Port (None si l'entrée est ignorée)
+        """
+        libelle = item.itemLabel or 'Unknown'
+        if libelle.startswith('Q'):
+            return None
+                        
+        pays = item.countryLabel
+        if pays:
+            pays = self.normalize_country_name(pays)
                 
-            finally:
-                cursor.close()
-                self.close_db()
+        ville = item.cityLabel
+        abbreviation = (item.unlocode or '')[:10]
                 
-        except Exception as e:
-            logger.error(f"❌ Erreur Wikidata ports: {e}")
+        return Port(libelle, abbreviation, ville, pays)
     
     # ==================== IMPORTATION DES AÉROPORTS ====================
     
@@ -579,6 +797,12 @@ class VelosiDataImporter:
         logger.info("✈️ IMPORTATION DES AÉROPORTS")
         print("="*80)
         
+        self.write_airports(self.fetch_airports())
+    
+    def fetch_airports(self) -> Iterator[tuple]:
+        """
+        Récupère les aéroports depuis Wikidata page par page (rien en cas d'échec)
+        """
         sparql_query = """
         SELECT DISTINCT ?item ?itemLabel ?iataCode ?countryLabel ?cityLabel WHERE {
           ?item wdt:P31/wdt:P279* wd:Q1248784.  # Aéroport
@@ -589,98 +813,141 @@ class VelosiDataImporter:
           
           SERVICE wikibase:label { bd:serviceParam wikibase:language "en,fr". }
         }
-        LIMIT 1000
         """
         
+        return self.iter_wikidata(sparql_query, 'aéroports', 'aeroports')
+    
+    def write_airports(self, results: Iterable[tuple]):
+        """
+        Insère les aéroports récupérés dans la table aeroports
+        """
+        if self.checkpoint.is_done('aeroports'):
+            logger.info(f"  ⏭️ Aeroports déjà importés lors de l'exécution interrompue (--resume)")
+            return
+        
+        if self.bulk:
+            rows = [row for row in map(self.prepare_aeroport, results) if row]
+            self.bulk_import('aeroports', rows)
+            return
+        
+        self.connect_db()
+        cursor = self.conn.cursor()
+        
         try:
-            logger.info("📡 Requête Wikidata pour les aéroports...")
-            response = requests.get(
-                self.wikidata_sparql_url,
-                params={'query': sparql_query, 'format': 'json'},
-                headers={'User-Agent': 'VelosiERP/1.0'},
-                timeout=30
-            )
-            response.raise_for_status()
-            data = response.json()
+            # Clés existantes chargées une seule fois (aucune requête d'existence par ligne)
+            index = DedupIndex('aeroports').load(cursor)
+            batch = BatchWriter(self.conn, self.commit_every, 'aeroports', on_commit=self.checkpoint.committer('aeroports'))
+            conflict = on_conflict('aeroports', self.upsert)
+            # Aéroport sans code IATA: aucun index partiel ne l'arbitre, DO NOTHING et déduplication en mémoire
+            fallback = on_conflict('aeroports', 'skip') if self.upsert else ''
+            resume_offset, _ = self.checkpoint.resume_from('aeroports')
             
-            results = data.get('results', {}).get('bindings', [])
-            logger.info(f"  ✅ {len(results)} aéroports trouvés")
+            for offset, item in source_offsets(results, resume_offset):
+                # Position avancée avant l'écriture de la ligne (le COMMIT suivant l'inclut)
+                self.checkpoint.advance('aeroports', offset, item.item)
+                try:
+                    aeroport = self.prepare_aeroport(item)
+                    if not aeroport:
+                        continue
+                    missing = missing_required('aeroports', aeroport)
+                    if missing:
+                        logger.warning(f"  ⚠️ Aéroport rejeté ({', '.join(missing)} manquant): {aeroport.libelle}")
+                        self.stats['aeroports']['errors'] += 1
+                        continue
+                    libelle, iata, ville, pays = aeroport
             
-            self.connect_db()
-            cursor = self.conn.cursor()
+                    # Vérifier existence (index en mémoire; en mode --upsert update, la base décide sur le code)
+                    keyed = arbitrated('aeroports', self.upsert, aeroport)
+                    if not keyed and index.contains(libelle=libelle):
+                        self.stats['aeroports']['skipped'] += 1
+                        continue
+                    clause = conflict if keyed else fallback
             
-            try:
-                for item in results:
-                    try:
-                        libelle = item.get('itemLabel', {}).get('value', 'Unknown')
-                        if libelle.startswith('Q'):
-                            continue
-                        
-                        iata = item.get('iataCode', {}).get('value', '')
-                        if iata and len(iata) != 3:
-                            iata = ''
-                        
-                        pays = item.get('countryLabel', {}).get('value')
-                        if pays:
-                            pays = self.normalize_country_name(pays)
-                        
-                        ville = item.get('cityLabel', {}).get('value')
-                        
-                        # Vérifier existence
-                        cursor.execute(
-                            "SELECT id FROM aeroports WHERE LOWER(libelle) = LOWER(%s) LIMIT 1",
-                            (libelle,)
-                        )
-                        if cursor.fetchone():
-                            self.stats['aeroports']['skipped'] += 1
-                            continue
-                        
-                        # Insérer
-                        cursor.execute("""
+                    # Insérer
+                    with batch.row(cursor):
+                        cursor.execute(f"""
                             INSERT INTO aeroports 
                             (libelle, abbreviation, ville, pays, isactive, createdat, updatedat)
                             VALUES (%s, %s, %s, %s, true, NOW(), NOW())
+                            {clause}
                         """, (libelle, iata, ville, pays))
+                        outcome = conflict_outcome(cursor) if clause else 'imported'
+                    
+                    index.add(libelle=libelle, abbreviation=iata)
+                    if outcome != 'imported':
+                        self.stats['aeroports'][outcome] += 1
+                        continue
+                    self.stats['aeroports']['imported'] += 1
+                    logger.info(f"  ✅ Aéroport ajouté: {libelle} ({iata})")
                         
-                        self.conn.commit()
-                        self.stats['aeroports']['imported'] += 1
-                        logger.info(f"  ✅ Aéroport ajouté: {libelle} ({iata})")
+                except Exception as e:
+                    batch.raise_if_lost(e)
+                    logger.error(f"  ❌ Erreur: {e}")
+                    self.stats['aeroports']['errors'] += 1
+            
+            batch.finish()
+            if 'aeroports' in self.fetched:
+                self.checkpoint.complete('aeroports')
+            logger.info(f"✅ Aéroports importés: {self.stats['aeroports']['imported']}")
                         
-                    except Exception as e:
-                        logger.error(f"  ❌ Erreur: {e}")
-                        self.stats['aeroports']['errors'] += 1
-                        self.conn.rollback()
-                
-                logger.info(f"✅ Aéroports importés: {self.stats['aeroports']['imported']}")
+        finally:
+            cursor.close()
+            self.close_db()
+                        
+    def prepare_aeroport(self, item: tuple) -> Optional[Aeroport]:
+        """
+        Convertit un résultat SPARQL en enregistrement Aeroport (None si l'entrée est ignorée)
+        """
+        libelle = item.itemLabel or 'Unknown'
+        if libelle.startswith('Q'):
+            return None
+                        
+        iata = item.iataCode or ''
+        if iata and len(iata) != 3:
+            iata = ''
+                        
+        pays = item.countryLabel
+        if pays:
+            pays = self.normalize_country_name(pays)
                 
-            finally:
-                cursor.close()
-                self.close_db()
+        ville = item.cityLabel
                 
-        except Exception as e:
-            logger.error(f"❌ Erreur Wikidata aéroports: {e}")
+        return Aeroport(libelle, iata, ville, pays)
     
     # ==================== EXÉCUTION PRINCIPALE ====================
     
-    def import_all(self):
-        """Importe toutes les données dans l'ordre"""
+    def import_all(self, pipelined: bool = False):
+        """
+        Importe toutes les données dans l'ordre
+        
+        Args:
+            pipelined: Lancer toutes les requêtes Wikidata en parallèle (seule la dépendance
+                       armateurs -> navires est respectée pour les écritures)
+        """
         start_time = datetime.now()
         
         print("="*80)
         logger.info("🚀 IMPORTATION COMPLÈTE DES DONNÉES VELOSI - VERSION AMÉLIORÉE")
         print("="*80)
         
-        # 1. Armateurs d'abord (car les navires en dépendent)
-        self.import_professional_shipping_companies()
+        if pipelined:
+            # Reprise: étapes terminées retirées (leurs dépendances sont déjà satisfaites)
+            stages = [(entity, fetch, write, tuple(d for d in deps if not self.checkpoint.is_done(d)))
+                      for entity, fetch, write, deps in DEFAULT_STAGES if not self.checkpoint.is_done(entity)]
+            if stages:
+                ImportPipeline(self, stages=stages).run()
+        else:
+            # 1. Armateurs d'abord (car les navires en dépendent)
+            self.import_professional_shipping_companies()
         
-        # 2. Navires (nécessitent les armateurs)
-        self.import_vessels_from_wikidata()
+            # 2. Navires (nécessitent les armateurs)
+            self.import_vessels_from_wikidata()
         
-        # 3. Ports
-        self.import_all_ports()
+            # 3. Ports
+            self.import_all_ports()
         
-        # 4. Aéroports
-        self.import_all_airports()
+            # 4. Aéroports
+            self.import_all_airports()
         
         # Résumé
         end_time = datetime.now()
@@ -696,6 +963,8 @@ class VelosiDataImporter:
         for entity, stats in self.stats.items():
             logger.info(f"  {entity.capitalize()}:")
             logger.info(f"    ✅ Importés: {stats['imported']}")
+            if stats['updated']:
+                logger.info(f"    🔄 Mis à jour: {stats['updated']}")
             logger.info(f"    ⏭️ Ignorés: {stats['skipped']}")
             logger.info(f"    ❌ Erreurs: {stats['errors']}")
         
@@ -723,6 +992,29 @@ if __name__ == "__main__":
     parser.add_argument('--db-user', default='postgres', help='Utilisateur PostgreSQL')
     parser.add_argument('--db-password', required=True, help='Mot de passe PostgreSQL')
     parser.add_argument('--db-port', default='5432', help='Port PostgreSQL')
+    parser.add_argument('--bulk', action='store_true',
+                        help='Chargement en masse (COPY dans une table de staging + INSERT ensembliste)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Requêtes Wikidata en parallèle, écritures dès que les données sont prêtes')
+    parser.add_argument('--page-size', type=int, default=1000,
+                        help='Nombre de lignes par page SPARQL (défaut: 1000)')
+    parser.add_argument('--concurrency', type=int, default=3,
+                        help='Pages SPARQL demandées simultanément (défaut: 3)')
+    parser.add_argument('--paging', choices=['offset', 'keyset'], default='offset',
+                        help="Pagination par OFFSET (parallèle) ou par curseur sur ?item (séquentielle)")
+    parser.add_argument('--partition', choices=PARTITION_MODES,
+                        help="Requêtes Wikidata découpées par branche UNION ('union') et par groupe de pays "
+                             "('country'), exécutées en parallèle et recoupées en cas de délai dépassé")
+    parser.add_argument('--result-format', choices=list(RESULT_FORMATS), default='json',
+                        help='Format des réponses Wikidata: csv / tsv plus compacts que json (défaut: json)')
+    parser.add_argument('--upsert', choices=UPSERT_MODES,
+                        help="INSERT ... ON CONFLICT: 'skip' ignore les doublons, 'update' met à jour "
+                             "les lignes existantes (nécessite la migration 010)")
+    parser.add_argument('--commit-every', type=int, default=DEFAULT_COMMIT_EVERY,
+                        help=f'Lignes écrites entre deux COMMIT (défaut: {DEFAULT_COMMIT_EVERY})')
+    add_cache_arguments(parser)
+    add_label_arguments(parser)
+    add_checkpoint_arguments(parser, 'data_importer_v2')
     
     args = parser.parse_args()
     
@@ -734,5 +1026,13 @@ if __name__ == "__main__":
         'port': args.db_port
     }
     
-    importer = VelosiDataImporter(db_config)
-    importer.import_all()
+    importer = VelosiDataImporter(db_config, bulk=args.bulk, page_size=args.page_size,
+                                  concurrency=args.concurrency, paging=args.paging,
+                                  cache=cache_from_args(args), commit_every=args.commit_every,
+                                  upsert=args.upsert, checkpoint=checkpoint_from_args(args),
+                                  partition=args.partition, hydrate_labels=args.hydrate_labels,
+                                  label_cache=label_cache_from_args(args),
+                                  result_format=args.result_format)
+    importer.import_all(pipelined=args.pipeline)
+    importer.checkpoint.finish(list(importer.stats))
+    importer.http.log_stats()
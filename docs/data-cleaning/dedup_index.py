@@ -0,0 +1,67 @@
+"""
+Index de déduplication en mémoire pour les importateurs Velosi
+Les clés existantes (noms en minuscules, codes, IMO, IATA/UNLOCODE) sont chargées une seule fois
+depuis la table cible, puis les doublons sont décidés sans requête d'existence
+"""
+
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+# Clés de déduplication par entité: nom de clé -> expression SQL
+# Les clés dont l'expression commence par LOWER( sont comparées en minuscules
+DEDUP_KEYS = {
+    'armateurs': {'nom': 'LOWER(nom)', 'code': 'code'},
+    'navires': {'libelle': 'LOWER(libelle)', 'code': 'code', 'code_omi': 'code_omi'},
+    'ports': {'libelle': 'LOWER(libelle)', 'abbreviation': 'abbreviation'},
+    'aeroports': {'libelle': 'LOWER(libelle)', 'abbreviation': 'abbreviation'},
+}
+
+
+class DedupIndex:
+    """Ensembles de clés existantes d'une table, mis à jour au fil des insertions"""
+    
+    def __init__(self, entity: str):
+        """
+        Args:
+            entity: Table cible (armateurs, navires, ports, aeroports)
+        """
+        self.entity = entity
+        self.columns = DEDUP_KEYS[entity]
+        self.lowered = {key for key, expr in self.columns.items() if expr.startswith('LOWER(')}
+        self.keys: Dict[str, Set[str]] = {key: set() for key in self.columns}
+    
+    def _normalize(self, key: str, value) -> Optional[str]:
+        if value is None or value == '':
+            return None
+        value = str(value)
+        return value.lower() if key in self.lowered else value
+    
+    def load(self, cursor) -> 'DedupIndex':
+        """Charge toutes les clés existantes en une seule requête"""
+        cursor.execute(f"SELECT {', '.join(self.columns.values())} FROM {self.entity}")
+        names = list(self.columns)
+        for row in cursor.fetchall():
+            for key, value in zip(names, row):
+                if value is not None and value != '':
+                    self.keys[key].add(value)
+        logger.info(f"  🗂️ Index {self.entity} chargé: " +
+                    ", ".join(f"{len(v)} {k}" for k, v in self.keys.items()))
+        return self
+    
+    def contains(self, **values) -> bool:
+        """Vrai si au moins une des clés fournies existe déjà (équivalent d'un OR en SQL)"""
+        for key, value in values.items():
+            value = self._normalize(key, value)
+            if value is not None and value in self.keys[key]:
+                return True
+        return False
+    
+    def add(self, **values):
+        """Enregistre les clés d'une ligne insérée"""
+        for key, value in values.items():
+            value = self._normalize(key, value)
+            if value is not None:
+                self.keys[key].add(value)
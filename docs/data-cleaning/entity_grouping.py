@@ -0,0 +1,174 @@
+"""
+Regroupement des lignes SPARQL par élément Wikidata (?item)
+Chaque OPTIONAL multivalué (?website, ?hq wdt:P131* ?city, ?flag...) multiplie les lignes d'un
+même élément: une compagnie avec 4 ancêtres administratifs et 2 sites web revient en 8 lignes.
+Les lignes consécutives d'un même ?item (résultats triés par ?item) sont fusionnées en un seul
+enregistrement avant normalisation et écriture, la meilleure valeur de chaque colonne étant
+choisie par règle; le taux de regroupement (lignes par élément) est journalisé.
+"""
+
+import logging
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from countries import country_code
+from sparql_client import row_type
+
+logger = logging.getLogger(__name__)
+
+# Colonne ajoutée à chaque enregistrement: nombre de lignes SPARQL fusionnées (positions de reprise)
+SOURCE_ROWS = 'source_rows'
+
+_QID_LABEL = re.compile(r'^Q\d+$')
+
+Candidate = Tuple[Optional[str], ...]
+Rule = Callable[[List[Candidate], Dict[str, Optional[str]]], Candidate]
+
+
+def _is_label(value: Optional[str]) -> bool:
+    """Libellé exploitable (ni vide, ni QID faute de libellé dans les langues demandées)"""
+    return bool(value) and not _QID_LABEL.match(value)
+
+
+def _number(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('-inf')
+
+
+def pick_city(candidates: List[Candidate], record: Dict[str, Optional[str]]) -> Candidate:
+    """
+    Ville du siège: P131* remonte du siège jusqu'au pays (ville, région, pays...).
+    Le siège lui-même s'il figure parmi les villes, sinon la première qui n'est pas un pays
+    """
+    hq = record.get('hqLabel')
+    labels = [c for c in candidates if _is_label(c[0]) and country_code(c[0]) is None]
+    for candidate in labels:
+        if candidate[0] == hq:
+            return candidate
+    return labels[0] if labels else candidates[0]
+
+
+def pick_website(candidates: List[Candidate], record: Dict[str, Optional[str]]) -> Candidate:
+    """Site web: HTTPS d'abord, puis l'URL la plus courte (page d'accueil plutôt que sous-page)"""
+    return min(candidates, key=lambda c: (not (c[0] or '').startswith('https://'), len(c[0] or '')))
+
+
+def pick_country(candidates: List[Candidate], record: Dict[str, Optional[str]]) -> Candidate:
+    """Pays / pavillon: le premier résolu par le référentiel ISO 3166-1 (QID ou libellé)"""
+    for candidate in candidates:
+        if any(country_code(value) for value in candidate if value):
+            return candidate
+    return candidates[0]
+
+
+def pick_labelled(candidates: List[Candidate], record: Dict[str, Optional[str]]) -> Candidate:
+    """Entité liée (opérateur...): la première dont le libellé n'est pas un QID"""
+    return next((c for c in candidates if _is_label(c[-1])), candidates[0])
+
+
+def pick_earliest(candidates: List[Candidate], record: Dict[str, Optional[str]]) -> Candidate:
+    """Date (fondation): la plus ancienne"""
+    return min(candidates, key=lambda c: c[0] or '')
+
+
+def pick_largest(candidates: List[Candidate], record: Dict[str, Optional[str]]) -> Candidate:
+    """Mesure (longueur hors tout plutôt qu'à la flottaison, jauge...): la plus grande valeur numérique"""
+    return max(candidates, key=lambda c: _number(c[0]))
+
+
+# Colonnes liées (valeur + libellé) choisies ensemble; colonnes absentes de la requête ignorées.
+# Règles appliquées dans l'ordre: la ville voit le siège déjà fusionné (première valeur)
+DEFAULT_RULES: Sequence[Tuple[Tuple[str, ...], Rule]] = (
+    (('country', 'countryLabel'), pick_country),
+    (('flag', 'flagLabel'), pick_country),
+    (('operator', 'operatorLabel'), pick_labelled),
+    (('cityLabel',), pick_city),
+    (('website',), pick_website),
+    (('inception',), pick_earliest),
+    (('length',), pick_largest),
+    (('beam',), pick_largest),
+    (('draft',), pick_largest),
+    (('tonnage',), pick_largest),
+)
+
+
+class EntityGrouper:
+    """Fusionne les lignes consécutives d'un même ?item et compte lignes / éléments"""
+    
+    def __init__(self, label: str, rules: Sequence[Tuple[Tuple[str, ...], Rule]] = DEFAULT_RULES):
+        """
+        Args:
+            label: Libellé des éléments pour les logs
+            rules: (colonnes, règle) appliquées quand un élément a plusieurs valeurs pour ces colonnes
+        """
+        self.label = label
+        self.rules = rules
+        self.rows = 0
+        self.entities = 0
+    
+    @property
+    def fan_in(self) -> float:
+        """Lignes SPARQL par élément (1.0 = aucune ligne redondante)"""
+        return self.rows / self.entities if self.entities else 1.0
+    
+    def group(self, rows: Iterable[tuple]) -> Iterator[tuple]:
+        """
+        Produit un enregistrement par élément, dans l'ordre source, avec la colonne source_rows
+        
+        Les lignes sans ?item (données de secours) restent des éléments distincts.
+        """
+        current: List[tuple] = []
+        for row in rows:
+            self.rows += 1
+            if current and (row.item is None or row.item != current[0].item):
+                yield self.merge(current)
+                current = []
+            current.append(row)
+        if current:
+            yield self.merge(current)
+    
+    def merge(self, rows: List[tuple]) -> tuple:
+        """Un enregistrement à partir des lignes d'un élément (première valeur non vide par défaut)"""
+        self.entities += 1
+        fields = rows[0]._fields
+        Record = row_type(fields + (SOURCE_ROWS,))
+        if len(rows) == 1:
+            return Record._make((*rows[0], 1))
+        
+        columns = list(zip(*rows))
+        record = {field: next((v for v in column if v is not None), None)
+                  for field, column in zip(fields, columns)}
+        for rule_fields, rule in self.rules:
+            indexes = [fields.index(f) for f in rule_fields if f in record]
+            if not indexes:
+                continue
+            # Combinaisons distinctes dans l'ordre d'apparition
+            candidates = list(dict.fromkeys(
+                values for values in zip(*(columns[i] for i in indexes))
+                if any(v is not None for v in values)
+            ))
+            if len(candidates) > 1:
+                record.update(zip((fields[i] for i in indexes), rule(candidates, record)))
+        return Record._make((*record.values(), len(rows)))
+    
+    def log_stats(self):
+        logger.info(f"  🧩 {self.label}: {self.rows} lignes SPARQL -> {self.entities} éléments "
+                    f"(×{self.fan_in:.2f} lignes par élément)")
+
+
+def source_offsets(records: Iterable, start: int = 0,
+                   row: Optional[Callable] = None) -> Iterator[Tuple[int, object]]:
+    """
+    Produit (position dans le résultat SPARQL après l'élément, enregistrement): positions de reprise
+    en lignes source, alors qu'un élément regroupé en couvre plusieurs
+    
+    Args:
+        start: Position du premier élément (reprise)
+        row: Extrait l'enregistrement regroupé d'un élément (ex: itemgetter(0) pour (ligne, résultat))
+    """
+    offset = start
+    for record in records:
+        offset += getattr(row(record) if row else record, SOURCE_ROWS, 1)
+        yield offset, record
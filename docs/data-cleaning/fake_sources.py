@@ -0,0 +1,245 @@
+"""
+Sources de données locales pour les benchmarks des importateurs Velosi
+Serveur HTTP (thread en arrière-plan) qui répond comme Wikidata SPARQL, wbgetentities et l'API
+OpenDataSoft records/1.0/search avec des lignes synthétiques déterministes, à la taille demandée:
+les importateurs tournent sans réseau et deux mesures successives voient les mêmes données
+"""
+
+import csv
+import io
+import json
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from countries import COUNTRIES
+from sparql_client import RESULT_FORMATS, projected_variables
+
+logger = logging.getLogger(__name__)
+
+ENTITY_PREFIX = 'http://www.wikidata.org/entity/'
+
+# Numérotation des éléments à largeur fixe: l'ordre lexical de ?item est l'ordre numérique
+_QID_BASE = 10_000_000
+_CITY_QID_BASE = 5_000_000
+
+_LIMIT = re.compile(r'\bLIMIT\s+(\d+)', re.I)
+_OFFSET = re.compile(r'\bOFFSET\s+(\d+)', re.I)
+_AFTER = re.compile(r'FILTER\s*\(\s*STR\(\?item\)\s*>\s*"([^"]+)"\s*\)', re.I)
+
+# Pays avec QID: valeurs de ?country / ?flag et de leurs libellés
+_COUNTRIES = [c for c in COUNTRIES.values() if c.wikidata]
+_COUNTRY_LABELS = {c.wikidata: c.name_en for c in _COUNTRIES}
+
+
+def _dataset(query: str) -> str:
+    """Jeu de données visé par une requête des importateurs (classe Wikidata de la requête)"""
+    if 'wd:Q17210' in query:
+        return 'navires'
+    if 'wd:Q1792644' in query or 'wd:Q1229765' in query:
+        return 'armateurs'
+    return 'elements'
+
+
+class SyntheticData:
+    """Lignes SPARQL et enregistrements OpenDataSoft générés à partir de leur seul numéro"""
+    
+    def __init__(self, rows: int = 10000, companies: Optional[int] = None, multi_every: int = 20):
+        """
+        Args:
+            rows: Nombre d'éléments par jeu de données (navires, ports, aéroports)
+            companies: Nombre d'armateurs (défaut: rows / 10, au moins 50)
+            multi_every: Un élément sur N a deux lignes SPARQL (deuxième pavillon / ville)
+        """
+        self.rows = rows
+        self.companies = companies or max(50, rows // 10)
+        self.multi_every = max(1, multi_every)
+    
+    def size(self, dataset: str) -> int:
+        return self.companies if dataset == 'armateurs' else self.rows
+    
+    def _binding(self, dataset: str, i: int, variant: int) -> Dict[str, Optional[str]]:
+        country = _COUNTRIES[(i + variant) % len(_COUNTRIES)]
+        company = i % self.companies
+        name = 'Bench Shipping' if dataset == 'armateurs' else 'Bench Navire'
+        item = f"{ENTITY_PREFIX}Q{_QID_BASE + i}"
+        return {
+            'item': item, 'company': item,
+            'itemLabel': f"{name} {i:07d}", 'companyLabel': f"{name} {i:07d}",
+            'country': ENTITY_PREFIX + country.wikidata, 'countryLabel': country.name_en,
+            'flag': ENTITY_PREFIX + country.wikidata, 'flagLabel': country.name_en,
+            'city': f"{ENTITY_PREFIX}Q{_CITY_QID_BASE + (i + variant) % 500}",
+            'hq': f"{ENTITY_PREFIX}Q{_CITY_QID_BASE + i % 500}",
+            'cityLabel': f"Port City {(i + variant) % 500}", 'hqLabel': f"Port City {i % 500}",
+            'website': f"https://bench-{i}.example.com", 'inception': '1990-01-01T00:00:00Z',
+            'imoNumber': str(9_000_000 + i),
+            'operator': f"{ENTITY_PREFIX}Q{_QID_BASE + company}",
+            'operatorLabel': f"Bench Shipping {company:07d}",
+            'length': str(100 + i % 300), 'beam': str(20 + i % 40),
+            'draft': str(8 + i % 12), 'tonnage': str(10_000 + i % 90_000),
+            'modified': '2024-01-01T00:00:00Z',
+        }
+    
+    def sparql(self, query: str) -> Dict:
+        """Réponse SPARQL JSON: ordre ?item, LIMIT / OFFSET et FILTER keyset appliqués"""
+        dataset = _dataset(query)
+        fields = [v.lstrip('?') for v in projected_variables(query)]
+        limit = _LIMIT.search(query)
+        offset = _OFFSET.search(query)
+        after = _AFTER.search(query)
+        
+        first = int(after.group(1)[len(ENTITY_PREFIX) + 1:]) - _QID_BASE + 1 if after else 0
+        start = int(offset.group(1)) if offset else 0
+        count = int(limit.group(1)) if limit else None
+        
+        bindings: List[Dict] = []
+        position = 0
+        for i in range(first, self.size(dataset)):
+            for variant in range(2 if i % self.multi_every == 0 else 1):
+                if position >= start:
+                    values = self._binding(dataset, i, variant)
+                    bindings.append({f: {'type': 'uri' if values[f].startswith('http') else 'literal',
+                                         'value': values[f]}
+                                     for f in fields if values.get(f) is not None})
+                    if count is not None and len(bindings) >= count:
+                        return {'head': {'vars': fields}, 'results': {'bindings': bindings}}
+                position += 1
+        return {'head': {'vars': fields}, 'results': {'bindings': bindings}}
+    
+    def wbgetentities(self, ids: str) -> Dict:
+        """Réponse wbgetentities (props=labels, libellés anglais seulement)"""
+        entities = {}
+        for qid in ids.split('|'):
+            number = int(qid[1:])
+            if qid in _COUNTRY_LABELS:
+                label = _COUNTRY_LABELS[qid]
+            elif _CITY_QID_BASE <= number < _QID_BASE:
+                label = f"Port City {number - _CITY_QID_BASE}"
+            else:
+                label = f"Bench Shipping {number - _QID_BASE:07d}"
+            entities[qid] = {'id': qid, 'labels': {'en': {'language': 'en', 'value': label}}}
+        return {'entities': entities}
+    
+    def opendatasoft(self, dataset: str, start: int, rows: int) -> Dict:
+        """Page records/1.0/search (world-port-index, airports-code)"""
+        records = []
+        for i in range(start, min(start + rows, self.rows)):
+            country = _COUNTRIES[i % len(_COUNTRIES)]
+            if dataset == 'airports-code':
+                fields = {'name': f"Bench Airport {i:07d}", 'iata': f"{i % 17576:04d}",
+                          'city': f"City {i % 800}", 'country': country.name_en}
+            else:
+                fields = {'port_name': f"Bench Port {i:07d}", 'world_port_index_number': str(10_000 + i),
+                          'main_port_name': f"Port City {i % 500}", 'country': country.name_en}
+            records.append({'recordid': f"{dataset}-{i:07d}", 'fields': fields})
+        return {'nhits': self.rows, 'records': records}
+
+
+def _tsv_term(cell: Dict) -> str:
+    if cell['type'] == 'uri':
+        return f"<{cell['value']}>"
+    value = cell['value'].replace('\\', '\\\\').replace('"', '\\"')
+    return '"' + value.replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r') + '"'
+
+
+def serialize_results(result: Dict, result_format: str = 'json') -> bytes:
+    """Résultat SPARQL JSON ({'head', 'results'}) sérialisé en JSON, CSV ou TSV (SPARQL 1.1)"""
+    if result_format == 'json':
+        return json.dumps(result).encode('utf-8')
+    fields = result['head']['vars']
+    bindings = result['results']['bindings']
+    out = io.StringIO()
+    if result_format == 'csv':
+        writer = csv.writer(out, lineterminator='\r\n')
+        writer.writerow(fields)
+        writer.writerows([b[f]['value'] if f in b else '' for f in fields] for b in bindings)
+    else:
+        out.write('\t'.join(f'?{f}' for f in fields) + '\n')
+        for b in bindings:
+            out.write('\t'.join(_tsv_term(b[f]) if f in b else '' for f in fields) + '\n')
+    return out.getvalue().encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    data: SyntheticData
+    counters: Dict[str, int]
+    lock: threading.Lock
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        result_format = 'json'
+        if url.path == '/sparql':
+            body = self.data.sparql(params.get('query', ''))
+            # Format négocié par Accept comme sur Wikidata (text/csv, text/tab-separated-values)
+            accept = self.headers.get('Accept', '')
+            result_format = next((f for f, mime in RESULT_FORMATS.items() if mime in accept), 'json')
+        elif url.path == '/w/api.php':
+            body = self.data.wbgetentities(params.get('ids', ''))
+        elif url.path == '/api/records/1.0/search/':
+            body = self.data.opendatasoft(params.get('dataset', ''), int(params.get('start', 0)),
+                                          int(params.get('rows', 10)))
+        else:
+            self.send_error(404)
+            return
+        with self.lock:
+            self.counters[url.path] = self.counters.get(url.path, 0) + 1
+        
+        if url.path == '/sparql':
+            payload = serialize_results(body, result_format)
+        else:
+            payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', RESULT_FORMATS[result_format] if url.path == '/sparql'
+                         else 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSourceServer:
+    """Serveur local (port libre choisi par le système), utilisable en contexte"""
+    
+    def __init__(self, data: SyntheticData, host: str = '127.0.0.1', port: int = 0):
+        handler = type('Handler', (_Handler,), {'data': data, 'counters': {}, 'lock': threading.Lock()})
+        self.handler = handler
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-sources', daemon=True)
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def sparql_url(self) -> str:
+        return f"{self.base_url}/sparql"
+    
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/w/api.php"
+    
+    @property
+    def opendatasoft_url(self) -> str:
+        return f"{self.base_url}/api/records/1.0/search/"
+    
+    @property
+    def requests(self) -> Dict[str, int]:
+        """Requêtes reçues par chemin"""
+        return dict(self.handler.counters)
+    
+    def __enter__(self) -> 'FakeSourceServer':
+        self.thread.start()
+        logger.info(f"  🧪 Sources locales sur {self.base_url}")
+        return self
+    
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
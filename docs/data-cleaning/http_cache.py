@@ -0,0 +1,231 @@
+"""
+Cache disque des réponses HTTP (SPARQL Wikidata, OpenDataSoft)
+Une réponse = un fichier gzip nommé par le hash de l'URL et des paramètres.
+Expiration par TTL (date d'écriture) et éviction LRU (date du dernier accès) au-delà d'une taille maximale:
+la taille totale est tenue à jour à chaque écriture, le répertoire n'est parcouru que lorsqu'elle est dépassée.
+Le stockage seul est géré ici: les téléchargements passent par HttpClient (http_client.py)
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = '.http_cache'
+
+# L'éviction descend à cette fraction de max_bytes: les écritures suivantes ne relancent pas de parcours
+EVICT_LOW_WATER = 0.9
+
+
+class CacheMiss(Exception):
+    """Réponse absente (ou expirée) alors que le réseau est interdit (--cache-only)"""
+
+
+class CachedResponse(NamedTuple):
+    """Sous-ensemble de requests.Response utilisé par les importateurs"""
+    status_code: int
+    content: bytes
+    from_cache: bool
+    
+    def json(self):
+        return json.loads(self.content)
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+
+class ResponseCache:
+    """Cache de réponses compressées sur disque, partagé entre les exécutions"""
+    
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = 24 * 3600,
+                 max_bytes: int = 512 * 1024 * 1024, cache_only: bool = False):
+        """
+        Args:
+            directory: Répertoire des fichiers de cache
+            ttl: Durée de validité d'une réponse (secondes)
+            max_bytes: Taille maximale du cache (les entrées les moins récemment lues sont supprimées)
+            cache_only: Rejouer uniquement depuis le disque, sans aucun accès réseau
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_only = cache_only
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_read': 0, 'bytes_written': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        # Taille totale des entrées (None: pas encore mesurée, voir _grow)
+        self._size: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, url: str, params: Optional[Dict]) -> str:
+        key = json.dumps([url, sorted((params or {}).items())], ensure_ascii=False, default=str)
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.gz')
+    
+    def _fresh(self, path: str) -> bool:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        if time.time() - stat.st_mtime > self.ttl:
+            return False
+        # Dernier accès mis à jour pour l'éviction LRU (la date d'écriture sert au TTL)
+        os.utime(path, (time.time(), stat.st_mtime))
+        return True
+    
+    def _count(self, key: str, value: int = 1):
+        with self._lock:
+            self.stats[key] += value
+    
+    def lookup(self, url: str, params: Optional[Dict] = None) -> Optional[str]:
+        """
+        Chemin de la réponse en cache si elle est encore valide, None sinon
+        
+        Raises:
+            CacheMiss: Réponse absente en mode cache_only (aucun accès réseau autorisé)
+        """
+        path = self._path(url, params)
+        if self._fresh(path):
+            self._count('hits')
+            return path
+        if self.cache_only:
+            raise CacheMiss(f"Absent du cache: {url} {params}")
+        self._count('misses')
+        return None
+    
+    def iter_file(self, path: str, chunk_size: int = 65536) -> Iterator[bytes]:
+        """Relit une réponse en cache par morceaux"""
+        with gzip.open(path, 'rb') as cached:
+            while True:
+                chunk = cached.read(chunk_size)
+                if not chunk:
+                    return
+                self._count('bytes_read', len(chunk))
+                yield chunk
+    
+    def read_file(self, path: str) -> CachedResponse:
+        """Relit une réponse en cache en entier"""
+        with gzip.open(path, 'rb') as cached:
+            content = cached.read()
+        self._count('bytes_read', len(content))
+        return CachedResponse(200, content, True)
+    
+    @contextmanager
+    def writer(self, url: str, params: Optional[Dict] = None):
+        """
+        Fichier d'écriture d'une réponse (write(bytes))
+        
+        Le fichier temporaire n'est renommé que si le bloc se termine sans erreur:
+        une réponse interrompue n'est jamais servie depuis le cache.
+        """
+        path = self._path(url, params)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp, 'wb', compresslevel=6) as out:
+                yield _CountingWriter(out, self)
+            size = os.path.getsize(tmp)
+            try:
+                size -= os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._grow(size)
+    
+    def _grow(self, delta: int):
+        """Ajoute `delta` octets à la taille totale, éviction seulement au-delà de max_bytes"""
+        with self._lock:
+            if self._size is not None:
+                self._size += delta
+                if self._size <= self.max_bytes:
+                    return
+        # Première écriture (taille inconnue) ou limite dépassée: parcours complet du répertoire
+        self.evict()
+    
+    def evict(self):
+        """Supprime les entrées expirées, puis les moins récemment lues au-delà de max_bytes (jusqu'à EVICT_LOW_WATER)"""
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith('.gz'):
+                    continue
+                stat = entry.stat()
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(entry.path)
+                else:
+                    entries.append((stat.st_atime, stat.st_size, entry.path))
+            
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICT_LOW_WATER if total > self.max_bytes else self.max_bytes
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+            self._size = total
+    
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+            self.stats['evicted'] += 1
+        except FileNotFoundError:
+            pass
+    
+    def log_stats(self):
+        s = self.stats
+        logger.info(f"🗄️ Cache HTTP ({self.directory}): {s['hits']} succès, {s['misses']} téléchargements, "
+                    f"{s['bytes_read'] / 1e6:.1f} Mo relus, {s['bytes_written'] / 1e6:.1f} Mo écrits, "
+                    f"{s['evicted']} entrées évincées")
+
+
+class _CountingWriter:
+    def __init__(self, out, cache: ResponseCache):
+        self.out = out
+        self.cache = cache
+    
+    def write(self, data: bytes):
+        self.out.write(data)
+        self.cache._count('bytes_written', len(data))
+
+
+def add_cache_arguments(parser):
+    """Ajoute les options de cache communes aux scripts d'importation (cache désactivé par défaut)"""
+    parser.add_argument('--cache', action='store_true',
+                        help='Activer le cache HTTP: les réponses encore valides (--cache-ttl) sont relues sur disque')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Répertoire du cache HTTP (défaut: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-ttl', type=float, default=24,
+                        help='Durée de validité des réponses en cache, en heures (défaut: 24)')
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help='Taille maximale du cache en Mo (défaut: 512)')
+    parser.add_argument('--cache-only', action='store_true',
+                        help='Rejouer les réponses depuis le cache, sans accès réseau (implique --cache)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Désactiver le cache HTTP (défaut, l\'emporte sur --cache)')
+
+
+def cache_from_args(args) -> Optional[ResponseCache]:
+    """Construit le cache à partir des options de add_cache_arguments (None si désactivé)"""
+    if args.no_cache or not (args.cache or args.cache_only):
+        return None
+    cache = ResponseCache(args.cache_dir, ttl=args.cache_ttl * 3600,
+                          max_bytes=args.cache_max_mb * 1024 * 1024, cache_only=args.cache_only)
+    # Données potentiellement anciennes: toujours signalé au démarrage
+    if args.cache_only:
+        logger.warning(f"🗄️ Cache HTTP seul ({args.cache_dir}): aucune requête réseau, "
+                       f"réponses de moins de {args.cache_ttl:g} h rejouées depuis le disque")
+    else:
+        logger.warning(f"🗄️ Cache HTTP activé ({args.cache_dir}): réponses de moins de {args.cache_ttl:g} h "
+                       f"servies depuis le disque au lieu d'être retéléchargées")
+    return cache
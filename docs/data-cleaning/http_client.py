@@ -0,0 +1,190 @@
+"""
+Client HTTP partagé par les importateurs (Wikidata SPARQL, OpenDataSoft)
+Une seule session requests (connexions keep-alive réutilisées, réponses gzip), nouvelles
+tentatives avec backoff sur 429/5xx (en respectant Retry-After) et compteurs par hôte.
+Le cache disque (http_cache.py) est consulté avant tout accès réseau
+"""
+
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import CachedResponse, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpClient:
+    """Session HTTP poolée avec reprises et statistiques par hôte"""
+    
+    def __init__(self, cache: Optional[ResponseCache] = None, user_agent: str = 'VelosiERP/2.0',
+                 pool_size: int = 10, max_retries: int = 4, backoff: float = 1.0,
+                 max_backoff: float = 60.0):
+        """
+        Args:
+            cache: Cache disque des réponses (None = toujours interroger le réseau)
+            user_agent: User-Agent par défaut de la session
+            pool_size: Connexions gardées ouvertes par hôte (>= nombre de téléchargements simultanés)
+            max_retries: Nombre de nouvelles tentatives sur 429/5xx ou erreur réseau
+            backoff: Délai initial entre tentatives, doublé à chaque essai (secondes)
+            max_backoff: Délai maximal entre tentatives, Retry-After compris (secondes)
+        """
+        self.cache = cache
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, pool_size))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+    
+    def _count(self, host: str, **values):
+        with self._lock:
+            counters = self.stats.setdefault(host, {
+                'requests': 0, 'retries': 0, 'errors': 0, 'latency': 0.0, 'bytes': 0,
+            })
+            for key, value in values.items():
+                counters[key] += value
+    
+    def _retry_delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = 0
+            if delay > 0:
+                return min(delay, self.max_backoff)
+        # Backoff exponentiel avec gigue: les threads d'un même pool ne repartent pas ensemble
+        delay = self.backoff * (2 ** attempt)
+        return min(delay + random.uniform(0, delay / 2), self.max_backoff)
+    
+    def _send(self, url: str, params: Optional[Dict], headers: Optional[Dict],
+              timeout: float, stream: bool) -> requests.Response:
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers,
+                                            timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count(host, requests=1, errors=1, latency=time.perf_counter() - start)
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_delay(None, attempt)
+                logger.warning(f"⚠️ {host}: {type(e).__name__}, nouvelle tentative dans {delay:.1f}s")
+                self._count(host, retries=1)
+                time.sleep(delay)
+                continue
+            
+            # Latence jusqu'aux en-têtes (le corps d'une réponse en flux est lu ensuite)
+            self._count(host, requests=1, latency=time.perf_counter() - start)
+            if (response.status_code in RETRY_STATUSES and attempt < self.max_retries
+                    and not self.is_query_timeout(response)):
+                delay = self._retry_delay(response, attempt)
+                logger.warning(f"⚠️ {host}: HTTP {response.status_code}, nouvelle tentative dans {delay:.1f}s")
+                response.close()
+                self._count(host, retries=1)
+                time.sleep(delay)
+                continue
+            if response.status_code >= 400:
+                self._count(host, errors=1)
+            if not stream:
+                self._count(host, bytes=self._wire_bytes(response))
+            return response
+    
+    @staticmethod
+    def is_query_timeout(response: requests.Response) -> bool:
+        """Délai SPARQL dépassé (Wikidata: HTTP 500 + TimeoutException): inutile de réessayer"""
+        return response.status_code == 500 and 'TimeoutException' in response.text
+    
+    @staticmethod
+    def _wire_bytes(response: requests.Response) -> int:
+        # Octets reçus sur le réseau (compressés), à défaut taille du corps décodé
+        tell = getattr(response.raw, 'tell', None)
+        return tell() if tell else len(response.content)
+    
+    @staticmethod
+    def _cache_key(params: Optional[Dict], headers: Optional[Dict]) -> Optional[Dict]:
+        # Format négocié par Accept (SPARQL CSV/TSV): une entrée de cache par format
+        if headers and 'Accept' in headers:
+            return {**(params or {}), 'Accept': headers['Accept']}
+        return params
+    
+    def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+            timeout: float = 30) -> Union[requests.Response, CachedResponse]:
+        """Équivalent de requests.get (seules les réponses 200 sont mises en cache)"""
+        key = self._cache_key(params, headers)
+        if self.cache:
+            path = self.cache.lookup(url, key)
+            if path:
+                return self.cache.read_file(path)
+        
+        response = self._send(url, params, headers, timeout, stream=False)
+        if self.cache and response.status_code == 200:
+            with self.cache.writer(url, key) as out:
+                out.write(response.content)
+        return response
+    
+    def stream(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+               timeout: float = 30, chunk_size: int = 65536) -> Iterator[bytes]:
+        """
+        Produit le corps de la réponse par morceaux, depuis le cache disque ou le réseau
+        
+        En cas de téléchargement, les morceaux sont écrits dans le cache au fil de l'eau
+        (réponse enregistrée seulement si elle est lue jusqu'au bout).
+        """
+        key = self._cache_key(params, headers)
+        if self.cache:
+            path = self.cache.lookup(url, key)
+            if path:
+                yield from self.cache.iter_file(path, chunk_size)
+                return
+        
+        response = self._send(url, params, headers, timeout, stream=True)
+        with response:
+            response.raise_for_status()
+            try:
+                if self.cache:
+                    with self.cache.writer(url, key) as out:
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            out.write(chunk)
+                            yield chunk
+                else:
+                    yield from response.iter_content(chunk_size=chunk_size)
+            finally:
+                self._count(urlsplit(url).netloc, bytes=self._wire_bytes(response))
+    
+    def close(self):
+        self.session.close()
+    
+    def log_stats(self):
+        """Affiche les compteurs par hôte (et ceux du cache disque s'il est actif)"""
+        for host, s in sorted(self.stats.items()):
+            average = s['latency'] / s['requests'] * 1000 if s['requests'] else 0
+            logger.info(f"🌐 {host}: {s['requests']} requêtes, {s['retries']} reprises, "
+                        f"{s['errors']} erreurs, latence moyenne {average:.0f} ms, "
+                        f"{s['bytes'] / 1e6:.1f} Mo reçus")
+        if self.cache:
+            self.cache.log_stats()
@@ -0,0 +1,147 @@
+"""
+Orchestrateur d'importation en pipeline
+Les requêtes Wikidata indépendantes sont lancées en parallèle et alimentent, via des files bornées,
+les étapes d'écriture en base qui s'exécutent dès que leurs données (et dépendances) sont prêtes
+"""
+
+import logging
+import queue
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Étapes: (entité, méthode de récupération, méthode d'écriture, entités devant être écrites avant)
+DEFAULT_STAGES: List[Tuple[str, str, str, Tuple[str, ...]]] = [
+    ('armateurs', 'fetch_shipping_companies', 'write_shipping_companies', ()),
+    ('navires', 'fetch_vessels', 'write_vessels', ('armateurs',)),
+    ('ports', 'fetch_ports', 'write_ports', ()),
+    ('aeroports', 'fetch_airports', 'write_airports', ()),
+]
+
+_DONE = object()
+
+
+class ImportPipeline:
+    """Récupération concurrente + écriture ordonnée par dépendances (une seule connexion DB à la fois)"""
+    
+    def __init__(self, importer, stages=None, max_workers: int = 4,
+                 queue_size: int = 4, chunk_size: int = 500):
+        """
+        Args:
+            importer: Importateur exposant les méthodes fetch_* / write_* des étapes
+            stages: Liste d'étapes, chaque étape après ses dépendances (DEFAULT_STAGES par défaut)
+            max_workers: Nombre de requêtes HTTP simultanées
+            queue_size: Nombre maximal de blocs en attente par entité (contre-pression)
+            chunk_size: Nombre de lignes par bloc transmis à l'étape d'écriture
+        """
+        self.importer = importer
+        self.stages = stages or DEFAULT_STAGES
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        
+        self.queues = {entity: queue.Queue(maxsize=queue_size) for entity, *_ in self.stages}
+        self.ready: queue.Queue = queue.Queue()
+        self.drained = set()
+        self.timings: Dict[str, Dict[str, float]] = {
+            entity: {'fetch': 0.0, 'write': 0.0, 'wait': 0.0} for entity, *_ in self.stages
+        }
+    
+    def _fetch(self, entity: str, fetch_name: str):
+        """Consomme la récupération (liste ou générateur paginé) et publie les résultats par blocs"""
+        announced = False
+        try:
+            rows = iter(getattr(self.importer, fetch_name)())
+            while True:
+                # Seul le temps passé à récupérer est compté (pas l'attente sur une file pleine)
+                start = time.perf_counter()
+                chunk = list(islice(rows, self.chunk_size))
+                self.timings[entity]['fetch'] += time.perf_counter() - start
+                if not chunk:
+                    break
+                self.queues[entity].put(chunk)
+                if not announced:
+                    self.ready.put(entity)
+                    announced = True
+        except Exception as e:
+            logger.error(f"❌ Récupération {entity} interrompue: {e}")
+        finally:
+            self.queues[entity].put(_DONE)
+            if not announced:
+                self.ready.put(entity)
+    
+    def _drain(self, entity: str) -> Iterator[tuple]:
+        """Itère sur les lignes d'une entité au fur et à mesure de leur arrivée"""
+        while True:
+            chunk = self.queues[entity].get()
+            if chunk is _DONE:
+                self.drained.add(entity)
+                return
+            yield from chunk
+    
+    def _write_all(self, stages: Dict, written: List[str], deferred: List[str]):
+        """Écrit chaque entité dès que ses données et ses dépendances sont prêtes"""
+        while len(written) < len(stages):
+            runnable = [e for e in deferred if all(d in written for d in stages[e][1])]
+            if runnable:
+                entity = runnable[0]
+                deferred.remove(entity)
+            else:
+                wait_start = time.perf_counter()
+                entity = self.ready.get()
+                self.timings[entity]['wait'] += time.perf_counter() - wait_start
+                if not all(d in written for d in stages[entity][1]):
+                    logger.info(f"  ⏳ {entity}: données prêtes, en attente de {', '.join(stages[entity][1])}")
+                    deferred.append(entity)
+                    continue
+            
+            write_start = time.perf_counter()
+            getattr(self.importer, stages[entity][0])(self._drain(entity))
+            self.timings[entity]['write'] = time.perf_counter() - write_start
+            written.append(entity)
+    
+    def run(self) -> Dict[str, Dict[str, float]]:
+        """
+        Lance toutes les récupérations puis écrit chaque entité dès qu'elle est disponible
+        
+        Returns:
+            Durées par entité: {'fetch': s, 'write': s, 'wait': s, 'saved': s}
+        """
+        stages = {entity: (write_name, deps) for entity, _, write_name, deps in self.stages}
+        wall_start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch') as pool:
+            for entity, fetch_name, _, _ in self.stages:
+                pool.submit(self._fetch, entity, fetch_name)
+            
+            written: List[str] = []
+            deferred: List[str] = []
+            try:
+                self._write_all(stages, written, deferred)
+            finally:
+                # En cas d'erreur d'écriture, vider les files pour débloquer les récupérations
+                for entity in stages:
+                    if entity not in self.drained:
+                        for _ in self._drain(entity):
+                            pass
+        
+        wall = time.perf_counter() - wall_start
+        for timing in self.timings.values():
+            # Temps réseau masqué par d'autres travaux (requêtes parallèles ou écritures)
+            timing['saved'] = max(0.0, timing['fetch'] - timing['wait'])
+        
+        self.log_timings(wall)
+        return self.timings
+    
+    def log_timings(self, wall: float):
+        """Affiche le temps gagné par phase par rapport à une exécution séquentielle"""
+        sequential = sum(t['fetch'] + t['write'] for t in self.timings.values())
+        logger.info("⏱️ Pipeline par phase:")
+        for entity, t in self.timings.items():
+            logger.info(f"  {entity.capitalize()}: réseau {t['fetch']:.1f}s, écriture {t['write']:.1f}s, "
+                        f"gain {t['saved']:.1f}s")
+        logger.info(f"  Total: {wall:.1f}s au lieu de ~{sequential:.1f}s en séquentiel "
+                    f"(gain {max(0.0, sequential - wall):.1f}s)")
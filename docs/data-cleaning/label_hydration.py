@@ -0,0 +1,280 @@
+"""
+Récupération en deux temps: SPARQL sans libellés, puis libellés par lots via wbgetentities
+La requête Wikidata ne renvoie que des QID et des littéraux (SERVICE wikibase:label supprimé,
+?xLabel remplacé par ?x); les libellés des QID distincts sont ensuite demandés à l'API
+wbgetentities par lots de 50 et conservés dans un cache SQLite (QID -> libellés par langue):
+d'une exécution à l'autre, les pays et villes déjà vus ne sont plus jamais redemandés.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from http_client import HttpClient
+from sparql_client import projected_variables, row_type
+
+logger = logging.getLogger(__name__)
+
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+DEFAULT_LABEL_CACHE = '.label_cache.sqlite'
+
+# Identifiants par requête wbgetentities (limite de l'API hors compte robot)
+WBGETENTITIES_MAX_IDS = 50
+
+_LABEL_SERVICE = re.compile(r'SERVICE\s+wikibase:label\s*\{[^{}]*\}', re.I)
+_LANGUAGES = re.compile(r'wikibase:language\s+"([^"]+)"', re.I)
+_SELECT = re.compile(r'(SELECT\s+(?:DISTINCT\s+)?)(.*?)(\s+WHERE)', re.S | re.I)
+_ENTITY_URI = re.compile(r'^https?://www\.wikidata\.org/entity/(Q\d+)$')
+
+
+class LabelQuery:
+    """Requête sans SERVICE wikibase:label et correspondance ?xLabel -> ?x"""
+    
+    def __init__(self, query: str):
+        service = _LABEL_SERVICE.search(query)
+        languages = _LANGUAGES.search(service.group(0)) if service else None
+        self.languages: Tuple[str, ...] = tuple(
+            lang.strip() for lang in (languages.group(1) if languages else 'en').split(',') if lang.strip()
+        )
+        body = _LABEL_SERVICE.sub('', query)
+        where = body[_SELECT.search(body).end():]
+        
+        self.fields = tuple(v.lstrip('?') for v in projected_variables(query))
+        self.labels: Dict[str, str] = {}
+        projection: List[str] = []
+        for field in self.fields:
+            base = field[:-len('Label')]
+            labelled = (field.endswith('Label') and not re.search(rf'\?{field}\b', where)
+                        and re.search(rf'\?{base}\b', where))
+            if labelled:
+                self.labels[field] = base
+                field = base
+            elif field.endswith('Label') and not re.search(rf'\?{field}\b', where):
+                # Libellé d'une variable non liée: toujours vide
+                continue
+            if field not in projection:
+                projection.append(field)
+        self.projection = tuple(projection)
+        self.query = _SELECT.sub(lambda m: m.group(1) + ' '.join(f'?{v}' for v in projection) + m.group(3),
+                                 body, count=1)
+    
+    def converter(self, labels: Dict[str, Optional[str]]):
+        """Fonction ligne sans libellés -> ligne aux colonnes de la requête d'origine"""
+        Row = row_type(self.fields)
+        positions = {field: i for i, field in enumerate(self.projection)}
+        getters = []
+        for field in self.fields:
+            if field in self.labels:
+                getters.append((positions[self.labels[field]], True))
+            else:
+                getters.append((positions.get(field), False))
+        
+        def convert(row: tuple) -> tuple:
+            values = []
+            for position, is_label in getters:
+                value = row[position] if position is not None else None
+                if is_label and value:
+                    match = _ENTITY_URI.match(value)
+                    # Comme le service de libellés: le QID quand aucune langue demandée n'a de libellé
+                    value = (labels.get(match.group(1)) or match.group(1)) if match else value
+                values.append(value)
+            return Row._make(values)
+        return convert
+
+
+class LabelCache:
+    """Libellés Wikidata par QID et par langue, conservés entre les exécutions (SQLite)"""
+    
+    def __init__(self, path: str = DEFAULT_LABEL_CACHE, ttl: float = 30 * 24 * 3600):
+        """
+        Args:
+            path: Fichier SQLite (':memory:' = cache limité à l'exécution)
+            ttl: Durée de validité des libellés (secondes)
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entities (
+                qid TEXT PRIMARY KEY,
+                languages TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS labels (
+                qid TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                label TEXT NOT NULL,
+                PRIMARY KEY (qid, lang)
+            );
+        """)
+    
+    def get_many(self, qids: Sequence[str], languages: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        """Libellés des QID déjà demandés dans ces langues (et non expirés); QID absents = à demander"""
+        found: Dict[str, Dict[str, str]] = {}
+        wanted = set(languages)
+        oldest = time.time() - self.ttl
+        with self._lock:
+            for i in range(0, len(qids), 500):
+                chunk = list(qids[i:i + 500])
+                marks = ','.join('?' * len(chunk))
+                for qid, fetched in self.db.execute(
+                        f"SELECT qid, languages FROM entities WHERE fetched_at >= ? AND qid IN ({marks})",
+                        [oldest, *chunk]):
+                    if wanted <= set(fetched.split(',')):
+                        found[qid] = {}
+                for qid, lang, label in self.db.execute(
+                        f"SELECT qid, lang, label FROM labels WHERE qid IN ({marks})", chunk):
+                    if qid in found:
+                        found[qid][lang] = label
+        return found
+    
+    def put_many(self, entities: Dict[str, Dict[str, str]], languages: Sequence[str]):
+        """Enregistre les libellés reçus (un QID sans libellé est aussi mémorisé)"""
+        now = time.time()
+        with self._lock, self.db:
+            for qid, labels in entities.items():
+                row = self.db.execute("SELECT languages FROM entities WHERE qid = ?", (qid,)).fetchone()
+                known = set(row[0].split(',')) if row else set()
+                self.db.execute("INSERT OR REPLACE INTO entities (qid, languages, fetched_at) VALUES (?, ?, ?)",
+                                (qid, ','.join(sorted(known | set(languages))), now))
+                self.db.executemany("INSERT OR REPLACE INTO labels (qid, lang, label) VALUES (?, ?, ?)",
+                                    [(qid, lang, label) for lang, label in labels.items()])
+    
+    def close(self):
+        self.db.close()
+
+
+class LabelHydrator:
+    """
+    Source de lignes (SparqlPager ou QueryPlanner) interrogée sans libellés,
+    lignes complétées par les libellés du cache ou de wbgetentities
+    """
+    
+    def __init__(self, source, http: HttpClient, cache: Optional[LabelCache] = None,
+                 api_url: str = WIKIDATA_API_URL, batch_size: int = WBGETENTITIES_MAX_IDS,
+                 concurrency: int = 3, window: int = 5000):
+        """
+        Args:
+            source: Objet exposant iter_rows(query, start, after) (SparqlPager, QueryPlanner)
+            http: Client HTTP partagé (session poolée, cache disque des réponses)
+            cache: Cache SQLite des libellés (None = en mémoire pour cette exécution)
+            batch_size: QID par requête wbgetentities (50 au plus)
+            concurrency: Requêtes wbgetentities simultanées
+            window: Lignes SPARQL lues avant chaque complément de libellés
+        """
+        self.source = source
+        self.http = http
+        self.cache = cache or LabelCache(':memory:')
+        self.api_url = api_url
+        self.batch_size = max(1, min(batch_size, WBGETENTITIES_MAX_IDS))
+        self.concurrency = max(1, concurrency)
+        self.window = max(1, window)
+        self.stats = {'qids': 0, 'cached': 0, 'fetched': 0, 'requests': 0, 'errors': 0}
+    
+    def _fetch(self, qids: List[str], languages: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        response = self.http.get(self.api_url, params={
+            'action': 'wbgetentities', 'ids': '|'.join(qids), 'props': 'labels',
+            'languages': '|'.join(languages), 'format': 'json',
+        }, timeout=60)
+        response.raise_for_status()
+        entities = response.json().get('entities', {})
+        
+        result = {qid: {} for qid in qids}
+        for key, entity in entities.items():
+            labels = {lang: value['value'] for lang, value in entity.get('labels', {}).items()}
+            # Élément redirigé: réponse sous le QID cible
+            source = entity.get('redirects', {}).get('from', key)
+            result[source if source in result else key] = labels
+        return result
+    
+    def labels(self, qids: Iterable[str], languages: Sequence[str]) -> Dict[str, Optional[str]]:
+        """Libellé de chaque QID dans la première langue disponible (None si aucun libellé)"""
+        qids = list(dict.fromkeys(qids))
+        entities = self.cache.get_many(qids, languages)
+        missing = [qid for qid in qids if qid not in entities]
+        self.stats['qids'] += len(qids)
+        self.stats['cached'] += len(entities)
+        
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='labels') as pool:
+                futures = [pool.submit(self._fetch, batch, languages) for batch in batches]
+                for batch, future in zip(batches, futures):
+                    self.stats['requests'] += 1
+                    try:
+                        fetched = future.result()
+                    except Exception as e:
+                        # Libellés manquants remplacés par le QID, lot redemandé à la prochaine exécution
+                        self.stats['errors'] += 1
+                        logger.error(f"  ❌ wbgetentities ({len(batch)} QID): {e}")
+                        continue
+                    self.cache.put_many(fetched, languages)
+                    self.stats['fetched'] += len(fetched)
+                    entities.update(fetched)
+        
+        return {qid: next((labels[lang] for lang in languages if lang in labels), None)
+                for qid, labels in entities.items()}
+    
+    def iter_rows(self, query: str, start: int = 0, after: Optional[str] = None) -> Iterator[tuple]:
+        """Même interface que SparqlPager.iter_rows, colonnes ?xLabel complétées après coup"""
+        plan = LabelQuery(query)
+        if not plan.labels:
+            yield from self.source.iter_rows(query, start, after)
+            return
+        
+        logger.info(f"  🏷️ Requête sans libellés ({', '.join(plan.labels)}), "
+                    f"libellés via wbgetentities ({','.join(plan.languages)})")
+        label_positions = [plan.projection.index(base) for base in set(plan.labels.values())]
+        known: Dict[str, Optional[str]] = {}
+        convert = plan.converter(known)
+        
+        window: List[tuple] = []
+        
+        def flush() -> Iterator[tuple]:
+            qids = set()
+            for row in window:
+                for position in label_positions:
+                    match = _ENTITY_URI.match(row[position] or '')
+                    if match and match.group(1) not in known:
+                        qids.add(match.group(1))
+            if qids:
+                known.update(self.labels(sorted(qids), plan.languages))
+            for row in window:
+                yield convert(row)
+            window.clear()
+        
+        for row in self.source.iter_rows(plan.query, start, after):
+            window.append(row)
+            if len(window) >= self.window:
+                yield from flush()
+        yield from flush()
+        self.log_stats()
+    
+    def log_stats(self):
+        s = self.stats
+        logger.info(f"  🏷️ Libellés: {s['qids']} QID distincts, {s['cached']} depuis le cache, "
+                    f"{s['fetched']} demandés en {s['requests']} requêtes wbgetentities ({s['errors']} erreurs)")
+
+
+def add_label_arguments(parser):
+    """Ajoute les options de récupération des libellés en deux temps"""
+    parser.add_argument('--hydrate-labels', action='store_true',
+                        help='SPARQL sans SERVICE wikibase:label, libellés par lots de 50 via wbgetentities')
+    parser.add_argument('--label-cache', default=DEFAULT_LABEL_CACHE,
+                        help=f'Cache SQLite des libellés QID (défaut: {DEFAULT_LABEL_CACHE})')
+
+
+def label_cache_from_args(args) -> Optional[LabelCache]:
+    """Cache des libellés si --hydrate-labels est actif (None sinon)"""
+    if not args.hydrate_labels:
+        return None
+    directory = os.path.dirname(args.label_cache)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return LabelCache(args.label_cache)
@@ -0,0 +1,96 @@
+"""
+Étape de normalisation multi-processus pour les importateurs Velosi
+Les lignes SPARQL brutes sont découpées en blocs et normalisées (clean_text, normalize_country,
+abréviations, dimensions) par un ProcessPoolExecutor: le travail CPU se répartit sur les cœurs
+et la boucle d'écriture ne reçoit que des enregistrements prêts à insérer, dans l'ordre source
+"""
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sparql_client import row_type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Importateur propre à chaque processus (construit une seule fois par _init_worker)
+_worker_importer = None
+
+
+def _init_worker(factory: Callable, kwargs: Dict[str, Any]):
+    global _worker_importer
+    _worker_importer = factory(**kwargs)
+
+
+def _normalize_chunk(method: str, fields: Tuple[str, ...], rows: List[tuple]) -> List[Any]:
+    """Applique importer.<method> à chaque ligne; une exception est renvoyée à la place du résultat"""
+    prepare = getattr(_worker_importer, method)
+    Row = row_type(fields)
+    results = []
+    for values in rows:
+        try:
+            results.append(prepare(Row._make(values)))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+class NormalizationPool:
+    """Normalise des lignes SPARQL par blocs dans des processus séparés (résultats dans l'ordre)"""
+    
+    def __init__(self, factory: Callable, kwargs: Optional[Dict[str, Any]] = None,
+                 workers: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            factory: Classe (ou fonction de module) construisant l'importateur de chaque processus
+            kwargs: Arguments de factory (doivent être sérialisables par pickle)
+            workers: Nombre de processus (0 = nombre de cœurs)
+            chunk_size: Nombre de lignes par bloc envoyé à un processus
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(factory, kwargs or {}))
+        logger.info(f"  🧮 Normalisation sur {self.workers} processus (blocs de {self.chunk_size} lignes)")
+    
+    def imap(self, method: str, rows: Iterable[tuple]) -> Iterator[Tuple[tuple, Any]]:
+        """
+        Produit (ligne, importer.<method>(ligne)) dans l'ordre des lignes
+        
+        Deux blocs par processus sont soumis à l'avance: la récupération paginée continue
+        pendant la normalisation, sans charger tout le résultat en mémoire.
+        """
+        rows = iter(rows)
+        pending = deque()
+        
+        def submit() -> bool:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return False
+            # Les lignes compactes (namedtuple dynamique) voyagent en tuples simples
+            fields = type(chunk[0])._fields
+            pending.append((chunk, self.pool.submit(_normalize_chunk, method, fields,
+                                                    [tuple(row) for row in chunk])))
+            return True
+        
+        while len(pending) < self.workers * 2 and submit():
+            pass
+        while pending:
+            chunk, future = pending.popleft()
+            results = future.result()
+            submit()
+            yield from zip(chunk, results)
+    
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+    
+    def __enter__(self) -> 'NormalizationPool':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,114 @@
+"""
+Récupération parallèle des jeux de données OpenDataSoft (world-port-index, airports-code)
+La première page donne nhits: toutes les pages restantes sont alors connues et téléchargées
+en parallèle, sous un limiteur de débit (token bucket), puis restituées dans l'ordre
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Limiteur de débit: `rate` requêtes par seconde, rafales jusqu'à `burst`"""
+    
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Bloque jusqu'à ce qu'un jeton soit disponible"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class OpenDataSoftPager:
+    """Parcourt un jeu de données OpenDataSoft page par page (téléchargements concurrents, ordre conservé)"""
+    
+    def __init__(self, http_get: Callable, url: str, dataset: str, sort: Optional[str] = None,
+                 page_size: int = 100, concurrency: int = 4, rate: float = 5.0,
+                 bucket: Optional[TokenBucket] = None):
+        """
+        Args:
+            http_get: Fonction GET (ex: importer.http.get: session partagée + cache disque)
+            url: URL de l'API records/1.0/search
+            dataset: Identifiant du jeu de données
+            sort: Champ de tri (ordre stable entre les pages)
+            page_size: Nombre d'enregistrements par page (max 100 pour OpenDataSoft)
+            concurrency: Nombre maximal de pages téléchargées simultanément
+            rate: Nombre maximal de requêtes par seconde (remplace les pauses fixes)
+            bucket: Limiteur partagé entre plusieurs jeux de données (sinon créé à partir de rate)
+        """
+        self.http_get = http_get
+        self.url = url
+        self.dataset = dataset
+        self.sort = sort
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.bucket = bucket or TokenBucket(rate, burst=self.concurrency)
+        self.nhits = 0
+    
+    def _fetch(self, start: int) -> Dict:
+        params = {'dataset': self.dataset, 'rows': self.page_size, 'start': start}
+        if self.sort:
+            params['sort'] = self.sort
+        self.bucket.acquire()
+        response = self.http_get(self.url, params=params, timeout=15)
+        response.raise_for_status()
+        return response.json()
+    
+    def iter_pages(self, start: int = 0) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Produit (start, records) dans l'ordre des offsets
+        
+        Seules `concurrency` pages d'avance sont en mémoire: l'étape d'insertion consomme
+        chaque page pendant que les suivantes se téléchargent.
+        
+        Args:
+            start: Reprise à partir de l'enregistrement `start` (page contenant start, puis suivantes)
+        """
+        start -= start % self.page_size
+        first = self._fetch(start)
+        self.nhits = first.get('nhits', 0)
+        records = first.get('records', [])
+        if not records:
+            return
+        yield start, records
+        
+        offsets = iter(range(start + self.page_size, self.nhits, self.page_size))
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ods') as pool:
+            pending = deque()
+            for start in offsets:
+                pending.append((start, pool.submit(self._fetch, start)))
+                if len(pending) >= self.concurrency:
+                    break
+            
+            try:
+                while pending:
+                    start, future = pending.popleft()
+                    records = future.result().get('records', [])
+                    next_start = next(offsets, None)
+                    if next_start is not None:
+                        pending.append((next_start, pool.submit(self._fetch, next_start)))
+                    if not records:
+                        return
+                    yield start, records
+            finally:
+                for _, future in pending:
+                    future.cancel()
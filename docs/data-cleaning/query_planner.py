@@ -0,0 +1,302 @@
+"""
+Planificateur de requêtes SPARQL partitionnées pour Wikidata
+Une requête logique trop lourde pour la limite de 60 s de Wikidata est découpée en partitions
+indépendantes (une par branche UNION, puis par groupe de pays quand ?country est obligatoire),
+exécutées en parallèle dans la limite de 5 requêtes simultanées par client. Une partition qui
+dépasse le délai est coupée en deux (groupe de pays, puis plage de QID) et relancée; les flux
+de toutes les partitions, déjà triés par ?item, sont fusionnés au fil de l'eau et dédoublonnés
+(mémoire bornée par quelques pages par partition, pas par la taille du résultat).
+"""
+
+import copy
+import heapq
+import itertools
+import logging
+import queue
+import re
+import threading
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from countries import COUNTRIES
+from http_client import HttpClient
+from sparql_client import SparqlPager, TruncatedResponse, add_where_clause
+
+logger = logging.getLogger(__name__)
+
+# Requêtes simultanées autorisées par Wikidata pour un même client
+WIKIDATA_MAX_CONCURRENT = 5
+
+# --partition: branches UNION seulement, ou branches UNION puis groupes de pays
+PARTITION_MODES = ('union', 'country')
+
+# Borne supposée des QID: une plage ouverte au-delà n'est plus coupée
+QID_CEILING = 1 << 28
+
+_COMMENT = re.compile(r'(?m)(^|\s)#[^\n]*')
+_WHERE = re.compile(r'WHERE\s*\{', re.I)
+_UNION = re.compile(r'\s*UNION\s*\{', re.I)
+_OPTIONAL = re.compile(r'OPTIONAL\s*\{[^{}]*\}', re.I)
+_MANDATORY_COUNTRY = re.compile(r'\?item\s+wdt:P17\s+\?country\s*[.}]')
+_QID_NUMBER = 'xsd:integer(STRAFTER(STR(?item), "/entity/Q"))'
+
+
+def _closing_brace(text: str, start: int) -> int:
+    """Position de l'accolade fermante correspondant à celle de `start`"""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == '{':
+            depth += 1
+        elif text[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError("Requête SPARQL mal formée: accolade non fermée")
+
+
+def union_branches(query: str) -> List[str]:
+    """
+    Une requête par branche de la première alternative UNION du WHERE (requête inchangée sinon)
+    Les branches identiques ne sont gardées qu'une fois.
+    """
+    query = _COMMENT.sub(r'\1', query)
+    where = _WHERE.search(query)
+    if not where:
+        return [query]
+    
+    i = where.end()
+    while i < len(query) and query[i] != '}':
+        if query[i] != '{':
+            i += 1
+            continue
+        groups = [(i, _closing_brace(query, i))]
+        end = groups[0][1] + 1
+        while True:
+            match = _UNION.match(query, end)
+            if not match:
+                break
+            start = match.end() - 1
+            groups.append((start, _closing_brace(query, start)))
+            end = groups[-1][1] + 1
+        if len(groups) > 1:
+            branches = {}
+            for start, stop in groups:
+                branch = query[:i] + query[start:stop + 1] + query[end:]
+                branches.setdefault(' '.join(branch.split()), branch)
+            return list(branches.values())
+        i = end
+    return [query]
+
+
+def has_mandatory_country(query: str) -> bool:
+    """?item wdt:P17 ?country hors OPTIONAL: la requête peut être partitionnée par pays"""
+    return bool(_MANDATORY_COUNTRY.search(_OPTIONAL.sub('', _COMMENT.sub(r'\1', query))))
+
+
+def is_query_timeout(error: Exception) -> bool:
+    """Échec dû à la durée de la requête (et non à la requête elle-même): la partition sera coupée"""
+    if isinstance(error, requests.Timeout):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in (502, 504) or HttpClient.is_query_timeout(error.response)
+    if isinstance(error, requests.ConnectionError):
+        return 'timed out' in str(error)
+    # Réponse tronquée: Wikidata coupe le flux à la limite de 60 s
+    return isinstance(error, TruncatedResponse)
+
+
+def _item_key(row: tuple) -> str:
+    return row.item or ''
+
+
+_END = object()
+
+
+def _prefetch(pages: Iterator[List[tuple]], slots: threading.Semaphore, depth: int = 2) -> Iterator[List[tuple]]:
+    """
+    Pages téléchargées en arrière-plan, au plus `depth` pages d'avance
+    Chaque requête prend un jeton de `slots`: les partitions partagent la limite de requêtes simultanées.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            while True:
+                with slots:
+                    page = next(pages, _END)
+                if not put(page) or page is _END:
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            pages.close()
+    
+    threading.Thread(target=produce, name='sparql-plan', daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class Partition(NamedTuple):
+    """Sous-ensemble indépendant d'une requête (branche UNION, pays, plage de QID)"""
+    branch: str
+    label: str
+    countries: Tuple[str, ...] = ()
+    excluded: Tuple[str, ...] = ()
+    low: int = 0
+    high: Optional[int] = None
+    
+    def query(self) -> str:
+        query = self.branch
+        if self.countries:
+            query = add_where_clause(query, 'VALUES ?country { ' + ' '.join(f'wd:{q}' for q in self.countries) + ' }')
+        if self.excluded:
+            query = add_where_clause(query, f"FILTER(?country NOT IN ({', '.join(f'wd:{q}' for q in self.excluded)}))")
+        if self.low or self.high is not None:
+            bounds = [f'{_QID_NUMBER} >= {self.low}']
+            if self.high is not None:
+                bounds.append(f'{_QID_NUMBER} < {self.high}')
+            query = add_where_clause(query, f"FILTER({' && '.join(bounds)})")
+        return query
+    
+    def describe(self) -> str:
+        parts = [self.label]
+        if self.countries:
+            parts.append(f"{len(self.countries)} pays")
+        if self.excluded:
+            parts.append("autres pays")
+        if self.low or self.high is not None:
+            parts.append(f"Q{self.low}-{f'Q{self.high}' if self.high is not None else '...'}")
+        return ', '.join(parts)
+    
+    def split(self, min_span: int) -> Optional[Tuple['Partition', 'Partition']]:
+        """Deux moitiés (groupe de pays d'abord, puis plage de QID), None si la plage est minimale"""
+        if len(self.countries) > 1:
+            middle = len(self.countries) // 2
+            return (self._replace(countries=self.countries[:middle]),
+                    self._replace(countries=self.countries[middle:]))
+        # Plage ouverte: coupée sous QID_CEILING, la moitié haute reste ouverte
+        high = self.high if self.high is not None else QID_CEILING
+        if high - self.low < 2 * min_span:
+            return None
+        middle = (self.low + high) // 2
+        return self._replace(high=middle), self._replace(low=middle)
+
+
+class QueryPlanner:
+    """Exécute une requête logique en partitions concurrentes, découpées à nouveau en cas de délai dépassé"""
+    
+    def __init__(self, pager: SparqlPager, by_country: bool = False, country_groups: int = 8,
+                 max_concurrent: int = WIKIDATA_MAX_CONCURRENT, min_span: int = 1000):
+        """
+        Args:
+            pager: Client SPARQL paginé (point d'accès, taille de page et session HTTP partagés)
+            by_country: Partitionner aussi par groupes de pays quand ?country est obligatoire
+            country_groups: Nombre de groupes de pays (plus une partition pour les autres pays)
+            max_concurrent: Requêtes simultanées, toutes partitions confondues
+            min_span: Plage de QID en dessous de laquelle une partition n'est plus coupée
+        """
+        self.pager = pager
+        self.by_country = by_country
+        self.country_groups = max(1, country_groups)
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_span = min_span
+    
+    def plan(self, query: str) -> List[Partition]:
+        """Partitions initiales d'une requête"""
+        branches = union_branches(query)
+        qids = tuple(sorted(c.wikidata for c in COUNTRIES.values() if c.wikidata))
+        size = -(-len(qids) // self.country_groups)
+        
+        partitions = []
+        for n, branch in enumerate(branches, 1):
+            label = f"branche {n}/{len(branches)}"
+            if self.by_country and has_mandatory_country(branch):
+                partitions.extend(Partition(branch, label, countries=qids[i:i + size])
+                                  for i in range(0, len(qids), size))
+                partitions.append(Partition(branch, label, excluded=qids))
+            else:
+                partitions.append(Partition(branch, label))
+        logger.info(f"  🗺️ Plan: {len(branches)} branche(s) UNION, {len(partitions)} partitions")
+        return partitions
+    
+    def _stream(self, pager: SparqlPager, partition: Partition, slots: threading.Semaphore,
+                stats: dict) -> Iterator[tuple]:
+        """
+        Lignes d'une partition dans l'ordre de ?item
+        En cas de délai dépassé, la suite vient de la fusion de ses deux moitiés, reprise au dernier
+        ?item produit (les lignes de cet élément relues sont écartées par run).
+        """
+        last = None
+        count = 0
+        try:
+            for page in _prefetch(pager.iter_pages(partition.query()), slots):
+                for row in page:
+                    last = _item_key(row)
+                    yield row
+                count += len(page)
+        except Exception as e:
+            halves = partition.split(self.min_span) if is_query_timeout(e) else None
+            if not halves:
+                raise
+            stats['splits'] += 1
+            logger.warning(f"  ✂️ Délai dépassé ({partition.describe()}): partition coupée en deux")
+            merged = heapq.merge(*(self._stream(pager, half, slots, stats) for half in halves), key=_item_key)
+            yield from (r for r in merged if last is None or _item_key(r) >= last)
+            return
+        
+        stats['partitions'] += 1
+        logger.info(f"  🧩 {partition.describe()}: {count} lignes")
+    
+    def run(self, query: str) -> Iterator[tuple]:
+        """Lignes de toutes les partitions, fusionnées au fil de l'eau dans l'ordre de ?item et dédoublonnées"""
+        # Une requête à la fois par partition, au plus max_concurrent en cours pour l'ensemble
+        pager = copy.copy(self.pager)
+        pager.concurrency = 1
+        slots = threading.Semaphore(self.max_concurrent)
+        stats = {'partitions': 0, 'splits': 0, 'duplicates': 0}
+        
+        merged = heapq.merge(*(self._stream(pager, p, slots, stats) for p in self.plan(query)), key=_item_key)
+        # Flux triés par ?item: un doublon ne peut venir que du même élément
+        item, seen, rows = None, set(), 0
+        for row in merged:
+            if row.item != item:
+                item, seen = row.item, set()
+            if row in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(row)
+            rows += 1
+            yield row
+        
+        logger.info(f"  ✅ {stats['partitions']} partitions, {stats['splits']} découpages, "
+                    f"{rows} lignes distinctes ({stats['duplicates']} doublons écartés)")
+    
+    def iter_rows(self, query: str, start: int = 0, after: Optional[str] = None) -> Iterator[tuple]:
+        """
+        Même interface que SparqlPager.iter_rows: reprise après l'élément `after`
+        (exacte, résultat trié par ?item) ou à défaut à la ligne `start`
+        """
+        rows = self.run(query)
+        if after:
+            yield from (r for r in rows if r.item > after)
+        else:
+            yield from itertools.islice(rows, start, None)
@@ -0,0 +1,54 @@
+"""
+Enregistrements compacts des entités importées (NamedTuple: pas de __dict__ par ligne)
+Représentation unique partagée par les importateurs, l'index de déduplication et le chargement COPY
+"""
+
+from typing import Optional, NamedTuple
+
+
+class Port(NamedTuple):
+    """Ligne de la table ports"""
+    libelle: str
+    abbreviation: Optional[str]
+    ville: Optional[str]
+    pays: Optional[str]
+
+
+class Aeroport(NamedTuple):
+    """Ligne de la table aeroports (abbreviation = code IATA)"""
+    libelle: str
+    abbreviation: Optional[str]
+    ville: Optional[str]
+    pays: Optional[str]
+
+
+class Armateur(NamedTuple):
+    """Ligne de la table armateurs (+ taille de flotte pour la génération des navires)"""
+    code: Optional[str]
+    nom: str
+    abreviation: Optional[str]
+    ville: Optional[str]
+    pays: Optional[str]
+    siteweb: Optional[str] = None
+    telephone: Optional[str] = None
+    email: Optional[str] = None
+    notes: Optional[str] = None
+    fleet_size: Optional[int] = None
+    wikidata_qid: Optional[str] = None
+
+
+class Navire(NamedTuple):
+    """Ligne de la table navires; operateur (libellé brut) et operateur_qid sont résolus en armateur_id"""
+    code: Optional[str]
+    libelle: str
+    nationalite: Optional[str] = None
+    code_omi: Optional[str] = None
+    armateur_id: Optional[int] = None
+    longueur: Optional[float] = None
+    largeur: Optional[float] = None
+    operateur: Optional[str] = None
+    tirant_eau: Optional[float] = None
+    jauge_brute: Optional[int] = None
+    statut: str = 'actif'
+    wikidata_qid: Optional[str] = None
+    operateur_qid: Optional[str] = None
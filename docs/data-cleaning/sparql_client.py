@@ -0,0 +1,374 @@
+"""
+Client SPARQL paginé pour Wikidata
+Parcourt un résultat complet par pages de taille fixe triées par ?item (OFFSET en parallèle
+ou curseur keyset), au lieu d'une seule requête LIMIT monolithique.
+Les réponses (JSON, ou CSV / TSV: 3 à 5 fois plus compactes, sans dictionnaire par cellule)
+sont décodées au fil du téléchargement en tuples compacts (une valeur par variable)
+"""
+
+import codecs
+import csv
+import json
+import logging
+import re
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from http_client import HttpClient
+
+logger = logging.getLogger(__name__)
+
+WIKIDATA_SPARQL_URL = "https://query.wikidata.org/sparql"
+
+# Formats de résultat SPARQL 1.1 (type MIME demandé par l'en-tête Accept)
+RESULT_FORMATS = {
+    'json': 'application/sparql-results+json',
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+}
+
+
+def projected_variables(query: str) -> List[str]:
+    """Variables du SELECT (ex: ['?item', '?itemLabel', ...])"""
+    match = re.search(r'SELECT\s+(?:DISTINCT\s+)?(.*?)\s+WHERE', query, re.S | re.I)
+    return re.findall(r'\?\w+', match.group(1)) if match else []
+
+
+def add_where_clause(query: str, clause: str) -> str:
+    """Insère une clause (FILTER, triplet) juste avant l'accolade fermante du WHERE"""
+    body = query.rstrip()
+    last_brace = body.rindex('}')
+    return f'{body[:last_brace]}  {clause}\n{body[last_brace:]}'
+
+
+def with_modified(query: str, since: Optional[datetime] = None) -> str:
+    """
+    Projette ?modified (schema:dateModified de ?item) et, si since est donné,
+    ne garde que les éléments modifiés depuis (synchronisation incrémentale)
+    """
+    query = re.sub(r'(SELECT\s+(?:DISTINCT\s+)?.*?)(\s+WHERE)', r'\1 ?modified\2', query, count=1, flags=re.S | re.I)
+    query = add_where_clause(query, '?item schema:dateModified ?modified.')
+    if since:
+        query = add_where_clause(query, f'FILTER(?modified >= "{since.strftime("%Y-%m-%dT%H:%M:%SZ")}"^^xsd:dateTime)')
+    return query
+
+
+_LABEL_SERVICE = re.compile(r'SERVICE\s+wikibase:label\s*\{[^{}]*\}', re.I)
+_OPTIONAL = re.compile(r'OPTIONAL\s*\{[^{}]*\}', re.I)
+
+
+def id_only(query: str) -> str:
+    """
+    Même ensemble d'éléments, seulement ?item: sans libellés ni OPTIONAL (requête légère
+    pour détecter les éléments disparus de la source)
+    """
+    query = re.sub(r'SELECT\s+(?:DISTINCT\s+)?.*?\s+WHERE', 'SELECT DISTINCT ?item WHERE', query,
+                   count=1, flags=re.S | re.I)
+    return _OPTIONAL.sub('', _LABEL_SERVICE.sub('', query))
+
+
+@lru_cache(maxsize=None)
+def row_type(fields: Tuple[str, ...]):
+    """Type de ligne compact (namedtuple) pour une liste de variables SPARQL"""
+    return namedtuple('SparqlRow', fields, rename=True)
+
+
+def compact_rows(bindings: Iterable[Dict], fields: Sequence[str]) -> Iterator[tuple]:
+    """Convertit des bindings déjà décodés ({'var': {'value': ...}}) en lignes compactes"""
+    names = tuple(f.lstrip('?') for f in fields)
+    Row = row_type(names)
+    for binding in bindings:
+        yield Row._make((binding.get(f) or {}).get('value') for f in names)
+
+
+class TruncatedResponse(ValueError):
+    """Corps de réponse interrompu avant la fin du résultat (Wikidata coupe le flux à la limite de 60 s)"""
+
+
+_WS = re.compile(r'[\s,]*')
+_BINDINGS_START = re.compile(r'"bindings"\s*:\s*\[')
+_VARS = re.compile(r'"vars"\s*:\s*(\[[^\]]*\])')
+
+
+def stream_bindings(chunks: Iterable[bytes]) -> Iterator[tuple]:
+    """
+    Décode results.bindings au fil de l'eau, un binding à la fois (mémoire constante)
+    
+    Args:
+        chunks: Corps de la réponse en morceaux (ex: response.iter_content(65536))
+    
+    Yields:
+        Lignes compactes dans l'ordre de head.vars (None pour une variable non liée)
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    exhausted = False
+    
+    def fill() -> bool:
+        nonlocal buffer, pos, exhausted
+        for chunk in chunks:
+            if chunk:
+                # La partie déjà décodée est abandonnée seulement lors d'un nouveau morceau
+                buffer = buffer[pos:] + utf8.decode(chunk)
+                pos = 0
+                return True
+        buffer += utf8.decode(b'', final=True)
+        exhausted = True
+        return False
+    
+    # En-tête: head.vars précède results dans les réponses SPARQL JSON
+    while not _BINDINGS_START.search(buffer):
+        if exhausted or not fill():
+            return
+    start = _BINDINGS_START.search(buffer)
+    head = _VARS.search(buffer, 0, start.start())
+    fields = tuple(json.loads(head.group(1))) if head else None
+    Row = row_type(fields) if fields else None
+    pos = start.end()
+    
+    while True:
+        pos = _WS.match(buffer, pos).end()
+        if pos == len(buffer):
+            if exhausted or not fill():
+                raise TruncatedResponse("Réponse SPARQL tronquée")
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            binding, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Objet incomplet: attendre le morceau suivant
+            if exhausted or not fill():
+                raise TruncatedResponse("Réponse SPARQL tronquée") from None
+            continue
+        
+        if Row is None:
+            yield tuple((v or {}).get('value') for v in binding.values())
+        else:
+            yield Row._make((binding.get(f) or {}).get('value') for f in fields)
+
+
+def _text_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Lignes UTF-8 (fin de ligne conservée) d'un corps reçu par morceaux"""
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    for chunk in chunks:
+        lines = (pending + utf8.decode(chunk)).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += utf8.decode(b'', final=True)
+    if pending:
+        # Chaque ligne CSV / TSV se termine par un saut de ligne: reste partiel = flux coupé
+        raise TruncatedResponse("Réponse SPARQL tronquée")
+
+
+def stream_csv_rows(chunks: Iterable[bytes]) -> Iterator[tuple]:
+    """
+    Décode un résultat SPARQL CSV (en-tête = variables) en lignes compactes
+    Les valeurs sont déjà lexicales (URI et littéraux sans type); cellule vide = variable non liée
+    """
+    reader = csv.reader(_text_lines(chunks))
+    header = next(reader, None)
+    if not header:
+        return
+    Row = row_type(tuple(header))
+    for values in reader:
+        if len(values) != len(header):
+            if not values:
+                continue
+            raise TruncatedResponse("Réponse SPARQL tronquée")
+        yield Row._make([v or None for v in values])
+
+
+_TSV_ESCAPE = re.compile(r'\\(.)')
+_TSV_UNESCAPED = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f'}
+
+
+def tsv_term(term: str) -> Optional[str]:
+    """Valeur d'un terme RDF TSV: <uri>, "littéral"@langue, "littéral"^^<type>, nombre"""
+    if not term:
+        return None
+    if term[0] == '<':
+        return term[1:-1]
+    if term[0] == '"':
+        value = term[1:term.rindex('"')]
+        if '\\' in value:
+            value = _TSV_ESCAPE.sub(lambda m: _TSV_UNESCAPED.get(m.group(1), m.group(1)), value)
+        return value
+    return term
+
+
+def stream_tsv_rows(chunks: Iterable[bytes]) -> Iterator[tuple]:
+    """Décode un résultat SPARQL TSV (en-tête = ?variables, termes RDF) en lignes compactes"""
+    reader = csv.reader(_text_lines(chunks), delimiter='\t', quoting=csv.QUOTE_NONE)
+    header = next(reader, None)
+    if not header:
+        return
+    Row = row_type(tuple(h.lstrip('?') for h in header))
+    for values in reader:
+        if len(values) != len(header):
+            if not values:
+                continue
+            raise TruncatedResponse("Réponse SPARQL tronquée")
+        yield Row._make([tsv_term(v) for v in values])
+
+
+# Décodeur de chaque format de résultat
+RESULT_PARSERS = {'json': stream_bindings, 'csv': stream_csv_rows, 'tsv': stream_tsv_rows}
+
+
+class SparqlPager:
+    """Exécute une requête SPARQL page par page et produit les bindings au fil de l'eau"""
+    
+    def __init__(self, endpoint: str = WIKIDATA_SPARQL_URL, page_size: int = 1000,
+                 concurrency: int = 3, timeout: int = 60, user_agent: str = 'VelosiERP/2.0',
+                 mode: str = 'offset', http: Optional[HttpClient] = None, result_format: str = 'json'):
+        """
+        Args:
+            endpoint: URL du point SPARQL
+            page_size: Nombre de lignes par page
+            concurrency: Nombre maximal de pages demandées simultanément (mode offset)
+            timeout: Timeout HTTP par page (secondes)
+            user_agent: User-Agent envoyé à Wikidata
+            mode: 'offset' (pages parallèles) ou 'keyset' (séquentiel, FILTER sur le dernier ?item)
+            http: Client HTTP partagé (session poolée + cache disque), créé si absent
+            result_format: Format des réponses: 'json', 'csv' ou 'tsv' (voir RESULT_FORMATS)
+        """
+        self.endpoint = endpoint
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.mode = mode
+        self.http = http or HttpClient(user_agent=user_agent, pool_size=self.concurrency)
+        self.result_format = result_format
+    
+    def _order_clause(self, query: str) -> str:
+        # ?item d'abord, puis toutes les variables projetées: ordre total et stable entre pages
+        variables = projected_variables(query)
+        ordered = ['?item'] + [v for v in variables if v != '?item']
+        return 'ORDER BY ' + ' '.join(ordered)
+    
+    def _chunks(self, query: str) -> Iterator[bytes]:
+        headers = {'User-Agent': self.user_agent}
+        if self.result_format == 'json':
+            params = {'query': query, 'format': 'json'}
+        else:
+            # CSV / TSV négociés par Accept (le paramètre format de Wikidata ne couvre que JSON et XML)
+            params = {'query': query}
+            headers['Accept'] = RESULT_FORMATS[self.result_format]
+        return self.http.stream(self.endpoint, params, headers, self.timeout)
+    
+    def _execute(self, query: str) -> List[tuple]:
+        chunks = self._chunks(query)
+        rows = list(RESULT_PARSERS[self.result_format](chunks))
+        # Lire la fin du corps ("]}}") pour que la réponse soit complète dans le cache
+        for _ in chunks:
+            pass
+        return rows
+    
+    def _offset_page(self, query: str, offset: int) -> List[tuple]:
+        return self._execute(
+            f"{query.rstrip()}\n{self._order_clause(query)}\nLIMIT {self.page_size} OFFSET {offset}"
+        )
+    
+    def _keyset_page(self, query: str, after: Optional[str]) -> List[tuple]:
+        body = query.rstrip()
+        if after:
+            body = add_where_clause(body, f'FILTER(STR(?item) > "{after}")')
+        return self._execute(f"{body}\n{self._order_clause(query)}\nLIMIT {self.page_size}")
+    
+    def _item_page(self, query: str, item: str, offset: int) -> List[tuple]:
+        # Lignes d'un seul ?item, même ordre que _keyset_page: l'OFFSET prolonge la page précédente
+        body = add_where_clause(query.rstrip(), f'FILTER(STR(?item) = "{item}")')
+        return self._execute(f"{body}\n{self._order_clause(query)}\nLIMIT {self.page_size} OFFSET {offset}")
+    
+    def iter_pages(self, query: str, start: int = 0, after: Optional[str] = None) -> Iterator[List[tuple]]:
+        """
+        Produit les pages (lignes compactes) dans l'ordre de ?item
+        
+        Args:
+            query: Requête SELECT sans ORDER BY / LIMIT / OFFSET (doit lier ?item)
+            start: Reprise à la ligne `start` du résultat (mode offset)
+            after: Reprise après l'élément ?item donné (mode keyset; en mode offset, recalage autour de start)
+        """
+        if self.mode == 'keyset':
+            yield from self._iter_keyset(query, after)
+        else:
+            yield from self._iter_offset(query, start, after)
+    
+    def _iter_offset(self, query: str, start: int = 0, after: Optional[str] = None) -> Iterator[List[tuple]]:
+        # Reprise: la page contenant la ligne `start` est redemandée, ses premières lignes écartées.
+        # Avec la clé du dernier élément traité, une page de marge est relue et filtrée sur ?item
+        # (des éléments ajoutés ou supprimés entre-temps décalent les offsets)
+        if after:
+            start = max(0, start - self.page_size)
+        skip = start % self.page_size
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='sparql') as pool:
+            pending = deque()
+            next_page = start // self.page_size
+            for _ in range(self.concurrency):
+                pending.append(pool.submit(self._offset_page, query, next_page * self.page_size))
+                next_page += 1
+            
+            while pending:
+                rows = pending.popleft().result()
+                logger.info(f"  📄 Page {next_page - len(pending)}: {len(rows)} lignes")
+                page = rows[skip:]
+                if after:
+                    page = [r for r in page if r.item > after]
+                    if page:
+                        after = None
+                if page:
+                    yield page
+                skip = 0
+                if len(rows) < self.page_size:
+                    # Dernière page atteinte: les requêtes anticipées sont abandonnées
+                    for future in pending:
+                        future.cancel()
+                    return
+                pending.append(pool.submit(self._offset_page, query, next_page * self.page_size))
+                next_page += 1
+    
+    def _iter_keyset(self, query: str, after: Optional[str] = None) -> Iterator[List[tuple]]:
+        page = 0
+        while True:
+            rows = self._keyset_page(query, after)
+            page += 1
+            logger.info(f"  📄 Page {page}: {len(rows)} lignes")
+            if len(rows) < self.page_size:
+                if rows:
+                    yield rows
+                return
+            
+            # Un même ?item peut s'étendre sur plusieurs lignes: on garde ses lignes pour la page suivante
+            last_item = rows[-1].item
+            complete = [r for r in rows if r.item != last_item]
+            if complete:
+                after = complete[-1].item
+                yield complete
+                continue
+            
+            # Un seul ?item remplit la page: la suite de ses lignes est lue par OFFSET sur cet élément
+            yield rows
+            offset = len(rows)
+            while len(rows) == self.page_size:
+                rows = self._item_page(query, last_item, offset)
+                page += 1
+                logger.info(f"  📄 Page {page}: {len(rows)} lignes ({last_item})")
+                if rows:
+                    yield rows
+                offset += len(rows)
+            after = last_item
+    
+    def iter_rows(self, query: str, start: int = 0, after: Optional[str] = None) -> Iterator[tuple]:
+        """Itère sur toutes les lignes, page après page (reprise: voir iter_pages)"""
+        for page in self.iter_pages(query, start, after):
+            yield from page
@@ -0,0 +1,166 @@
+"""
+Synchronisation incrémentale des importateurs Velosi (table import_sync_state, migration 011)
+Chaque enregistrement source est identifié par une clé stable (QID Wikidata, ou nom normalisé)
+et une empreinte de son contenu: seules les différences sont écrites (insertion, mise à jour,
+désactivation), au lieu de supprimer et recharger les tables
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+
+# Désactivation / réactivation par entité: les lignes ne sont jamais supprimées
+# (les expéditions et les navires gardent leurs clés étrangères)
+SOFT_DELETE = {
+    'armateurs': ("isactive = false, updatedat = NOW()", "isactive = true, updatedat = NOW()"),
+    'navires': ("statut = 'inactif', updated_at = NOW()", "statut = 'actif', updated_at = NOW()"),
+}
+
+
+class SyncEntry(NamedTuple):
+    """Empreinte connue d'un enregistrement source"""
+    row_id: int
+    content_hash: str
+    deleted: bool
+
+
+def content_hash(values: Iterable) -> str:
+    """Empreinte MD5 des champs importés (ordre significatif, None distinct de '')"""
+    payload = json.dumps(list(values), default=str, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def wikidata_qid(uri: Optional[str]) -> Optional[str]:
+    """http://www.wikidata.org/entity/Q123 -> Q123"""
+    return uri.rsplit('/', 1)[-1] if uri else None
+
+
+def parse_modified(value: Optional[str]) -> Optional[datetime]:
+    """schema:dateModified (2024-05-01T12:00:00Z) -> datetime sans fuseau (UTC)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class SyncState:
+    """Empreintes d'une entité, chargées une fois puis écrites par pages"""
+    
+    def __init__(self, entity: str):
+        """
+        Args:
+            entity: Table cible (armateurs, navires)
+        """
+        self.entity = entity
+        self.entries: Dict[str, SyncEntry] = {}
+        self.rows: Set[int] = set()
+        self.watermark: Optional[datetime] = None
+        self.seen: Set[str] = set()
+        self.pending: List[tuple] = []
+        self.modified: Dict[str, datetime] = {}
+    
+    def load(self, cursor) -> 'SyncState':
+        """Charge toutes les empreintes et le point de reprise (une requête chacun)"""
+        cursor.execute("""
+            SELECT source_key, row_id, content_hash, deleted_at IS NOT NULL
+            FROM import_sync_state
+            WHERE entity = %s
+        """, (self.entity,))
+        self.entries = {key: SyncEntry(row_id, digest, deleted)
+                        for key, row_id, digest, deleted in cursor.fetchall()}
+        self.rows = {entry.row_id for entry in self.entries.values()}
+        
+        cursor.execute("SELECT MAX(source_modified) FROM import_sync_state WHERE entity = %s",
+                       (self.entity,))
+        self.watermark = cursor.fetchone()[0]
+        
+        logger.info(f"  🔁 État de synchronisation {self.entity}: {len(self.entries)} enregistrements"
+                    + (f", modifiés depuis {self.watermark.isoformat()}" if self.watermark else ""))
+        return self
+    
+    def get(self, key: str) -> Optional[SyncEntry]:
+        """Empreinte connue (None si l'enregistrement n'a jamais été importé)"""
+        self.seen.add(key)
+        return self.entries.get(key)
+    
+    def mark(self, key: str, row_id: int, digest: str, modified: Optional[datetime] = None):
+        """
+        Enregistre une ligne insérée ou mise à jour (écrite au prochain flush)
+        
+        La date de modification n'est écrite que par finish(): une synchronisation interrompue
+        ne fait pas avancer le point de reprise au-delà d'éléments non encore traités.
+        """
+        self.seen.add(key)
+        self.entries[key] = SyncEntry(row_id, digest, False)
+        self.rows.add(row_id)
+        self.pending.append((self.entity, key, row_id, digest))
+        if modified:
+            self.modified[key] = modified
+    
+    def flush(self, cursor):
+        """Écrit les empreintes en attente en un INSERT multi-lignes"""
+        if not self.pending:
+            return
+        execute_values(cursor, """
+            INSERT INTO import_sync_state
+            (entity, source_key, row_id, content_hash)
+            VALUES %s
+            ON CONFLICT (organisation_id, entity, source_key) DO UPDATE SET
+                row_id = EXCLUDED.row_id,
+                content_hash = EXCLUDED.content_hash,
+                last_seen_at = NOW(),
+                deleted_at = NULL
+        """, self.pending)
+        self.pending = []
+    
+    def finish(self, cursor):
+        """Synchronisation complète: écrit les dates de modification (nouveau point de reprise)"""
+        self.flush(cursor)
+        if not self.modified:
+            return
+        # execute_values n'accepte qu'un seul %s: entity (armateurs, navires) est inséré dans la requête
+        execute_values(cursor, f"""
+            UPDATE import_sync_state AS s SET source_modified = v.modified
+            FROM (VALUES %s) AS v(source_key, modified)
+            WHERE s.entity = '{self.entity}' AND s.source_key = v.source_key
+        """, list(self.modified.items()), template="(%s, %s::timestamp)")
+        self.modified = {}
+    
+    def missing(self, live: Set[str]) -> List[str]:
+        """Clés actives absentes de la source"""
+        return [key for key, entry in self.entries.items() if not entry.deleted and key not in live]
+    
+    def revived(self, live: Set[str]) -> List[str]:
+        """Clés désactivées réapparues dans la source"""
+        return [key for key, entry in self.entries.items() if entry.deleted and key in live]
+    
+    def soft_delete(self, cursor, keys: List[str]) -> int:
+        """Désactive les lignes des clés données (isactive = false / statut = inactif)"""
+        return self._set_deleted(cursor, keys, True)
+    
+    def revive(self, cursor, keys: List[str]) -> int:
+        """Réactive les lignes des clés données"""
+        return self._set_deleted(cursor, keys, False)
+    
+    def _set_deleted(self, cursor, keys: List[str], deleted: bool) -> int:
+        if not keys:
+            return 0
+        assignments = SOFT_DELETE[self.entity][0 if deleted else 1]
+        cursor.execute(f"UPDATE {self.entity} SET {assignments} WHERE id = ANY(%s)",
+                       ([self.entries[key].row_id for key in keys],))
+        cursor.execute(f"""
+            UPDATE import_sync_state SET deleted_at = {'NOW()' if deleted else 'NULL'}
+            WHERE entity = %s AND source_key = ANY(%s)
+        """, (self.entity, keys))
+        for key in keys:
+            self.entries[key] = self.entries[key]._replace(deleted=deleted)
+        return len(keys)
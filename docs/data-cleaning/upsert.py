@@ -0,0 +1,100 @@
+"""
+Clauses INSERT ... ON CONFLICT pour les importateurs Velosi
+S'appuie sur les index uniques de la migration 010 (docs/migrations/010_add_unique_import_keys.sql):
+la base décide des doublons, y compris entre importations simultanées
+"""
+
+from typing import Optional, Sequence
+
+UPSERT_MODES = ('skip', 'update')
+
+
+# Clé de conflit par entité (cible + prédicat de l'index partiel), colonne qui la porte et colonnes
+# rafraîchies en mode update. La cible doit correspondre exactement à l'expression de l'index unique
+# pour être reconnue; guard (facultatif) limite le DO UPDATE à la même ligne logique.
+CONFLICT_KEYS = {
+    'armateurs': {
+        'target': '(organisation_id, LOWER(nom))',
+        'where': None,
+        'key': 'nom',
+        'update': ['abreviation', 'ville', 'pays', 'siteweb'],
+        'timestamp': 'updatedat',
+    },
+    'navires': {
+        'target': '(organisation_id, code_omi)',
+        'where': "code_omi IS NOT NULL AND code_omi <> ''",
+        'key': 'code_omi',
+        'update': ['libelle', 'nationalite', 'armateur_id', 'longueur', 'largeur'],
+        'timestamp': 'updated_at',
+    },
+    'ports': {
+        'target': '(organisation_id, abbreviation)',
+        'where': "abbreviation IS NOT NULL AND abbreviation <> ''",
+        'key': 'abbreviation',
+        'update': ['libelle', 'ville', 'pays'],
+        'timestamp': 'updatedat',
+        # Même code UN/LOCODE, autre libellé: autre port, la ligne existante n'est pas écrasée
+        'guard': 'LOWER(ports.libelle) = LOWER(EXCLUDED.libelle)',
+    },
+    'aeroports': {
+        'target': '(organisation_id, abbreviation)',
+        'where': "abbreviation IS NOT NULL AND abbreviation <> ''",
+        'key': 'abbreviation',
+        'update': ['libelle', 'ville', 'pays'],
+        'timestamp': 'updatedat',
+        'guard': 'LOWER(aeroports.libelle) = LOWER(EXCLUDED.libelle)',
+    },
+}
+
+
+def on_conflict(entity: str, mode: Optional[str], extra: Sequence[str] = ()) -> str:
+    """
+    Clause ON CONFLICT à ajouter après VALUES (...)
+    
+    Args:
+        entity: Table cible (armateurs, navires, ports, aeroports)
+        mode: 'skip' (DO NOTHING, tout index unique), 'update' (DO UPDATE sur la clé de l'entité)
+              ou None (aucune clause: comportement historique)
+        extra: Colonnes rafraîchies en plus en mode update (ex: wikidata_qid, migration 012)
+    
+    Returns:
+        La clause, suivie de RETURNING (xmax = 0) pour distinguer insertion et mise à jour
+    """
+    if not mode:
+        return ''
+    if mode == 'skip':
+        return 'ON CONFLICT DO NOTHING RETURNING true'
+    
+    key = CONFLICT_KEYS[entity]
+    where = f" WHERE {key['where']}" if key['where'] else ''
+    # Une valeur absente de la source n'efface pas la valeur existante
+    assignments = [f"{column} = COALESCE(EXCLUDED.{column}, {entity}.{column})"
+                   for column in (*key['update'], *extra)]
+    assignments.append(f"{key['timestamp']} = NOW()")
+    guard = f" WHERE {key['guard']}" if key.get('guard') else ''
+    return (f"ON CONFLICT {key['target']}{where} DO UPDATE SET {', '.join(assignments)}{guard} "
+            f"RETURNING (xmax = 0)")
+
+
+def arbitrated(entity: str, mode: Optional[str], record) -> bool:
+    """
+    Vrai si la base décide du doublon: mode update et valeur présente dans l'enregistrement
+    (records.py) pour la colonne de la clé de conflit
+    
+    Sans clé (port sans UN/LOCODE, navire sans IMO), aucun index ne l'arbitre: l'importateur garde
+    sa déduplication en mémoire et insère avec on_conflict(entity, 'skip').
+    """
+    if mode != 'update':
+        return False
+    value = getattr(record, CONFLICT_KEYS[entity]['key'])
+    return value is not None and value != ''
+
+
+def conflict_outcome(cursor) -> str:
+    """
+    Résultat d'un INSERT exécuté avec on_conflict(): 'imported', 'updated' ou 'skipped'
+    """
+    row = cursor.fetchone()
+    if row is None:
+        return 'skipped'
+    return 'imported' if row[0] else 'updated'
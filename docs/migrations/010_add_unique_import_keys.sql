@@ -0,0 +1,89 @@
+-- ===================================================================
+-- Migration 010: Clés uniques pour l'importation (armateurs, navires, ports, aéroports)
+-- ===================================================================
+-- Description: Remplace la vérification "SELECT puis INSERT" des scripts
+--             d'importation (docs/data-cleaning) par des index UNIQUE sur les
+--             clés normalisées. Deux importations simultanées (ou une importation
+--             et le backend) ne peuvent plus créer de doublons, et les scripts
+--             peuvent utiliser INSERT ... ON CONFLICT (option --upsert).
+-- Prérequis: migration 009 (colonne organisation_id)
+-- Date: 2026-10-17
+-- ===================================================================
+
+-- ===================================================================
+-- PARTIE 1: VÉRIFICATION DES DOUBLONS EXISTANTS
+-- ===================================================================
+-- Un index UNIQUE ne peut pas être créé tant que des doublons existent:
+-- la migration s'arrête et indique la table à nettoyer.
+
+DO $$
+DECLARE
+    duplicates INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT 1 FROM armateurs GROUP BY organisation_id, LOWER(nom) HAVING COUNT(*) > 1
+    ) d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION 'armateurs: % noms en double (LOWER(nom)). Voir: SELECT organisation_id, LOWER(nom), array_agg(id) FROM armateurs GROUP BY 1, 2 HAVING COUNT(*) > 1;', duplicates;
+    END IF;
+
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT 1 FROM navires WHERE code_omi IS NOT NULL AND code_omi <> ''
+        GROUP BY organisation_id, code_omi HAVING COUNT(*) > 1
+    ) d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION 'navires: % numéros OMI en double. Voir: SELECT organisation_id, code_omi, array_agg(id) FROM navires WHERE code_omi <> '''' GROUP BY 1, 2 HAVING COUNT(*) > 1;', duplicates;
+    END IF;
+
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT 1 FROM navires GROUP BY organisation_id, code HAVING COUNT(*) > 1
+    ) d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION 'navires: % codes en double. Voir: SELECT organisation_id, code, array_agg(id) FROM navires GROUP BY 1, 2 HAVING COUNT(*) > 1;', duplicates;
+    END IF;
+
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT 1 FROM ports WHERE abbreviation IS NOT NULL AND abbreviation <> ''
+        GROUP BY organisation_id, abbreviation HAVING COUNT(*) > 1
+    ) d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION 'ports: % codes (UN/LOCODE, WPI) en double. Voir: SELECT organisation_id, abbreviation, array_agg(id) FROM ports WHERE abbreviation <> '''' GROUP BY 1, 2 HAVING COUNT(*) > 1;', duplicates;
+    END IF;
+
+    SELECT COUNT(*) INTO duplicates FROM (
+        SELECT 1 FROM aeroports WHERE abbreviation IS NOT NULL AND abbreviation <> ''
+        GROUP BY organisation_id, abbreviation HAVING COUNT(*) > 1
+    ) d;
+    IF duplicates > 0 THEN
+        RAISE EXCEPTION 'aeroports: % codes IATA en double. Voir: SELECT organisation_id, abbreviation, array_agg(id) FROM aeroports WHERE abbreviation <> '''' GROUP BY 1, 2 HAVING COUNT(*) > 1;', duplicates;
+    END IF;
+END $$;
+
+-- ===================================================================
+-- PARTIE 2: INDEX UNIQUES (clés normalisées, par organisation)
+-- ===================================================================
+
+-- Table armateurs: nom insensible à la casse (le code est déjà unique: idx_armateurs_org_code)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_armateurs_org_nom_lower ON armateurs(organisation_id, LOWER(nom));
+
+-- Table navires: numéro OMI (s'il est renseigné) et code interne
+CREATE UNIQUE INDEX IF NOT EXISTS uq_navires_org_code_omi ON navires(organisation_id, code_omi)
+    WHERE code_omi IS NOT NULL AND code_omi <> '';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_navires_org_code ON navires(organisation_id, code);
+
+-- Table ports: UN/LOCODE ou numéro World Port Index (colonne abbreviation)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ports_org_abbreviation ON ports(organisation_id, abbreviation)
+    WHERE abbreviation IS NOT NULL AND abbreviation <> '';
+
+-- Table aeroports: code IATA (colonne abbreviation)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_aeroports_org_abbreviation ON aeroports(organisation_id, abbreviation)
+    WHERE abbreviation IS NOT NULL AND abbreviation <> '';
+
+COMMENT ON INDEX uq_armateurs_org_nom_lower IS 'Clé d''importation: INSERT ... ON CONFLICT (organisation_id, LOWER(nom))';
+COMMENT ON INDEX uq_navires_org_code_omi IS 'Clé d''importation: INSERT ... ON CONFLICT (organisation_id, code_omi)';
+COMMENT ON INDEX uq_ports_org_abbreviation IS 'Clé d''importation: INSERT ... ON CONFLICT (organisation_id, abbreviation)';
+COMMENT ON INDEX uq_aeroports_org_abbreviation IS 'Clé d''importation: INSERT ... ON CONFLICT (organisation_id, abbreviation)';
+
+-- ===================================================================
+-- FIN DE LA MIGRATION 010
+-- ===================================================================
@@ -0,0 +1,44 @@
+-- ===================================================================
+-- Migration 011: État de synchronisation des importations (armateurs, navires)
+-- ===================================================================
+-- Description: Empreinte de chaque enregistrement source importé par les scripts
+--             docs/data-cleaning (option --sync): clé source (QID Wikidata ou
+--             nom normalisé), ligne Velosi correspondante, hash du contenu et date
+--             de modification côté source. Une synchronisation n'applique plus
+--             que la différence (insertions, mises à jour, désactivations) au lieu
+--             de supprimer et recharger les tables, ce qui préserve les clés
+--             étrangères des expéditions.
+-- Prérequis: migration 009 (colonne organisation_id)
+-- Date: 2026-10-17
+-- ===================================================================
+
+CREATE TABLE IF NOT EXISTS import_sync_state (
+    organisation_id INTEGER NOT NULL DEFAULT 1,
+    entity VARCHAR(20) NOT NULL,
+    source_key VARCHAR(255) NOT NULL,
+    row_id INTEGER NOT NULL,
+    content_hash CHAR(32) NOT NULL,
+    source_modified TIMESTAMP,
+    last_seen_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    deleted_at TIMESTAMP,
+    PRIMARY KEY (organisation_id, entity, source_key)
+);
+
+-- Point de reprise de la synchronisation incrémentale: MAX(source_modified) par entité
+CREATE INDEX IF NOT EXISTS idx_import_sync_state_modified
+    ON import_sync_state(organisation_id, entity, source_modified);
+
+-- Ligne Velosi -> clé source (désactivation et réactivation)
+CREATE INDEX IF NOT EXISTS idx_import_sync_state_row
+    ON import_sync_state(entity, row_id);
+
+COMMENT ON TABLE import_sync_state IS 'Empreintes des enregistrements importés (docs/data-cleaning --sync)';
+COMMENT ON COLUMN import_sync_state.source_key IS 'QID Wikidata (Q12345) ou nom normalisé pour les sources sans identifiant';
+COMMENT ON COLUMN import_sync_state.row_id IS 'Identifiant de la ligne dans la table entity';
+COMMENT ON COLUMN import_sync_state.content_hash IS 'MD5 des champs importés: ligne réécrite seulement si le hash change';
+COMMENT ON COLUMN import_sync_state.source_modified IS 'schema:dateModified de l''élément Wikidata lors de la dernière importation';
+COMMENT ON COLUMN import_sync_state.deleted_at IS 'Désactivation (isactive = false / statut = inactif) lorsque la source ne contient plus l''élément';
+
+-- ===================================================================
+-- FIN DE LA MIGRATION 011
+-- ===================================================================
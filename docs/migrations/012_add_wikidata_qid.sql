@@ -0,0 +1,64 @@
+-- ===================================================================
+-- Migration 012: Identifiant Wikidata (QID) des armateurs et navires
+-- ===================================================================
+-- Description: Les scripts d'importation (docs/data-cleaning) conservent le
+--             QID Wikidata (Q12345) de chaque armateur et navire importé, et
+--             la requête des navires renvoie le QID de l'opérateur (P137).
+--             Le navire est rattaché à son armateur par égalité de QID
+--             (table de hachage QID -> id construite une fois par exécution)
+--             au lieu d'une recherche par nom, ambiguë pour les noms courts
+--             ("ONE", "HMM"). La recherche par nom ne sert plus qu'aux lignes
+--             sans QID (données de secours, armateurs saisis à la main).
+-- Prérequis: migration 009 (colonne organisation_id), migration 011 pour
+--            la reprise des QID déjà connus (PARTIE 3, facultative)
+-- Date: 2026-10-17
+-- ===================================================================
+
+-- ===================================================================
+-- PARTIE 1: COLONNES
+-- ===================================================================
+
+ALTER TABLE armateurs ADD COLUMN IF NOT EXISTS wikidata_qid VARCHAR(20);
+ALTER TABLE navires ADD COLUMN IF NOT EXISTS wikidata_qid VARCHAR(20);
+
+COMMENT ON COLUMN armateurs.wikidata_qid IS 'QID Wikidata de la compagnie (Q12345), NULL si saisie manuelle';
+COMMENT ON COLUMN navires.wikidata_qid IS 'QID Wikidata du navire (Q12345), NULL si saisie manuelle';
+
+-- ===================================================================
+-- PARTIE 2: INDEX (un QID par organisation)
+-- ===================================================================
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_armateurs_org_wikidata_qid ON armateurs(organisation_id, wikidata_qid)
+    WHERE wikidata_qid IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_navires_org_wikidata_qid ON navires(organisation_id, wikidata_qid)
+    WHERE wikidata_qid IS NOT NULL;
+
+COMMENT ON INDEX uq_armateurs_org_wikidata_qid IS 'Jointure navire -> armateur par QID de l''opérateur (docs/data-cleaning)';
+COMMENT ON INDEX uq_navires_org_wikidata_qid IS 'Identité Wikidata des navires importés (docs/data-cleaning)';
+
+-- ===================================================================
+-- PARTIE 3: REPRISE DES QID CONNUS (import_sync_state, migration 011)
+-- ===================================================================
+-- Les lignes déjà synchronisées (--sync) ont leur QID dans import_sync_state.source_key.
+
+DO $$
+BEGIN
+    IF to_regclass('import_sync_state') IS NULL THEN
+        RAISE NOTICE 'import_sync_state absente (migration 011): aucun QID repris';
+        RETURN;
+    END IF;
+
+    UPDATE armateurs a SET wikidata_qid = s.source_key
+    FROM import_sync_state s
+    WHERE s.entity = 'armateurs' AND s.row_id = a.id AND s.organisation_id = a.organisation_id
+      AND s.source_key ~ '^Q[0-9]+$' AND a.wikidata_qid IS NULL;
+
+    UPDATE navires n SET wikidata_qid = s.source_key
+    FROM import_sync_state s
+    WHERE s.entity = 'navires' AND s.row_id = n.id AND s.organisation_id = n.organisation_id
+      AND s.source_key ~ '^Q[0-9]+$' AND n.wikidata_qid IS NULL;
+END $$;
+
+-- ===================================================================
+-- FIN DE LA MIGRATION 012
+-- ===================================================================